@@ -4,6 +4,14 @@ import os
 # Add the backend directory to sys.path so that imports like "from app..." work correctly
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
+# Each cold instance would otherwise hold its own long-lived pool; use one
+# connection per request through Neon's pooler instead
+os.environ.setdefault("DB_POOL_PROFILE", "serverless")
+# No multiprocessing semaphores on the serverless runtime; hash on threads
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+# No Dapr sidecar either; chat history lives in the instance
+os.environ.setdefault("CHAT_MEMORY_STORE", "memory")
+
 from fastapi import FastAPI, Response
 import traceback
 
@@ -1,29 +1,28 @@
-from typing import Generator, Optional
+import hmac
+from typing import Optional
 from jose import jwt
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
+from fastapi.requests import HTTPConnection
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import ValidationError
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.core import security
+from app.core.cache import cache_user, get_cached_user
 from app.core.config import settings
-from app.db.session import get_session
+from app.db.session import get_async_session
 from app.models.user import User
-from app.schemas.token import TokenPayload
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login"
 )
 
 async def get_current_user(
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     token: str = Depends(reusable_oauth2)
 ) -> User:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        token_data = TokenPayload(**payload)
+        token_data = security.decode_token(token)
         
         if token_data.type != "access":
              raise HTTPException(
@@ -38,9 +37,55 @@ async def get_current_user(
             detail="Could not validate credentials",
         )
     
-    user = session.get(User, int(token_data.sub))
+    user_id = int(token_data.sub)
+    user = get_cached_user(user_id)
+    if user is None:
+        user = await session.get(User, user_id)
+        if user:
+            cache_user(user)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return user
+
+async def get_stream_user(
+    connection: HTTPConnection,
+    session: AsyncSession = Depends(get_async_session),
+) -> User:
+    """
+    get_current_user for SSE and WebSocket connections. Browsers cannot set
+    headers on EventSource or WebSocket requests, so the access token may
+    also be passed as ?token=.
+    """
+    token = connection.query_params.get("token")
+    scheme, _, credentials = connection.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and credentials:
+        token = credentials
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await get_current_user(session=session, token=token)
+
+def require_internal_token(x_internal_token: Optional[str] = Header(default=None)) -> None:
+    """
+    Guards the /internal endpoints: metrics and admin actions for operators,
+    not users. Unset INTERNAL_API_TOKEN disables them.
+    """
+    if not settings.INTERNAL_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_internal_token or not hmac.compare_digest(x_internal_token, settings.INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+
+def require_dapr_token(dapr_api_token: Optional[str] = Header(default=None)) -> None:
+    """
+    Guards subscription routes that only the Dapr sidecar may call. Unset
+    APP_API_TOKEN disables them.
+    """
+    if not settings.APP_API_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not dapr_api_token or not hmac.compare_digest(dapr_api_token, settings.APP_API_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
@@ -4,22 +4,32 @@ from typing import Any
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlmodel import Session, select
+from pydantic import ValidationError
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.db.session import get_session
+from app.core.hashing import PasswordHasherBusy, password_hasher
+from app.db.session import get_async_session
 from app.models.user import User
 from app.schemas.token import Token
 from app.schemas.user import UserCreate, UserRead, UserLogin
 
 router = APIRouter()
 
+def hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/signup", response_model=UserRead)
-def create_user(
+async def create_user(
     *,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     user_in: UserCreate,
 ) -> Any:
     """
@@ -31,43 +41,63 @@ def create_user(
             detail="Passwords do not match",
         )
 
-    user = session.exec(
+    result = await session.exec(
         select(User).where((User.email == user_in.email) | (User.username == user_in.username))
-    ).first()
+    )
+    user = result.first()
     if user:
         raise HTTPException(
             status_code=400,
             detail="User with this email or username already exists",
         )
-    
+
+    try:
+        hashed_password = await password_hasher.hash(user_in.password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+
     user = User(
         email=user_in.email,
         username=user_in.username,
-        hashed_password=security.get_password_hash(user_in.password),
+        hashed_password=hashed_password,
         is_active=True
     )
     session.add(user)
-    session.commit()
-    session.refresh(user)
+    await session.commit()
+    await session.refresh(user)
     return user
 
 @router.post("/login", response_model=Token)
-def login_access_token(
-    session: Session = Depends(get_session),
+async def login_access_token(
+    session: AsyncSession = Depends(get_async_session),
     form_data: OAuth2PasswordRequestForm = Depends(),
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = session.exec(
+    result = await session.exec(
         select(User).where(User.email == form_data.username)
-    ).first()
+    )
+    user = result.first()
     
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.hashed_password)
+    except PasswordHasherBusy:
+        raise hasher_busy()
+    if not valid:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
+
+    if new_hash:
+        # Stored with a stale bcrypt cost; upgrade it now that we have the password
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
         
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     return {
@@ -79,24 +109,22 @@ def login_access_token(
     }
 
 @router.post("/refresh", response_model=Token)
-def refresh_token(
+async def refresh_token(
     refresh_token: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
 ) -> Any:
     """
     Refresh access token
     """
     try:
-        payload = jwt.decode(
-            refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        if payload.get("type") != "refresh":
+        token_data = security.decode_token(refresh_token)
+        if token_data.type != "refresh":
              raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token type",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        user_id = payload.get("sub")
+        user_id = token_data.sub
         if user_id is None:
              raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -104,13 +132,13 @@ def refresh_token(
                 headers={"WWW-Authenticate": "Bearer"},
             )
             
-    except jwt.JWTError:
+    except (jwt.JWTError, ValidationError):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
         
-    user = session.get(User, int(user_id))
+    user = await session.get(User, int(user_id))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
         
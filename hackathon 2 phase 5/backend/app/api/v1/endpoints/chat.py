@@ -1,13 +1,18 @@
 from typing import Any
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps
-from app.db.session import get_session
+from app.db.session import get_async_session, get_session
 from app.models.user import User
 from app.core.ai_tools import AiTools
 from app.core.ai_service import AiService
+from app.core.conversation import conversation_memory
+from app.core.sse import sse
 
 router = APIRouter()
 
@@ -29,10 +34,53 @@ def chat_with_ai(
     try:
         # Initialize tools with current session and user
         tools = AiTools(session=session, user=current_user)
+        conversation = conversation_memory.load(current_user.id)
         
         # Process message
-        response_text = AiService.process_chat(request.message, tools)
+        response_text = AiService.process_chat(request.message, tools, conversation)
+        conversation_memory.save(conversation)
         
         return ChatResponse(response=response_text)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/stream")
+async def stream_chat_with_ai(
+    request: ChatRequest,
+    http_request: Request,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_current_user),
+) -> StreamingResponse:
+    """
+    Chat with the AI over server-sent events. Emits `text` events with
+    partial replies, `tool` events as todos are changed, then `done` with
+    the full reply (or `error`).
+    """
+    conversation = await run_in_threadpool(conversation_memory.load, current_user.id)
+
+    async def events():
+        try:
+            # Stops the turn before its next model or tool call if the
+            # client went away mid-stream
+            turn = AiService.stream_chat(
+                request.message, session, current_user, conversation, http_request.is_disconnected
+            )
+            async for event, data in turn:
+                yield sse(event, data)
+        finally:
+            await run_in_threadpool(conversation_memory.save, conversation)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.delete("/history", status_code=204)
+def clear_chat_history(
+    current_user: User = Depends(deps.get_current_user),
+) -> None:
+    """
+    Forget the conversation so far.
+    """
+    conversation_memory.clear(current_user.id)
@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import ValidationError
+
+from app.api import deps
+from app.core.ai_config import AISettings
+from app.core.ai_service import model_registry
+from app.core.audit import audit_sink
+from app.core.cache import response_cache, token_cache, user_cache
+from app.core.config import settings
+from app.core.conversation import conversation_memory
+from app.core.hashing import password_hasher
+from app.core.intents import intent_router
+from app.db.session import async_pool_stats, sync_pool_stats
+from app.events.hub import hub
+from app.events.outbox import outbox_relay
+from app.events.publisher import publisher
+
+router = APIRouter()
+
+@router.get("/metrics", dependencies=[Depends(deps.require_internal_token)])
+def read_metrics():
+    """
+    In-process cache, pool, event delivery, realtime, password hashing and AI statistics for this worker.
+    """
+    return {
+        "token_cache": token_cache.stats(),
+        "user_cache": user_cache.stats(),
+        "db_pool": {
+            "profile": settings.DB_POOL_PROFILE,
+            "sync": sync_pool_stats.snapshot(),
+            "async": async_pool_stats.snapshot(),
+        },
+        "event_publisher": publisher.stats(),
+        "outbox_relay": outbox_relay.stats(),
+        "realtime": hub.stats(),
+        "password_hasher": password_hasher.stats(),
+        "ai_models": model_registry.stats(),
+        "chat_memory": conversation_memory.stats(),
+        "ai_fast_path": intent_router.stats(),
+        "ai_response_cache": response_cache.stats(),
+        "ai_audit": audit_sink.stats(),
+    }
+
+@router.post("/ai/reload", dependencies=[Depends(deps.require_internal_token)])
+def reload_ai_models():
+    """
+    Re-reads the Gemini settings and rebuilds the shared model if they changed.
+    """
+    try:
+        config = AISettings()
+    except ValidationError as e:
+        # Field names and messages only: the values may be secrets
+        problems = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+        raise HTTPException(status_code=500, detail=f"Could not load AI settings: {problems}")
+    return {"reloaded": model_registry.reload(config), **model_registry.stats()}
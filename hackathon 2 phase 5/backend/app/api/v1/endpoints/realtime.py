@@ -0,0 +1,110 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.api import deps
+from app.core.config import settings
+from app.core.sse import sse
+from app.db.session import get_async_session
+from app.events.hub import HubFull, Subscription, hub
+from app.models.user import User
+
+# Push channels for todo changes. Each connection first receives
+# {"type": "hello"}, after which the client catches up from its last
+# GET /todos/changes cursor. Then come "todos.changed" messages carrying
+# the new todo version (fetch the delta from GET /todos/changes) and
+# "task.event" messages with the raw task event. Quiet connections get a
+# heartbeat every REALTIME_HEARTBEAT_SECONDS. A connection that falls
+# REALTIME_QUEUE_SIZE messages behind is closed and should reconnect.
+#
+# Opening a connection touches the database only when the user is not in
+# the user cache, so reconnect storms after a deploy stay cheap.
+
+router = APIRouter()
+
+async def open_subscription(session: AsyncSession, user: User) -> Subscription:
+    # Hand back any database connection the user lookup took: the stream
+    # may stay open for hours
+    await session.close()
+    return hub.connect(user.id)
+
+@router.get("/stream")
+async def stream_todo_changes(
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_stream_user),
+) -> StreamingResponse:
+    """
+    Server-sent events with the current user's todo changes.
+    """
+    try:
+        subscription = await open_subscription(session, current_user)
+    except HubFull:
+        raise HTTPException(status_code=503, detail="Too many realtime connections", headers={"Retry-After": "5"})
+
+    async def events():
+        try:
+            yield sse("hello", {"type": "hello"})
+            while True:
+                message = await subscription.next(settings.REALTIME_HEARTBEAT_SECONDS)
+                if message is None:
+                    # Comment line: keeps proxies from timing the stream out
+                    yield ": ping\n\n"
+                else:
+                    yield sse(message["type"], message)
+        except ConnectionAbortedError:
+            yield sse("evicted", {"type": "evicted"})
+        finally:
+            hub.disconnect(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def todo_changes_socket(
+    websocket: WebSocket,
+    session: AsyncSession = Depends(get_async_session),
+):
+    """
+    WebSocket with the current user's todo changes. Anything the client
+    sends, e.g. "pong" replies to {"type": "ping"}, is ignored; dead peers
+    are found by the server's protocol-level pings.
+    """
+    try:
+        user = await deps.get_stream_user(websocket, session)
+        subscription = await open_subscription(session, user)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    except HubFull:
+        # "Try again later"
+        await websocket.close(code=1013)
+        return
+
+    await websocket.accept()
+
+    async def send():
+        await websocket.send_json({"type": "hello"})
+        while True:
+            message = await subscription.next(settings.REALTIME_HEARTBEAT_SECONDS)
+            await websocket.send_json(message or {"type": "ping"})
+
+    async def receive():
+        while True:
+            await websocket.receive_text()
+
+    tasks = {asyncio.create_task(send()), asyncio.create_task(receive())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        if any(isinstance(task.exception(), ConnectionAbortedError) for task in done):
+            await websocket.close(code=1013)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        hub.disconnect(subscription)
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlmodel import Session
 from app.db.session import get_session
+from app.services.recurring import materialize_occurrences
 from app.services.scheduler import check_and_publish_reminders
 import logging
 
@@ -14,8 +15,22 @@ def trigger_scheduler(session: Session = Depends(get_session)):
     """
     logger.info("Scheduler triggered by Dapr Binding.")
     try:
-        check_and_publish_reminders(session)
-        return {"status": "SUCCESS"}
+        stats = check_and_publish_reminders(session)
+        return {"status": "SUCCESS", **stats}
     except Exception as e:
         logger.error(f"Scheduler failed: {e}")
         return {"status": "ERROR", "detail": str(e)}
+
+@router.post("/recurrence-tasks")
+def trigger_recurrence(session: Session = Depends(get_session)):
+    """
+    Triggered by the recurrence Dapr Binding (Cron): creates recurring
+    todos' upcoming occurrences.
+    """
+    logger.info("Recurrence materialization triggered by Dapr Binding.")
+    try:
+        stats = materialize_occurrences(session)
+        return {"status": "SUCCESS", **stats}
+    except Exception as e:
+        logger.error(f"Recurrence materialization failed: {e}")
+        return {"status": "ERROR", "detail": str(e)}
@@ -1,20 +1,68 @@
-from typing import Any, List
+from datetime import datetime
+from typing import Any, List, Literal, Optional, Union
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, tuple_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.api import deps
-from app.db.session import get_session
-from app.models.todo import Todo
+from app.db.session import get_async_session
+from app.events.outbox import add_event
+from app.models.todo import Todo, TodoChange
 from app.models.user import User
-from app.schemas.todo import TodoCreate, TodoRead, TodoUpdate
+from app.schemas.todo import (
+    TodoBulkCreate,
+    TodoBulkDelete,
+    TodoBulkItemResult,
+    TodoBulkResult,
+    TodoBulkUpdate,
+    TodoChanges,
+    TodoCreate,
+    TodoImportResult,
+    TodoPage,
+    TodoRead,
+    TodoUpdate,
+)
+from app.services.versions import get_version_async, record_changes
+from app.services.search import search_statement
+from app.services.transfer import MEDIA_TYPES, Format, InvalidImport, export_todos, import_todos
+from app.services.pagination import (
+    InvalidCursor,
+    decode_change_cursor,
+    encode_change_cursor,
+    encode_cursor,
+    fetch_offset_page,
+    fetch_page,
+    keyset_statements,
+    todo_list_statement,
+)
+
+MAX_PAGE_SIZE = 500
 
 router = APIRouter()
 
+# Reads carry an ETag derived from the user's todo version, which every
+# write to their todos changes. A matching If-None-Match is answered with
+# 304 from the version row alone, before any todo is loaded.
+
+def _etag(*parts) -> str:
+    # Weak: equal tags mean equivalent JSON, not identical bytes
+    return 'W/"' + "-".join(str(part) for part in parts) + '"'
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    tags = [tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")]
+    if etag.removeprefix("W/") in tags:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
 @router.post("", response_model=TodoRead)
-def create_todo(
+async def create_todo(
     *,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     todo_in: TodoCreate,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
@@ -24,45 +72,313 @@ def create_todo(
     todo = Todo.from_orm(todo_in)
     todo.user_id = current_user.id
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
+    await session.commit()
+    await session.refresh(todo)
     return todo
 
-@router.get("", response_model=List[TodoRead])
-def read_todos(
-    session: Session = Depends(get_session),
+@router.get("", response_model=Union[List[TodoRead], TodoPage])
+async def read_todos(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = Query(
+        None,
+        description="Keyset cursor from a previous page's next_cursor. "
+        "Pass an empty value to fetch the first page in cursor mode.",
+    ),
+    status: Optional[Literal["pending", "completed"]] = None,
+    due_after: Optional[datetime] = Query(None, description="Only todos due at or after this time"),
+    due_before: Optional[datetime] = Query(None, description="Only todos due before this time"),
+    has_reminder: Optional[bool] = None,
+    recurrence_rule: Optional[str] = None,
+    order_by: Literal["id", "due_date"] = "id",
+    direction: Literal["asc", "desc"] = "asc",
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Retrieve todos.
+
+    Without `cursor` this returns a plain list paged by skip/limit. With
+    `cursor` it returns a TodoPage whose next_cursor fetches the following page.
+    Cursors are tied to order_by and direction; keep the filters the same
+    while paging. Todos without a due date sort last in either direction.
+    The ETag covers every page and filter of the user's list.
+    """
+    # Read the version before the rows: a write in between leaves the
+    # client with an older tag, which only costs a refetch
+    version = await get_version_async(session, current_user.id)
+    not_modified = _not_modified(request, response, _etag("todos", current_user.id, version))
+    if not_modified is not None:
+        return not_modified
+
+    statement = todo_list_statement(
+        current_user.id,
+        status=status,
+        due_after=due_after,
+        due_before=due_before,
+        has_reminder=has_reminder,
+        recurrence_rule=recurrence_rule,
+    )
+    descending = direction == "desc"
+
+    if cursor is None:
+        statements = keyset_statements(statement, sort=order_by, descending=descending)
+        return await fetch_offset_page(session, statements, skip, limit)
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    try:
+        statements = keyset_statements(statement, sort=order_by, cursor=cursor, descending=descending)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    todos, has_more = await fetch_page(session, statements, limit)
+    next_cursor = encode_cursor(order_by, todos[-1], descending) if has_more else None
+    return {"items": todos, "next_cursor": next_cursor}
+
+# Change feed, search, export/import and bulk routes are declared before the /{id} routes
+# they would otherwise match
+
+@router.get("/changes", response_model=TodoChanges)
+async def read_todo_changes(
+    since: Optional[str] = Query(
+        None,
+        description="next_cursor from the previous sync. Omit to receive every todo.",
+    ),
+    limit: int = 100,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Todos created, updated or deleted since `since`, oldest change first.
+    A todo changed several times appears once, in its current state.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    statement = (
+        select(TodoChange, Todo)
+        .outerjoin(Todo, Todo.id == TodoChange.todo_id)
+        .where(TodoChange.user_id == current_user.id)
+    )
+    position = (0, 0)
+    if since:
+        try:
+            position = decode_change_cursor(since)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        statement = statement.where(tuple_(TodoChange.seq, TodoChange.todo_id) > tuple_(*position))
+    else:
+        # A first sync has nothing to delete
+        statement = statement.where(TodoChange.deleted == False)  # noqa: E712
+    result = await session.exec(statement.order_by(TodoChange.seq, TodoChange.todo_id).limit(limit + 1))
+    rows = result.all()
+
+    upserts, deleted = [], []
+    for change, todo in rows[:limit]:
+        # A missing row without a tombstone was removed by a path that did
+        # not record it; report it deleted all the same
+        if change.deleted or todo is None:
+            deleted.append(change.todo_id)
+        else:
+            upserts.append(todo)
+        position = (change.seq, change.todo_id)
+    return {
+        "upserts": upserts,
+        "deleted": deleted,
+        "next_cursor": encode_change_cursor(*position),
+        "has_more": len(rows) > limit,
+    }
+
+@router.get("/search", response_model=List[TodoRead])
+async def search_todos(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in titles and descriptions"),
+    limit: int = 20,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Full-text search over the current user's todos, best match first.
+    Every word must match, as a prefix.
+    """
+    statement = search_statement(session.bind.dialect.name, current_user.id, q)
+    if statement is None:
+        return []
+    result = await session.exec(statement.limit(max(1, min(limit, MAX_PAGE_SIZE))))
+    return result.all()
+
+@router.get("/export")
+async def export_todos_stream(
+    format: Format = "ndjson",
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_current_user),
+) -> StreamingResponse:
+    """
+    Every todo of the current user as NDJSON or CSV, streamed as it is read.
+    """
+    return StreamingResponse(
+        export_todos(session, current_user.id, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+@router.post("/import", response_model=TodoImportResult)
+async def import_todos_stream(
+    request: Request,
+    format: Optional[Format] = Query(None, description="Defaults from Content-Type: text/csv, else NDJSON"),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Create todos from an NDJSON or CSV upload (e.g. a GET /todos/export),
+    read as it arrives. All or nothing: a bad line fails the whole import.
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if content_type.startswith("text/csv") else "ndjson"
+    try:
+        count = await import_todos(session, current_user.id, request.stream(), format)
+    except InvalidImport as e:
+        await session.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if count:
+        add_event(session, "task-events", {
+            "event_type": "task.imported",
+            "count": count,
+            "user_id": current_user.id
+        })
+    await session.commit()
+    return {"imported": count}
+
+@router.post("/bulk", response_model=TodoBulkResult)
+async def create_todos_bulk(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    todos_in: TodoBulkCreate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
     """
-    # Filter by current user
-    statement = select(Todo).where(Todo.user_id == current_user.id).offset(skip).limit(limit)
-    todos = session.exec(statement).all()
-    return todos
+    Create many todos in one transaction.
+    """
+    todos = []
+    for item in todos_in.items:
+        todo = Todo.from_orm(item)
+        todo.user_id = current_user.id
+        todos.append(todo)
+    session.add_all(todos)
+    # One multi-row INSERT ... RETURNING for the new ids
+    await session.flush()
+
+    add_event(session, "task-events", {
+        "event_type": "task.bulk_created",
+        "task_ids": [todo.id for todo in todos],
+        "user_id": current_user.id
+    })
+    await session.commit()
+    return TodoBulkResult(results=[TodoBulkItemResult(id=todo.id, status="created") for todo in todos])
+
+@router.patch("/bulk", response_model=TodoBulkResult)
+async def update_todos_bulk(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    todos_in: TodoBulkUpdate,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Update many todos in one transaction. Ids that do not exist or belong to
+    another user are reported as not_found.
+    """
+    ids = {item.id for item in todos_in.items}
+    # Single ownership check for the whole batch
+    result = await session.exec(select(Todo).where(Todo.id.in_(ids), Todo.user_id == current_user.id))
+    owned = {todo.id: todo for todo in result.all()}
+
+    results = []
+    completed = []
+    for item in todos_in.items:
+        todo = owned.get(item.id)
+        if todo is None:
+            results.append(TodoBulkItemResult(id=item.id, status="not_found"))
+            continue
+        previous_status = todo.status
+        for key, value in item.dict(exclude_unset=True, exclude={"id"}).items():
+            setattr(todo, key, value)
+        if previous_status != "completed" and todo.status == "completed":
+            completed.append(todo)
+        results.append(TodoBulkItemResult(id=item.id, status="updated"))
+
+    updated_ids = [r.id for r in results if r.status == "updated"]
+    if updated_ids:
+        add_event(session, "task-events", {
+            "event_type": "task.bulk_updated",
+            "task_ids": updated_ids,
+            "completed_task_ids": [todo.id for todo in completed],
+            "user_id": current_user.id
+        })
+    await session.commit()
+    return TodoBulkResult(results=results)
+
+@router.delete("/bulk", response_model=TodoBulkResult)
+async def delete_todos_bulk(
+    *,
+    session: AsyncSession = Depends(get_async_session),
+    todos_in: TodoBulkDelete,
+    current_user: User = Depends(deps.get_current_user),
+) -> Any:
+    """
+    Delete many todos with a single statement. Ids that do not exist or
+    belong to another user are reported as not_found.
+    """
+    # The ownership check is part of the DELETE itself
+    result = await session.exec(
+        delete(Todo)
+        .where(Todo.id.in_(todos_in.ids), Todo.user_id == current_user.id)
+        .returning(Todo.id)
+    )
+    deleted = set(result.scalars().all())
+
+    if deleted:
+        await session.run_sync(lambda sync_session: record_changes(
+            sync_session, [(current_user.id, id, True) for id in deleted]
+        ))
+        add_event(session, "task-events", {
+            "event_type": "task.bulk_deleted",
+            "task_ids": sorted(deleted),
+            "user_id": current_user.id
+        })
+    await session.commit()
+    return TodoBulkResult(results=[
+        TodoBulkItemResult(id=id, status="deleted" if id in deleted else "not_found")
+        for id in todos_in.ids
+    ])
 
 @router.get("/{id}", response_model=TodoRead)
-def read_todo(
+async def read_todo(
     id: int,
-    session: Session = Depends(get_session),
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Get todo by ID.
     """
-    todo = session.get(Todo, id)
+    version = await get_version_async(session, current_user.id)
+    # The tag is predictable, so only answer 304 for a todo the user owns
+    todo = await session.get(Todo, id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     if todo.user_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
+    not_modified = _not_modified(request, response, _etag("todo", id, current_user.id, version))
+    if not_modified is not None:
+        return not_modified
     return todo
 
 @router.put("/{id}", response_model=TodoRead)
-def update_todo(
+async def update_todo(
     *,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     id: int,
     todo_in: TodoUpdate,
     current_user: User = Depends(deps.get_current_user),
@@ -70,7 +386,7 @@ def update_todo(
     """
     Update todo.
     """
-    todo = session.get(Todo, id)
+    todo = await session.get(Todo, id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     if todo.user_id != current_user.id:
@@ -83,53 +399,44 @@ def update_todo(
         setattr(todo, key, value)
     
     session.add(todo)
-    session.commit()
-    session.refresh(todo)
-    
-    # Event Publishing & Recurrence Logic
-    try:
-        # Publish generic update event
-        from app.events.publisher import publish_event
-        publish_event("task-events", {
-            "event_type": "task.updated",
+
+    # Events are written in the same transaction as the update; the outbox
+    # relay publishes them after commit
+    add_event(session, "task-events", {
+        "event_type": "task.updated",
+        "task_id": todo.id,
+        "user_id": todo.user_id,
+        "status": todo.status
+    })
+
+    if previous_status != "completed" and todo.status == "completed":
+        # Publish specifically as completion; its consumer creates the next
+        # occurrence of a recurring todo (app/events/subscriber.py)
+        add_event(session, "task-events", {
+            "event_type": "task.completed",
             "task_id": todo.id,
-            "user_id": todo.user_id,
-            "status": todo.status
+            "user_id": todo.user_id
         })
-        
-        # Check for completion to trigger recurrence
-        if previous_status != "completed" and todo.status == "completed":
-            from app.services.recurring import process_recurrence
-            process_recurrence(todo, session)
-            
-            # Publish specifically as completion
-            publish_event("task-events", {
-                "event_type": "task.completed",
-                "task_id": todo.id,
-                "user_id": todo.user_id
-            })
-            
-    except Exception as e:
-        print(f"Background task error: {e}") # Non-blocking for now
-        
+
+    await session.commit()
     return todo
 
 @router.delete("/{id}", response_model=TodoRead)
-def delete_todo(
+async def delete_todo(
     *,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     id: int,
     current_user: User = Depends(deps.get_current_user),
 ) -> Any:
     """
     Delete todo.
     """
-    todo = session.get(Todo, id)
+    todo = await session.get(Todo, id)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
     if todo.user_id != current_user.id:
         raise HTTPException(status_code=400, detail="Not enough permissions")
     
-    session.delete(todo)
-    session.commit()
+    await session.delete(todo)
+    await session.commit()
     return todo
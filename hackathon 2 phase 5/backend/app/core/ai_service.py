@@ -1,37 +1,292 @@
+import inspect
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+
 import google.generativeai as genai
-from app.core.ai_config import ai_settings
+from google.generativeai import protos
+from google.generativeai.types import content_types
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+from app.core.ai_config import AISettings, ai_settings
 from app.core.ai_tools import AiTools
+from app.core.cache import response_cache
+from app.core.conversation import Conversation
+from app.core.intents import intent_router, is_self_contained, normalize
+from app.models.user import User
+from app.services.versions import get_version
+
+# AiTools methods exposed to Gemini
+TOOL_NAMES = ("create_todo", "list_todos", "search_todos", "update_todo", "mark_todo", "delete_todo")
+
+# Function-calling rounds allowed per streamed turn
+MAX_TOOL_ROUNDS = 10
+
+# Turns that called only these tools may be answered from response_cache
+READ_ONLY_TOOLS = {"list_todos", "search_todos"}
+
+def _declaration(name: str) -> content_types.CallableFunctionDeclaration:
+    """
+    Builds the function declaration for an AiTools method from the class,
+    so the schema does not depend on a bound instance.
+    """
+    method = getattr(AiTools, name)
+    signature = inspect.signature(method)
+
+    def schema(): pass
+    schema.__name__ = name
+    schema.__doc__ = method.__doc__
+    # Drop `self`
+    schema.__signature__ = signature.replace(parameters=list(signature.parameters.values())[1:])
+    return content_types.CallableFunctionDeclaration.from_function(schema)
 
-# Configure Global API Key
-genai.configure(api_key=ai_settings.GEMINI_API_KEY)
+class ToolDispatcher(content_types.FunctionLibrary):
+    """
+    Function library handed to a chat turn. It shares the registry's
+    prebuilt declarations and routes each function call to the AiTools
+    instance of the current request.
+    """
+
+    def __init__(self, library: content_types.FunctionLibrary, tools: AiTools):
+        self._library = library
+        self.tools = tools
+        self.called = []
+
+    def __getitem__(self, name):
+        return self._library[name]
+
+    def call(self, fc: protos.FunctionCall):
+        self._library[fc]  # unknown names raise KeyError like the SDK
+        self.called.append(fc.name)
+        return getattr(self.tools, fc.name)(**fc.args)
+
+    def read_only(self) -> bool:
+        """
+        True if the turn looked todos up without changing any.
+        """
+        return bool(self.called) and set(self.called) <= READ_ONLY_TOOLS
+
+    def __call__(self, fc: protos.FunctionCall) -> protos.Part:
+        return self.to_part(fc, self.call(fc))
+
+    @staticmethod
+    def to_part(fc: protos.FunctionCall, result) -> protos.Part:
+        if not isinstance(result, dict):
+            result = {"result": result}
+        return protos.Part(function_response=protos.FunctionResponse(name=fc.name, response=result))
+
+    def to_proto(self):
+        return self._library.to_proto()
+
+class ModelRegistry:
+    """
+    Holds the process-wide Gemini model and tool declarations. Both are built
+    on first use and shared by every request; reload() re-reads AISettings
+    and swaps in a new model when the configuration changed.
+    """
+
+    def __init__(self, config: AISettings = ai_settings):
+        self.config = config
+        self._lock = threading.Lock()
+        self._library: Optional[content_types.FunctionLibrary] = None
+        self._model: Optional[genai.GenerativeModel] = None
+        self.builds = 0
+        self.reloads = 0
+        self.requests = 0
+
+    def get(self):
+        """
+        Returns (model, library).
+        """
+        model, library = self._model, self._library
+        if model is None:
+            with self._lock:
+                if self._model is None:
+                    self._build()
+                model, library = self._model, self._library
+        self.requests += 1
+        return model, library
+
+    def reload(self, config: Optional[AISettings] = None) -> bool:
+        """
+        Applies a new configuration, read from the environment and .env when
+        not given. Returns True if the model was rebuilt.
+        """
+        config = config or AISettings()
+        with self._lock:
+            self.reloads += 1
+            if config == self.config and self._model is not None:
+                return False
+            self.config = config
+            self._build()
+            return True
+
+    def _build(self):
+        genai.configure(api_key=self.config.GEMINI_API_KEY)
+        if self._library is None:
+            self._library = content_types.FunctionLibrary([_declaration(name) for name in TOOL_NAMES])
+        self._model = genai.GenerativeModel(
+            model_name=self.config.GEMINI_MODEL,
+            tools=self._library,
+        )
+        self.builds += 1
+
+    def stats(self) -> dict:
+        return {
+            "model": self.config.GEMINI_MODEL,
+            "loaded": self._model is not None,
+            "builds": self.builds,
+            "reloads": self.reloads,
+            "requests": self.requests,
+        }
+
+model_registry = ModelRegistry()
+
+def response_key(message: str, tools: AiTools) -> Optional[tuple]:
+    """
+    Cache key for a chat reply, or None if the message refers back to
+    earlier turns. Includes the user's todo version, so any write makes
+    older replies unreachable.
+    """
+    text = normalize(message).lower()
+    if not text or not is_self_contained(text):
+        return None
+    return tools.user.id, get_version(tools.session, tools.user.id), text
+
+async def _connected() -> bool:
+    return False
 
 class AiService:
     @staticmethod
-    def process_chat(message: str, tools: AiTools) -> str:
+    def process_chat(message: str, tools: AiTools, conversation: Optional[Conversation] = None) -> str:
         """
         Processes a chat message using Google Gemini with the provided tools.
+        Earlier turns from `conversation` are sent as history, and a
+        successful exchange is appended to it. Simple commands are answered
+        by the local intent parser without calling the model, and repeated
+        read-only questions from response_cache until the todos change.
         """
-        # List of callable functions to expose to Gemini
-        # We bind the methods from the 'tools' instance
-        tool_functions = [
-            tools.create_todo,
-            tools.list_todos,
-            tools.update_todo,
-            tools.mark_todo,
-            tools.delete_todo
-        ]
-
-        model = genai.GenerativeModel(
-            model_name=ai_settings.GEMINI_MODEL,
-            tools=tool_functions
-        )
+        intent = intent_router.match(message)
+        if intent is not None:
+            text = intent_router.execute(intent, tools)
+            if conversation is not None:
+                conversation.add_turn(message, text)
+            return text
+
+        key = response_key(message, tools)
+        text = response_cache.get(key) if key else None
+        if text is not None:
+            if conversation is not None:
+                conversation.add_turn(message, text)
+            return text
+
+        model, library = model_registry.get()
+        dispatcher = ToolDispatcher(library, tools)
 
-        # Start a chat session (stateless for now, or could pass history if stored)
-        # For simplicity in this phase, we use a single-turn or short-lived chat with automatic function calling enabled by the SDK.
-        chat = model.start_chat(enable_automatic_function_calling=True)
+        # Function calls stay inside this turn; history only carries text
+        chat = model.start_chat(
+            history=conversation.history() if conversation else None,
+            enable_automatic_function_calling=True,
+        )
 
+        start = time.perf_counter()
         try:
-            response = chat.send_message(message)
-            return response.text
+            response = chat.send_message(message, tools=dispatcher)
+            text = response.text
         except Exception as e:
             return f"I encountered an error processing your request: {str(e)}"
+        intent_router.record_model(time.perf_counter() - start)
+        if key and dispatcher.read_only():
+            response_cache.set(key, text)
+        if conversation is not None:
+            conversation.add_turn(message, text)
+        return text
+
+    @staticmethod
+    async def stream_chat(
+        message: str,
+        session: AsyncSession,
+        user: User,
+        conversation: Optional[Conversation] = None,
+        disconnected: Callable[[], Awaitable[bool]] = _connected,
+    ) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Like process_chat, but yields (event, data) pairs as the reply is
+        produced: "text" for each partial chunk, "tool" after each function
+        call, then "done" with the full reply or "error". Function calls are
+        run here rather than by the SDK, which cannot stream them.
+
+        Tools run on `session` through run_sync, and the blocking model calls
+        in the thread pool. Stops before the next model or tool call once
+        `disconnected()` returns True.
+        """
+        tools = AiTools(session=session.sync_session, user=user)
+
+        def run_db(fn, *args):
+            # sync_session is only usable inside run_sync
+            return session.run_sync(lambda _: fn(*args))
+
+        intent = intent_router.match(message)
+        if intent is not None:
+            text = await run_db(intent_router.execute, intent, tools)
+            yield "tool", {"name": intent[0], "args": intent[1], "result": text}
+            yield "text", {"text": text}
+            if conversation is not None:
+                conversation.add_turn(message, text)
+            yield "done", {"response": text}
+            return
+
+        key = await run_db(response_key, message, tools)
+        text = response_cache.get(key) if key else None
+        if text is not None:
+            yield "text", {"text": text}
+            if conversation is not None:
+                conversation.add_turn(message, text)
+            yield "done", {"response": text}
+            return
+
+        model, library = model_registry.get()
+        dispatcher = ToolDispatcher(library, tools)
+        chat = model.start_chat(history=conversation.history() if conversation else None)
+
+        content = message
+        reply = []
+        start = time.perf_counter()
+        try:
+            for _ in range(MAX_TOOL_ROUNDS):
+                if await disconnected():
+                    return
+                function_calls = []
+                response = await run_in_threadpool(chat.send_message, content, stream=True, tools=dispatcher)
+                async for chunk in iterate_in_threadpool(response):
+                    for part in chunk.candidates[0].content.parts:
+                        if "function_call" in part:
+                            function_calls.append(part.function_call)
+                        elif part.text:
+                            reply.append(part.text)
+                            yield "text", {"text": part.text}
+                if not function_calls:
+                    break
+
+                responses = []
+                for fc in function_calls:
+                    if await disconnected():
+                        return
+                    result = await run_db(dispatcher.call, fc)
+                    responses.append(dispatcher.to_part(fc, result))
+                    yield "tool", {"name": fc.name, "args": dict(fc.args), "result": result}
+                content = protos.Content(role="user", parts=responses)
+            else:
+                raise RuntimeError("too many tool calls")
+        except Exception as e:
+            yield "error", {"detail": f"I encountered an error processing your request: {str(e)}"}
+            return
+        intent_router.record_model(time.perf_counter() - start)
+
+        text = "".join(reply)
+        if key and dispatcher.read_only():
+            response_cache.set(key, text)
+        if conversation is not None:
+            conversation.add_turn(message, text)
+        yield "done", {"response": text}
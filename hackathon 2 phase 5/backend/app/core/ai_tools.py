@@ -1,17 +1,33 @@
-from typing import List, Optional
-from sqlmodel import Session, select
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlmodel import Session, col, select
 import logging
 
 logger = logging.getLogger(__name__)
 
+from app.core.audit import AuditSink, audit_sink
 from app.models.todo import Todo
 from app.models.user import User
-from app.models.audit_log import AiAuditLog
+from app.services.pagination import InvalidCursor, encode_cursor, fetch_page_sync, keyset_statements
+from app.services.search import search_statement
+
+# list_todos page sizes; keeps the tool result small however many todos a user has
+LIST_DEFAULT_LIMIT = 20
+LIST_MAX_LIMIT = 50
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+def _todo_line(todo: Todo) -> str:
+    status = "[x]" if todo.status == "completed" else "[ ]"
+    due = todo.due_date.strftime("%Y-%m-%d %H:%M") if todo.due_date else "-"
+    return f"{todo.id}. {status} {todo.title} | {due} | {_clip(todo.description or '', 80)}\n"
 
 class AiTools:
-    def __init__(self, session: Session, user: User):
+    def __init__(self, session: Session, user: User, audit: AuditSink = audit_sink):
         self.session = session
         self.user = user
+        self.audit = audit
 
     def create_todo(self, title: str, description: Optional[str] = None) -> str:
         """Creates a new todo item.
@@ -27,19 +43,96 @@ class AiTools:
         self._log_action("create_todo", f"Title: {title}", f"Created ID: {todo.id}")
         return f"Todo created successfully with ID: {todo.id}"
 
-    def list_todos(self) -> str:
-        """Lists all todos for the current user."""
+    def list_todos(
+        self,
+        status: Optional[str] = None,
+        due_after: Optional[str] = None,
+        due_before: Optional[str] = None,
+        text: Optional[str] = None,
+        limit: int = LIST_DEFAULT_LIMIT,
+        page_token: Optional[str] = None,
+    ) -> str:
+        """Lists the current user's todos, soonest due first and undated last.
+        Returns one page; if more todos match, the reply ends with a page_token.
+        
+        Args:
+            status: Only todos with this status, 'pending' or 'completed'.
+            due_after: Only todos due on or after this date (YYYY-MM-DD).
+            due_before: Only todos due on or before this date (YYYY-MM-DD).
+            text: Only todos whose title or description contains this text.
+            limit: How many todos to return, at most 50.
+            page_token: The page_token from a previous call with the same filters, to get the next page.
+        """
         statement = select(Todo).where(Todo.user_id == self.user.id)
-        todos = self.session.exec(statement).all()
+        filters = []
+        if status is not None:
+            if status not in ["completed", "pending"]:
+                return "Error: Status must be 'completed' or 'pending'."
+            statement = statement.where(Todo.status == status)
+            filters.append(f"status={status}")
+        try:
+            if due_after:
+                statement = statement.where(Todo.due_date >= datetime.fromisoformat(due_after))
+                filters.append(f"due_after={due_after}")
+            if due_before:
+                end = datetime.fromisoformat(due_before)
+                if len(due_before) == 10:
+                    # A bare date includes the whole day
+                    end += timedelta(days=1)
+                    statement = statement.where(Todo.due_date < end)
+                else:
+                    statement = statement.where(Todo.due_date <= end)
+                filters.append(f"due_before={due_before}")
+        except ValueError:
+            return "Error: Dates must be in YYYY-MM-DD format."
+        if text:
+            pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            statement = statement.where(
+                col(Todo.title).ilike(pattern, escape="\\") | col(Todo.description).ilike(pattern, escape="\\")
+            )
+            filters.append(f"text={text!r}")
+
+        limit = max(1, min(int(limit), LIST_MAX_LIMIT))
+        try:
+            statements = keyset_statements(statement, sort="due_date", cursor=page_token or None)
+        except InvalidCursor:
+            return "Error: Invalid page_token. Call list_todos again without it."
+        todos, has_more = fetch_page_sync(self.session, statements, limit)
+
+        self._log_action("list_todos", ", ".join(filters) or None, f"Listed {len(todos)} todos")
         if not todos:
+            if filters or page_token:
+                return "No matching todos."
             return "You have no todos."
-        
-        result = "Your todos:\n"
+
+        result = "Your todos (id. [status] title | due | description):\n"
         for todo in todos:
-            status = "[x]" if todo.status == "completed" else "[ ]"
-            result += f"{todo.id}. {status} {todo.title} - {todo.description or ''}\n"
+            result += _todo_line(todo)
+        if has_more:
+            result += f"More todos match; call again with page_token='{encode_cursor('due_date', todos[-1])}'.\n"
+        return result
+
+    def search_todos(self, query: str, limit: int = 10) -> str:
+        """Finds the current user's todos whose title or description contains the
+        given words, best match first. Use it to find the ID of a todo the user
+        describes, e.g. 'the milk one'.
         
-        self._log_action("list_todos", None, f"Listed {len(todos)} todos")
+        Args:
+            query: Words to look for, e.g. 'milk'.
+            limit: How many todos to return, at most 50.
+        """
+        statement = search_statement(self.session.get_bind().dialect.name, self.user.id, query)
+        todos = []
+        if statement is not None:
+            todos = self.session.exec(statement.limit(max(1, min(int(limit), LIST_MAX_LIMIT)))).all()
+
+        self._log_action("search_todos", f"Query: {query}", f"Found {len(todos)} todos")
+        if not todos:
+            return f"No todos match '{query}'."
+
+        result = "Matching todos, best first (id. [status] title | due | description):\n"
+        for todo in todos:
+            result += _todo_line(todo)
         return result
 
     def update_todo(self, todo_id: int, title: Optional[str] = None, description: Optional[str] = None) -> str:
@@ -107,15 +200,5 @@ class AiTools:
         return f"Todo {todo_id} deleted successfully."
 
     def _log_action(self, action: str, input_data: Optional[str], result: Optional[str]):
-        # Simple logging to DB
-        try:
-            log_entry = AiAuditLog(
-                user_id=self.user.id,
-                action=action,
-                input_data=input_data,
-                result=result
-            )
-            self.session.add(log_entry)
-            self.session.commit()
-        except Exception as e:
-            print(f"Failed to log AI action: {e}")
+        # Buffered and written outside this session, off the request path
+        self.audit.record(self.user.id, action, input_data, result)
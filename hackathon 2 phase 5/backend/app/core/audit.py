@@ -0,0 +1,98 @@
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import insert
+
+from app.core.batching import BatchWorker
+from app.core.config import settings
+from app.models.audit_log import AiAuditLog
+
+logger = logging.getLogger(__name__)
+
+class AuditSink(BatchWorker):
+    """
+    Buffers AiAuditLog entries in memory and writes them from a background
+    thread with multi-row inserts on its own connection, once
+    `batch_size` entries are waiting or `flush_interval` has passed.
+
+    The buffer is bounded. When it is full, the "newest" drop policy
+    discards the incoming entry and "oldest" evicts the oldest buffered one.
+    """
+
+    thread_name = "audit-sink"
+
+    def __init__(
+        self,
+        engine=None,
+        max_queue: int = settings.AUDIT_QUEUE_SIZE,
+        batch_size: int = settings.AUDIT_BATCH_SIZE,
+        flush_interval: float = settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+        drop_policy: str = settings.AUDIT_DROP_POLICY,
+        enabled: bool = settings.AUDIT_ENABLED,
+    ):
+        if drop_policy not in ("newest", "oldest"):
+            raise ValueError(f"Unknown audit drop policy: {drop_policy}")
+        super().__init__(max_queue, batch_size, flush_interval)
+        self.engine = engine
+        self.drop_policy = drop_policy
+        self.enabled = enabled
+        self.recorded = 0
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def record(self, user_id: int, action: str, input_data: Optional[str], result: Optional[str]) -> bool:
+        """
+        Queues an audit entry without blocking. Returns False if an entry
+        was dropped to make room or this one was.
+        """
+        if not self.enabled:
+            return False
+        entry = {
+            "user_id": user_id,
+            "action": action,
+            "input_data": input_data,
+            "result": result,
+            "timestamp": datetime.utcnow(),
+        }
+        with self._stats_lock:
+            self.recorded += 1
+        if self.offer(entry, evict_oldest=self.drop_policy == "oldest"):
+            return True
+        with self._stats_lock:
+            self.dropped += 1
+        logger.warning(f"Audit buffer full, dropped the {self.drop_policy} entry")
+        return False
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "buffered": self._queue.qsize(),
+                "recorded": self.recorded,
+                "written": self.written,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "batches": self.batches,
+            }
+
+    def handle_batch(self, batch: list):
+        if self.engine is None:
+            from app.db.session import engine
+            self.engine = engine
+
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(insert(AiAuditLog), batch)
+            with self._stats_lock:
+                self.batches += 1
+                self.written += len(batch)
+        except Exception as e:
+            with self._stats_lock:
+                self.batches += 1
+                self.failed += len(batch)
+            logger.error(f"Failed to write {len(batch)} audit entries: {e}")
+
+audit_sink = AuditSink()
@@ -0,0 +1,105 @@
+import queue
+import threading
+import time
+from typing import Optional
+
+_STOP = object()
+
+class BatchWorker:
+    """
+    Bounded in-memory queue drained by a background thread, started on first
+    use. The thread hands items to handle_batch() in batches of up to
+    `batch_size`, waiting at most `linger` seconds for a batch to fill.
+    Subclasses implement handle_batch(); offer() never blocks.
+    """
+
+    thread_name = "batch-worker"
+
+    def __init__(self, max_queue: int, batch_size: int, linger: float):
+        self.batch_size = batch_size
+        self.linger = linger
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Counters are updated from callers' threads and the worker
+        self._stats_lock = threading.Lock()
+
+    def offer(self, item, evict_oldest: bool = False) -> bool:
+        """
+        Queues an item. When the queue is full, drops it, or with
+        `evict_oldest` drops the oldest queued item to make room. Returns
+        False if anything was dropped.
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            pass
+        if evict_oldest:
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self._queue.put_nowait(item)
+            except (queue.Empty, queue.Full):
+                pass
+        return False
+
+    def handle_batch(self, batch: list):
+        raise NotImplementedError
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every queued item has been handled or dropped.
+        """
+        if self._thread is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """
+        Handles queued items and stops the worker. Called on shutdown.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self.handle_batch(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
@@ -0,0 +1,138 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models.user import User
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds.
+    An entry may be given a shorter TTL of its own.
+
+    With `max_bytes`, least recently used entries are also evicted while
+    the total `weigh(value)` of all entries exceeds it.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        max_bytes: Optional[int] = None,
+        weigh: Callable[[Any], int] = lambda value: 0,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._weigh = weigh
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, weight = entry
+            if expires_at <= self._clock():
+                del self._data[key]
+                self.bytes -= weight
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        weight = self._weigh(value)
+        if self.max_bytes is not None and weight > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._data[key] = (value, self._clock() + ttl, weight)
+            self.bytes += weight
+            while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= evicted[2]
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+# Verified JWT claims, keyed by a SHA-256 digest of the token. Entries expire
+# with the token itself; see security.decode_token.
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_MAX_TTL_SECONDS)
+
+# Authenticated users, keyed by id. Entries are column snapshots rather than
+# session-bound instances so they can be shared across requests.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+# Chat replies to read-only questions, keyed by (user id, todo version,
+# normalized message); see AiService. Weighed by reply length.
+response_cache = TTLCache(
+    maxsize=settings.AI_RESPONSE_CACHE_SIZE,
+    ttl=settings.AI_RESPONSE_CACHE_TTL_SECONDS,
+    max_bytes=settings.AI_RESPONSE_CACHE_MAX_BYTES,
+    weigh=lambda reply: len(reply.encode()),
+)
+
+def get_cached_user(user_id: int) -> Optional[User]:
+    data = user_cache.get(user_id)
+    if data is None:
+        return None
+    return User.model_validate(data)
+
+def cache_user(user: User):
+    user_cache.set(user.id, user.model_dump())
+
+def invalidate_user(user_id: int):
+    """
+    Drops a cached user. Call after deactivating a user or changing their
+    profile outside the ORM; ORM updates and deletes are handled below.
+    """
+    user_cache.invalidate(user_id)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: User):
+    invalidate_user(target.id)
@@ -11,8 +11,101 @@ class Settings:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "changethis_secret_key_extremely_insecure_for_dev")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # /internal endpoints require this token in the X-Internal-Token header;
+    # they are disabled while it is unset
+    INTERNAL_API_TOKEN: Optional[str] = os.getenv("INTERNAL_API_TOKEN")
+
+    # Password hashing (app/core/hashing.py). Changing BCRYPT_ROUNDS rehashes
+    # existing passwords on their next login
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(2, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
 
+    # Connection pooling. "server" keeps a pool per process; "serverless" opens
+    # a connection per session and leaves pooling to PgBouncer / Neon's pooler
+    DB_POOL_PROFILE: str = os.getenv("DB_POOL_PROFILE", "server")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: int = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    # Neon closes idle connections after 5 minutes
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "280"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
+
+    # Background event publisher (app/events/publisher.py)
+    EVENT_PUBLISHING_ENABLED: bool = os.getenv("EVENT_PUBLISHING_ENABLED", "true").lower() == "true"
+    EVENT_QUEUE_SIZE: int = int(os.getenv("EVENT_QUEUE_SIZE", "10000"))
+    EVENT_BATCH_SIZE: int = int(os.getenv("EVENT_BATCH_SIZE", "100"))
+    EVENT_BATCH_LINGER_MS: int = int(os.getenv("EVENT_BATCH_LINGER_MS", "20"))
+
+    # Transactional outbox relay (app/events/outbox.py)
+    OUTBOX_RELAY_ENABLED: bool = os.getenv("OUTBOX_RELAY_ENABLED", "true").lower() == "true"
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_POLL_INTERVAL_MS: int = int(os.getenv("OUTBOX_POLL_INTERVAL_MS", "500"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+    OUTBOX_BACKOFF_BASE_SECONDS: float = float(os.getenv("OUTBOX_BACKOFF_BASE_SECONDS", "1"))
+    OUTBOX_BACKOFF_MAX_SECONDS: float = float(os.getenv("OUTBOX_BACKOFF_MAX_SECONDS", "300"))
+
+    # Realtime push of todo changes (app/events/hub.py). Limits are per
+    # worker; a heartbeat goes out after REALTIME_HEARTBEAT_SECONDS of quiet
+    REALTIME_QUEUE_SIZE: int = int(os.getenv("REALTIME_QUEUE_SIZE", "64"))
+    REALTIME_MAX_CONNECTIONS: int = int(os.getenv("REALTIME_MAX_CONNECTIONS", "10000"))
+    REALTIME_MAX_CONNECTIONS_PER_USER: int = int(os.getenv("REALTIME_MAX_CONNECTIONS_PER_USER", "20"))
+    REALTIME_HEARTBEAT_SECONDS: float = float(os.getenv("REALTIME_HEARTBEAT_SECONDS", "25"))
+    # Dapr's app API token: the sidecar sends it in the dapr-api-token header,
+    # and the subscriptions that create todos or push to connections reject
+    # calls without it. They are disabled while it is unset
+    APP_API_TOKEN: Optional[str] = os.getenv("APP_API_TOKEN")
+
+    # Streaming todo export / import (app/services/transfer.py): rows fetched
+    # from the server-side cursor, and inserted, per round trip
+    TODO_EXPORT_BATCH_SIZE: int = int(os.getenv("TODO_EXPORT_BATCH_SIZE", "1000"))
+    TODO_IMPORT_BATCH_SIZE: int = int(os.getenv("TODO_IMPORT_BATCH_SIZE", "5000"))
+
+    # Reminder scan (app/services/scheduler.py)
+    REMINDER_CHUNK_SIZE: int = int(os.getenv("REMINDER_CHUNK_SIZE", "500"))
+
+    # Recurring todos (app/services/recurring.py): the recurrence cron creates
+    # each series' occurrences RECURRENCE_HORIZON_DAYS ahead, expanding
+    # RECURRENCE_CHUNK_SIZE series per batch
+    RECURRENCE_HORIZON_DAYS: int = int(os.getenv("RECURRENCE_HORIZON_DAYS", "7"))
+    RECURRENCE_CHUNK_SIZE: int = int(os.getenv("RECURRENCE_CHUNK_SIZE", "1000"))
+
+    # Chat memory (app/core/conversation.py). "dapr" keeps history in the
+    # statestore component; "memory" keeps it in this process only
+    CHAT_MEMORY_STORE: str = os.getenv("CHAT_MEMORY_STORE", "dapr")
+    CHAT_MEMORY_TOKEN_BUDGET: int = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "2000"))
+    CHAT_MEMORY_SUMMARY_TOKENS: int = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "400"))
+    CHAT_MEMORY_TTL_SECONDS: int = int(os.getenv("CHAT_MEMORY_TTL_SECONDS", str(7 * 24 * 3600)))
+    CHAT_MEMORY_LOCAL_SIZE: int = int(os.getenv("CHAT_MEMORY_LOCAL_SIZE", "10000"))
+
+    # Answer simple chat commands locally instead of through Gemini
+    # (app/core/intents.py)
+    AI_FAST_PATH_ENABLED: bool = os.getenv("AI_FAST_PATH_ENABLED", "true").lower() == "true"
+
+    # Chat replies to read-only questions, reused until the user's todos
+    # change or the TTL passes (relative dates like "today" drift)
+    AI_RESPONSE_CACHE_SIZE: int = int(os.getenv("AI_RESPONSE_CACHE_SIZE", "10000"))
+    AI_RESPONSE_CACHE_MAX_BYTES: int = int(os.getenv("AI_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    AI_RESPONSE_CACHE_TTL_SECONDS: int = int(os.getenv("AI_RESPONSE_CACHE_TTL_SECONDS", "300"))
+
+    # Buffered AI audit log writer (app/core/audit.py). AUDIT_DROP_POLICY is
+    # "newest" or "oldest"
+    AUDIT_ENABLED: bool = os.getenv("AUDIT_ENABLED", "true").lower() == "true"
+    AUDIT_QUEUE_SIZE: int = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+    AUDIT_BATCH_SIZE: int = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+    AUDIT_FLUSH_INTERVAL_MS: int = int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "1000"))
+    AUDIT_DROP_POLICY: str = os.getenv("AUDIT_DROP_POLICY", "newest")
+
+    # Authenticated-user cache used by deps.get_current_user
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "10000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+
+    # Verified-token cache; entries never outlive the token's own exp claim
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+    TOKEN_CACHE_MAX_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_MAX_TTL_SECONDS", "3600"))
     
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list = []
@@ -0,0 +1,255 @@
+try:
+    from dapr.clients import DaprClient
+except ImportError:
+    DaprClient = None
+
+import json
+import logging
+import threading
+from typing import List, Optional, Tuple
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+STATE_STORE_NAME = "statestore"
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text; close enough to
+    # bound prompt size without a tokenizer round trip
+    return len(text) // 4 + 1
+
+class MemoryStateStore:
+    """
+    Process-local stand-in for the Dapr statestore, used where there is no
+    sidecar (tests, local runs, serverless). ETags are version counters.
+    """
+
+    def __init__(self, maxsize: int = settings.CHAT_MEMORY_LOCAL_SIZE, ttl: float = settings.CHAT_MEMORY_TTL_SECONDS):
+        self._data = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None, None
+        value, version = entry
+        return value, str(version)
+
+    def save(self, key: str, value: str, etag: Optional[str] = None) -> bool:
+        with self._lock:
+            entry = self._data.get(key)
+            current = str(entry[1]) if entry else None
+            if etag != current:
+                return False
+            self._data.set(key, (value, entry[1] + 1 if entry else 1))
+            return True
+
+    def delete(self, key: str):
+        self._data.invalidate(key)
+
+class DaprStateStore:
+    """
+    Conversation state in the Dapr `statestore` component over one
+    long-lived client. Writes carry the ETag they were read with, so
+    concurrent turns for the same user cannot overwrite each other.
+    """
+
+    def __init__(self, store_name: str = STATE_STORE_NAME, client_factory=DaprClient, ttl: int = settings.CHAT_MEMORY_TTL_SECONDS):
+        self.store_name = store_name
+        self.client_factory = client_factory
+        self.metadata = {"ttlInSeconds": str(ttl)}
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        response = self._call(lambda client: client.get_state(self.store_name, key))
+        if not response.data:
+            return None, None
+        return response.data.decode(), response.etag or None
+
+    def save(self, key: str, value: str, etag: Optional[str] = None) -> bool:
+        try:
+            self._call(lambda client: client.save_state(
+                self.store_name, key, value, etag=etag, state_metadata=self.metadata
+            ))
+        except Exception as e:
+            if etag is None:
+                raise
+            # Most likely an ETag mismatch; the caller reloads and retries
+            logger.info(f"Conditional save of {key} failed: {e}")
+            return False
+        return True
+
+    def delete(self, key: str):
+        self._call(lambda client: client.delete_state(self.store_name, key))
+
+    def _call(self, fn):
+        with self._lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            client = self._client
+        try:
+            return fn(client)
+        except Exception:
+            # The sidecar may have restarted; reconnect on the next call
+            with self._lock:
+                if self._client is client:
+                    self._client = None
+            try:
+                client.close()
+            except Exception:
+                pass
+            raise
+
+class Conversation:
+    """
+    One user's chat memory: a running summary of compacted turns plus the
+    most recent turns verbatim. Turns added since loading are kept apart so
+    they can be replayed onto a newer copy after a write conflict.
+    """
+
+    def __init__(self, user_id: int, summary: str = "", turns: Optional[List[dict]] = None, etag: Optional[str] = None):
+        self.user_id = user_id
+        self.summary = summary
+        self.turns = turns or []
+        self.etag = etag
+        self.pending: List[dict] = []
+
+    @property
+    def key(self) -> str:
+        return f"chat-history-{self.user_id}"
+
+    def add_turn(self, message: str, reply: str):
+        turn = {"user": message, "model": reply}
+        self.turns.append(turn)
+        self.pending.append(turn)
+
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(
+            estimate_tokens(turn["user"]) + estimate_tokens(turn["model"]) for turn in self.turns
+        )
+
+    def compact(self, token_budget: int, summary_tokens: int) -> int:
+        """
+        Folds the oldest turns into the summary until the conversation fits
+        in `token_budget`. The most recent turn is always kept verbatim.
+        Returns the number of turns compacted.
+        """
+        compacted = 0
+        while len(self.turns) > 1 and self.tokens() > token_budget:
+            turn = self.turns.pop(0)
+            line = f"- User: {_clip(turn['user'], 160)} / Assistant: {_clip(turn['model'], 240)}"
+            self.summary = f"{self.summary}\n{line}" if self.summary else line
+            compacted += 1
+        # Keep the newest summary lines when the summary itself grows too big
+        max_chars = summary_tokens * 4
+        if len(self.summary) > max_chars:
+            self.summary = self.summary[-max_chars:].split("\n", 1)[-1]
+        return compacted
+
+    def history(self) -> List[dict]:
+        """
+        Gemini chat history for this conversation.
+        """
+        contents = []
+        if self.summary:
+            contents.append({"role": "user", "parts": [f"Summary of our earlier conversation:\n{self.summary}"]})
+            contents.append({"role": "model", "parts": ["Noted."]})
+        for turn in self.turns:
+            contents.append({"role": "user", "parts": [turn["user"]]})
+            contents.append({"role": "model", "parts": [turn["model"]]})
+        return contents
+
+    def dump(self) -> str:
+        return json.dumps({"summary": self.summary, "turns": self.turns})
+
+    @classmethod
+    def load(cls, user_id: int, value: Optional[str], etag: Optional[str]) -> "Conversation":
+        data = json.loads(value) if value else {}
+        return cls(user_id, data.get("summary", ""), data.get("turns", []), etag)
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+class ConversationMemory:
+    """
+    Loads and saves Conversations, compacting them to the token budget
+    before every write. Store failures degrade to a stateless chat.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        token_budget: int = settings.CHAT_MEMORY_TOKEN_BUDGET,
+        summary_tokens: int = settings.CHAT_MEMORY_SUMMARY_TOKENS,
+        max_attempts: int = 3,
+    ):
+        self.store = store
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_attempts = max_attempts
+        self.loads = 0
+        self.saves = 0
+        self.conflicts = 0
+        self.compactions = 0
+        self.errors = 0
+
+    def _get_store(self):
+        if self.store is None:
+            if settings.CHAT_MEMORY_STORE == "dapr" and DaprClient is not None:
+                self.store = DaprStateStore()
+            else:
+                self.store = MemoryStateStore()
+        return self.store
+
+    def load(self, user_id: int) -> Conversation:
+        self.loads += 1
+        try:
+            value, etag = self._get_store().get(Conversation(user_id).key)
+            return Conversation.load(user_id, value, etag)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Failed to load chat history for user {user_id}: {e}")
+            return Conversation(user_id)
+
+    def save(self, conversation: Conversation) -> bool:
+        if not conversation.pending:
+            return True
+        store = self._get_store()
+        try:
+            for _ in range(self.max_attempts):
+                self.compactions += conversation.compact(self.token_budget, self.summary_tokens)
+                if store.save(conversation.key, conversation.dump(), conversation.etag):
+                    self.saves += 1
+                    conversation.pending = []
+                    return True
+                # Another request for this user saved first: replay our
+                # turns onto its copy
+                self.conflicts += 1
+                value, etag = store.get(conversation.key)
+                latest = Conversation.load(conversation.user_id, value, etag)
+                for turn in conversation.pending:
+                    latest.add_turn(turn["user"], turn["model"])
+                conversation.summary, conversation.turns, conversation.etag = latest.summary, latest.turns, latest.etag
+        except Exception as e:
+            logger.error(f"Failed to save chat history for user {conversation.user_id}: {e}")
+        self.errors += 1
+        return False
+
+    def clear(self, user_id: int):
+        self._get_store().delete(Conversation(user_id).key)
+
+    def stats(self) -> dict:
+        return {
+            "store": type(self.store).__name__ if self.store else None,
+            "loads": self.loads,
+            "saves": self.saves,
+            "conflicts": self.conflicts,
+            "compactions": self.compactions,
+            "errors": self.errors,
+        }
+
+conversation_memory = ConversationMemory()
@@ -0,0 +1,128 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+# min/max rounds pin the cost factor, so verify_and_update flags hashes made
+# with any other cost for rehashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed_password)
+
+class PasswordHasherBusy(Exception):
+    pass
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated process pool so hashing neither blocks the
+    event loop nor takes Starlette thread-pool workers away from other
+    endpoints. Concurrency is the pool size. At most `max_pending` calls may
+    be in flight or queued; beyond that PasswordHasherBusy is raised.
+
+    With workers=0 hashing runs on the shared thread pool instead, for
+    platforms without multiprocessing support such as serverless runtimes.
+
+    A worker that dies (OOM kill, segfault) breaks the whole pool; it is
+    replaced with a fresh one and the call retried once.
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS, max_pending: int = settings.PASSWORD_HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns (valid, new_hash). new_hash is set when the stored hash uses
+        a stale cost factor and should replace it.
+        """
+        return await self._submit(_verify_and_update, password, hashed_password)
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy()
+            self.pending += 1
+        start = time.perf_counter()
+        try:
+            if self.workers > 0:
+                loop = asyncio.get_running_loop()
+                executor = self._get_executor()
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except BrokenProcessPool:
+                    self._replace_executor(executor)
+                    return await loop.run_in_executor(self._get_executor(), fn, *args)
+            return await run_in_threadpool(fn, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+                self.busy_seconds += time.perf_counter() - start
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn: forking would copy the publisher and relay threads' locks
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._executor
+
+    def _replace_executor(self, broken: Executor):
+        with self._lock:
+            # Concurrent calls on the same broken pool replace it once
+            if self._executor is not broken:
+                return
+            self._executor = None
+            self.restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers) if self.workers else 0,
+                "max_pending": self.max_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "restarts": self.restarts,
+                "avg_ms": self.busy_seconds / self.completed * 1000 if self.completed else 0.0,
+            }
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,144 @@
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, List, Optional, Tuple
+
+from app.core.ai_tools import AiTools
+from app.core.config import settings
+
+# (tool name, arguments) for an AiTools call
+Intent = Tuple[str, dict]
+
+_TODO = r"(?:the\s+)?(?:todo|task|item)?\s*(?:number\s+|no\.?\s*|#)?(?P<id>\d+)"
+_DONE = r"(?:done|complete|completed|finished)"
+_OPEN = r"(?:pending|not\s+done|incomplete|undone|open)"
+_TODOS = r"(?:todos|to-dos|tasks|todo\s+list|to-do\s+list|list)"
+
+def _mark(status: str) -> Callable[[re.Match], Intent]:
+    return lambda m: ("mark_todo", {"todo_id": int(m.group("id")), "status": status})
+
+def _title(m: re.Match) -> Intent:
+    title = m.group("title").strip().strip("\"'").strip()
+    return "create_todo", {"title": title[:1].upper() + title[1:]}
+
+def _list(m: re.Match) -> Intent:
+    status = m.groupdict().get("status")
+    if status:
+        status = "completed" if re.fullmatch(_DONE, status) else "pending"
+        return "list_todos", {"status": status}
+    return "list_todos", {}
+
+# Each pattern must match the whole (normalized) message
+RULES: List[Tuple[re.Pattern, Callable[[re.Match], Intent]]] = [(re.compile(pattern, re.IGNORECASE), build) for pattern, build in [
+    (rf"(?:mark|set|flag)\s+{_TODO}\s+(?:as\s+)?{_DONE}", _mark("completed")),
+    (rf"(?:complete|finish|check\s+off|tick\s+off)\s+{_TODO}", _mark("completed")),
+    (rf"(?:mark|set|flag)\s+{_TODO}\s+(?:as\s+)?{_OPEN}", _mark("pending")),
+    (rf"(?:reopen|uncheck|untick)\s+{_TODO}", _mark("pending")),
+    (rf"(?:delete|remove)\s+{_TODO}", lambda m: ("delete_todo", {"todo_id": int(m.group("id"))})),
+    (rf"(?:list|show|show\s+me|display|get|what\s+are)(?:\s+all)?(?:\s+(?:my|the))?(?:\s+(?P<status>{_DONE}|{_OPEN}))?\s+{_TODOS}", _list),
+    (rf"(?:my|all)\s+{_TODOS}", _list),
+    (r"(?:add|create)(?:\s+a)?(?:\s+new)?\s+(?:todo|task)(?:\s+(?:called|named|titled|to)|\s*:)?\s+(?P<title>.+)", _title),
+]]
+
+# Messages that combine several requests or depend on earlier context are
+# left to the model
+_AMBIGUOUS = re.compile(
+    r"\b(?:and|then|also|after|before|but|it|that|this|them|those)\b|[;\n]|\?.",
+    re.IGNORECASE,
+)
+_POLITE = re.compile(r"^(?:please|pls|can\s+you|could\s+you|would\s+you)\s+|\s+(?:please|pls|thanks|thank\s+you)$", re.IGNORECASE)
+
+# Words that make a message depend on earlier turns of the conversation
+_CONTEXTUAL = re.compile(
+    r"\b(?:it|that|this|these|those|them|they|else|again|more|other|others|previous|above|same)\b",
+    re.IGNORECASE,
+)
+
+def is_self_contained(text: str) -> bool:
+    return not _CONTEXTUAL.search(text)
+
+def normalize(message: str) -> str:
+    text = " ".join(message.split()).rstrip(".!?")
+    previous = None
+    while previous != text:
+        previous, text = text, _POLITE.sub("", text).strip()
+    return text
+
+def parse(message: str) -> Optional[Intent]:
+    """
+    Returns the tool call for a simple, unambiguous command, or None when
+    the message should go to the model.
+    """
+    text = normalize(message)
+    if not text or len(text) > 200:
+        return None
+    for pattern, build in RULES:
+        match = pattern.fullmatch(text)
+        if match is None:
+            continue
+        # A quoted title may contain anything
+        checked = match.group("title") if build is _title else text
+        if _AMBIGUOUS.search(checked) and not re.fullmatch(r"([\"']).+\1", checked.strip()):
+            return None
+        return build(match)
+    return None
+
+class IntentRouter:
+    """
+    Serves simple commands straight from AiTools without a model round trip.
+    Counts hits, fall-throughs and the latency of both paths.
+    """
+
+    def __init__(self, enabled: bool = settings.AI_FAST_PATH_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.local_seconds = 0.0
+        self.model_seconds = 0.0
+        self.model_calls = 0
+        self.intents: Counter = Counter()
+
+    def match(self, message: str) -> Optional[Intent]:
+        intent = parse(message) if self.enabled else None
+        if intent is None:
+            with self._lock:
+                self.misses += 1
+        return intent
+
+    def execute(self, intent: Intent, tools: AiTools) -> str:
+        name, args = intent
+        start = time.perf_counter()
+        try:
+            return getattr(tools, name)(**args)
+        finally:
+            with self._lock:
+                self.hits += 1
+                self.intents[name] += 1
+                self.local_seconds += time.perf_counter() - start
+
+    def record_model(self, seconds: float):
+        with self._lock:
+            self.model_calls += 1
+            self.model_seconds += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+                "intents": dict(self.intents),
+                "local_avg_ms": self.local_seconds / self.hits * 1000 if self.hits else 0.0,
+                "model_avg_ms": self.model_seconds / self.model_calls * 1000 if self.model_calls else 0.0,
+                # Model time the hits would have cost at the observed average
+                "model_ms_saved": (
+                    self.hits * (self.model_seconds / self.model_calls) * 1000 - self.local_seconds * 1000
+                    if self.model_calls else 0.0
+                ),
+            }
+
+intent_router = IntentRouter()
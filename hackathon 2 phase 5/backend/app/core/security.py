@@ -1,10 +1,12 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional, Union, Any
 from jose import jwt
-from passlib.context import CryptContext
+from app.core.cache import token_cache
 from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.hashing import pwd_context
+from app.schemas.token import TokenPayload
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -31,3 +33,20 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timed
     to_encode = {"sub": str(subject), "exp": expire, "type": "refresh"}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
+
+def decode_token(token: str) -> TokenPayload:
+    """
+    Verifies a JWT and returns its claims. Verified claims are cached by token
+    digest until the token expires, so the signature check only runs on a miss.
+    Raises jwt.JWTError or pydantic.ValidationError for invalid tokens.
+    """
+    key = hashlib.sha256(token.encode()).digest()
+    token_data = token_cache.get(key)
+    if token_data is not None:
+        return token_data
+
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    token_data = TokenPayload(**payload)
+    if token_data.exp is not None:
+        token_cache.set(key, token_data, ttl=token_data.exp - time.time())
+    return token_data
@@ -0,0 +1,7 @@
+import json
+
+def sse(event: str, data: dict) -> str:
+    """
+    Formats one Server-Sent Events message with a JSON payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
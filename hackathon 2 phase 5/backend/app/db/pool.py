@@ -0,0 +1,75 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class PoolStats:
+    """
+    Connection-pool counters for one engine: how long checkouts wait for a
+    connection, and how often connections are opened, closed or invalidated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.closes = 0
+        self.invalidations = 0
+        self.checkout_wait_total = 0.0
+        self.checkout_wait_max = 0.0
+        self.engine = None
+
+    def record_checkout_wait(self, seconds: float):
+        with self._lock:
+            self.checkout_wait_total += seconds
+            self.checkout_wait_max = max(self.checkout_wait_max, seconds)
+
+    def _count(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = self.checkouts or 1
+            data = {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "closes": self.closes,
+                "invalidations": self.invalidations,
+                "checkout_wait_avg_ms": self.checkout_wait_total / waits * 1000,
+                "checkout_wait_max_ms": self.checkout_wait_max * 1000,
+            }
+        if self.engine is not None:
+            data["status"] = self.engine.pool.status()
+        return data
+
+def timed_pool_class(base, stats: PoolStats):
+    """
+    Subclasses a pool class so every checkout records how long it waited,
+    including time spent opening a new connection.
+    """
+    class TimedPool(base):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                stats.record_checkout_wait(time.perf_counter() - start)
+
+    TimedPool.__name__ = TimedPool.__qualname__ = f"Timed{base.__name__}"
+    return TimedPool
+
+def instrument(engine: Engine, stats: PoolStats):
+    """
+    Attaches pool event listeners that feed `stats`. Pass the sync_engine of
+    an AsyncEngine.
+    """
+    stats.engine = engine
+    event.listen(engine, "checkout", lambda *args: stats._count("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats._count("checkins"))
+    event.listen(engine, "connect", lambda *args: stats._count("connects"))
+    event.listen(engine, "close", lambda *args: stats._count("closes"))
+    event.listen(engine, "invalidate", lambda *args: stats._count("invalidations"))
@@ -1,5 +1,16 @@
+from sqlalchemy import false, insert, inspect, literal, select, text
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings
+from app.db.pool import PoolStats, instrument, timed_pool_class
+from app.models.todo import Todo, TodoChange
+# Register the flush hook that keeps per-user todo versions current and the
+# DDL hooks that create the full-text search index with the todo table
+from app.services import versions  # noqa: F401
+from app.services.search import install_search_index
 
 # Verify DATABASE_URL is set
 if not settings.DATABASE_URL:
@@ -9,25 +20,122 @@ if not settings.DATABASE_URL:
 # Handle 'postgres://' case for SQLAlchemy compatibility and use psycopg2 driver
 connection_string = str(settings.DATABASE_URL) if settings.DATABASE_URL else ""
 
+def async_connection_url(url: str):
+    """
+    Maps a sync database URL onto its async driver: asyncpg for Postgres and
+    aiosqlite for SQLite. asyncpg takes SSL through connect_args instead of
+    libpq's sslmode/channel_binding query parameters, so those are dropped.
+    """
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url.difference_update_query(["sslmode", "channel_binding"]).set(
+        drivername="postgresql+asyncpg"
+    )
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+
+def engine_options(url: URL, is_async: bool, stats: PoolStats) -> dict:
+    """
+    Keyword arguments for create_engine / create_async_engine, driven by the
+    DB_* settings. Pool tuning only applies to Postgres.
+    """
+    options = {"echo": settings.DB_ECHO}
+    if url.get_backend_name() != "postgresql":
+        return options
+
+    connect_args = {"ssl": "require"} if is_async else {"sslmode": "require"}
+    if settings.DB_POOL_PROFILE == "serverless":
+        # A connection per session, returned to PgBouncer / the Neon pooler on
+        # close. The pooler hands out server connections per transaction, so
+        # asyncpg must not cache prepared statements, and startup parameters
+        # such as statement_timeout are rejected: set it on the role instead.
+        options["poolclass"] = timed_pool_class(NullPool, stats)
+        if is_async:
+            connect_args.update(statement_cache_size=0, prepared_statement_cache_size=0)
+    else:
+        options.update(
+            poolclass=timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, stats),
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+            pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+            pool_pre_ping=settings.DB_POOL_PRE_PING,
+        )
+        timeout = settings.DB_STATEMENT_TIMEOUT_MS
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(timeout)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={timeout}"
+
+    options["connect_args"] = connect_args
+    return options
+
 if connection_string:
     if "postgresql+psycopg2" not in connection_string and "postgresql://" not in connection_string:
         connection_string = connection_string.replace("postgres://", "postgresql+psycopg2://")
     elif "postgres://" in connection_string and "postgresql+psycopg2" not in connection_string:
         connection_string = connection_string.replace("postgres://", "postgresql+psycopg2://")
 
-    # Create engine with SSL for Neon/psycopg2
-    engine = create_engine(
-        connection_string, 
-        echo=True,
-        connect_args={"sslmode": "require"}
-    )
+    # Create engines with SSL for Neon
+    sync_url = make_url(connection_string)
+    engine = create_engine(sync_url, **engine_options(sync_url, False, sync_pool_stats))
+    instrument(engine, sync_pool_stats)
+
+    async_url = async_connection_url(connection_string)
+    async_engine = create_async_engine(async_url, **engine_options(async_url, True, async_pool_stats))
+    instrument(async_engine.sync_engine, async_pool_stats)
 else:
     engine = None
+    async_engine = None
     print("WARNING: DATABASE_URL not set. Database operations will fail.")
 
 def get_session():
     with Session(engine) as session:
         yield session
 
+async def get_async_session():
+    # Attributes stay loaded after commit; lazy refreshes would need a
+    # round trip that async code cannot make implicitly
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+def add_missing_columns(connection):
+    """
+    create_all skips tables that already exist, so columns added to a model
+    since are added here. Only nullable columns can be added this way.
+    """
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in SQLModel.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            connection.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN "
+                f"{preparer.format_column(column)} {column.type.compile(connection.dialect)}"
+            ))
+
 def create_db_and_tables():
+    had_changes = inspect(engine).has_table(TodoChange.__tablename__)
+    with engine.begin() as connection:
+        add_missing_columns(connection)
     SQLModel.metadata.create_all(engine)
+    # create_all skips tables that already exist, so indexes added to an
+    # existing model are created here
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        install_search_index(connection)
+        if not had_changes:
+            # Todos written before the change feed existed: give each a
+            # change row at seq 0 so a first sync returns them
+            connection.execute(insert(TodoChange).from_select(
+                ["user_id", "todo_id", "seq", "deleted"],
+                select(Todo.user_id, Todo.id, literal(0), false()).where(Todo.user_id.is_not(None)),
+            ))
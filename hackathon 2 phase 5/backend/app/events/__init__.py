@@ -1,2 +1 @@
 from .publisher import publish_event
-from .subscriber import router as events_router
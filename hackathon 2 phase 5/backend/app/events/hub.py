@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import threading
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+from app.events.publisher import EventPublisher, publisher
+
+logger = logging.getLogger(__name__)
+
+# Broadcast topic telling every replica that a user's todos changed; see
+# dapr/components/pubsub-broadcast.yaml
+SYNC_TOPIC = "todo-sync"
+
+# Identifies this worker's own todo-sync messages when they come back
+INSTANCE_ID = uuid.uuid4().hex
+
+_EVICTED = object()
+
+class HubFull(Exception):
+    pass
+
+class Subscription:
+    """
+    One client connection's bounded message queue. Messages may be offered
+    from any thread; they are delivered on the loop that created it.
+    """
+
+    def __init__(self, user_id: int, queue_size: int):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.evicted = False
+        self.delivered = 0
+
+    def offer(self, message: dict, on_evict):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._offer(message, on_evict)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._offer, message, on_evict)
+        except RuntimeError:
+            # The loop is closed; the connection is gone with it
+            pass
+
+    def _offer(self, message: dict, on_evict):
+        if self.evicted:
+            return
+        try:
+            self.queue.put_nowait(message)
+            self.delivered += 1
+        except asyncio.QueueFull:
+            # Too slow to keep up: drop what is buffered and tell the reader
+            # to close. The client reconnects and catches up with
+            # GET /todos/changes.
+            self.evicted = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_EVICTED)
+            on_evict(self)
+
+    async def next(self, timeout: float) -> Optional[dict]:
+        """
+        The next message, or None if there was none within `timeout`.
+        Raises ConnectionAbortedError once the subscription was evicted.
+        """
+        try:
+            message = await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if message is _EVICTED:
+            raise ConnectionAbortedError("slow consumer")
+        return message
+
+class RealtimeHub:
+    """
+    Per-worker registry of open WebSocket / SSE connections, keyed by user.
+    publish() is non-blocking and thread-safe; each connection has its own
+    bounded queue, so one slow client cannot hold up the others or grow
+    memory without bound.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = settings.REALTIME_QUEUE_SIZE,
+        max_connections: int = settings.REALTIME_MAX_CONNECTIONS,
+        max_per_user: int = settings.REALTIME_MAX_CONNECTIONS_PER_USER,
+        event_publisher: EventPublisher = publisher,
+    ):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.max_per_user = max_per_user
+        self.publisher = event_publisher
+        self._subscriptions: Dict[int, Set[Subscription]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.connections = 0
+        self.published = 0
+        self.delivered = 0
+        self.evicted = 0
+        self.rejected = 0
+
+    def connect(self, user_id: int) -> Subscription:
+        """
+        Registers a connection. Must be called on the event loop serving it.
+        Raises HubFull when a worker or per-user limit is reached.
+        """
+        with self._lock:
+            if self.connections >= self.max_connections or len(self._subscriptions.get(user_id, ())) >= self.max_per_user:
+                self.rejected += 1
+                raise HubFull()
+            subscription = Subscription(user_id, self.queue_size)
+            self._subscriptions[user_id].add(subscription)
+            self.connections += 1
+            return subscription
+
+    def disconnect(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.user_id)
+            if subscriptions is None or subscription not in subscriptions:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscriptions[subscription.user_id]
+            self.connections -= 1
+            self.delivered += subscription.delivered
+
+    def publish(self, user_id: int, message: dict) -> int:
+        """
+        Queues `message` for every connection of the user in this worker.
+        Returns the number of connections it was offered to.
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(user_id, ()))
+            self.published += 1
+        for subscription in subscriptions:
+            subscription.offer(message, self._evict)
+        return len(subscriptions)
+
+    def notify_changed(self, user_id: int, version: int):
+        """
+        Tells the user's connections on every replica that their todos are
+        now at `version`. Clients fetch the delta from GET /todos/changes.
+        Called from after_commit hooks on the event loop, so it never
+        blocks: the todo-sync is dropped when the publisher queue is full,
+        and other replicas' clients catch up on their next change.
+        """
+        message = {"type": "todos.changed", "version": version}
+        self.publish(user_id, message)
+        self.publisher.publish(SYNC_TOPIC, {"user_id": user_id, "origin": INSTANCE_ID, **message})
+
+    def _evict(self, subscription: Subscription):
+        self.evicted += 1
+        logger.info(f"Evicted a slow realtime connection of user {subscription.user_id}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "users": len(self._subscriptions),
+                "published": self.published,
+                "delivered": self.delivered + sum(
+                    subscription.delivered for subscriptions in self._subscriptions.values() for subscription in subscriptions
+                ),
+                "evicted": self.evicted,
+                "rejected": self.rejected,
+            }
+
+hub = RealtimeHub()
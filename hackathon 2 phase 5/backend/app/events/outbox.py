@@ -0,0 +1,181 @@
+import json
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Optional
+
+from sqlalchemy import delete, exists, func
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.events.publisher import EventPublisher, publisher
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+def add_event(session, topic: str, data: dict, event_type: str = "com.hackathon.event"):
+    """
+    Records an event in the outbox as part of the caller's transaction. It is
+    published by the relay only once that transaction commits. Works with both
+    Session and AsyncSession.
+
+    Events about the same user are delivered in the order they were added.
+    """
+    ordering_key = f"user:{data['user_id']}" if data.get("user_id") is not None else topic
+    session.add(OutboxEvent(topic=topic, event_type=event_type, payload=json.dumps(data), ordering_key=ordering_key))
+
+class OutboxRelay:
+    """
+    Drains the outbox to the broker in id order. Each batch is claimed with
+    FOR UPDATE SKIP LOCKED, so several replicas can relay concurrently without
+    publishing the same row twice. Delivery is at-least-once: rows are
+    deleted only after the broker accepts them. Failed rows are retried with
+    exponential backoff and parked as 'dead' after OUTBOX_MAX_ATTEMPTS.
+
+    Rows with the same ordering key go out in id order. A row is held back
+    while an earlier row with its key is still pending: backing off, claimed
+    by another replica, or failed earlier in the same batch. Other keys are
+    not held up. A dead row no longer holds back the rows after it.
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        event_publisher: EventPublisher = publisher,
+        batch_size: int = settings.OUTBOX_BATCH_SIZE,
+        poll_interval: float = settings.OUTBOX_POLL_INTERVAL_MS / 1000,
+        max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+        backoff_base: float = settings.OUTBOX_BACKOFF_BASE_SECONDS,
+        backoff_max: float = settings.OUTBOX_BACKOFF_MAX_SECONDS,
+    ):
+        self.engine = engine
+        self.publisher = event_publisher
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.relayed = 0
+        self.failed = 0
+        self.dead = 0
+        self.batches = 0
+
+    def backoff(self, attempts: int) -> timedelta:
+        return timedelta(seconds=min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+
+    def relay_once(self) -> int:
+        """
+        Publishes one batch of due events. Returns the number of rows it
+        tried to publish.
+        """
+        if self.engine is None:
+            from app.db.session import engine
+            self.engine = engine
+
+        now = datetime.utcnow()
+        earlier = aliased(OutboxEvent)
+        with Session(self.engine) as session:
+            statement = (
+                select(OutboxEvent)
+                .where(OutboxEvent.status == "pending", OutboxEvent.next_attempt_at <= now)
+                # Not queued behind a row of its key that is backing off
+                .where(~exists().where(
+                    earlier.ordering_key == OutboxEvent.ordering_key,
+                    earlier.status == "pending",
+                    earlier.id < OutboxEvent.id,
+                    earlier.next_attempt_at > now,
+                ))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = session.exec(statement).all()
+            if not rows:
+                return 0
+
+            self.batches += 1
+            # Earliest pending row of each key that is not in this batch, such
+            # as one another replica is relaying
+            keys = {row.ordering_key for row in rows if row.ordering_key is not None}
+            blockers = dict(session.exec(
+                select(OutboxEvent.ordering_key, func.min(OutboxEvent.id))
+                .where(
+                    OutboxEvent.status == "pending",
+                    OutboxEvent.ordering_key.in_(keys),
+                    OutboxEvent.id.not_in([row.id for row in rows]),
+                )
+                .group_by(OutboxEvent.ordering_key)
+            ).all()) if keys else {}
+            rows = [row for row in rows if row.ordering_key not in blockers or row.id < blockers[row.ordering_key]]
+
+            published = []
+            held = set()
+            # Consecutive rows for the same topic go out as one bulk publish
+            for (topic, event_type), group in groupby(rows, key=lambda row: (row.topic, row.event_type)):
+                group = [row for row in group if row.ordering_key is None or row.ordering_key not in held]
+                if not group:
+                    continue
+                try:
+                    self.publisher.send_batch(topic, [json.loads(row.payload) for row in group], event_type)
+                    published.extend(row.id for row in group)
+                except Exception as e:
+                    self._defer(group, str(e), now)
+                    # Later rows with these keys wait for the failed ones
+                    held.update(row.ordering_key for row in group)
+
+            if published:
+                session.exec(delete(OutboxEvent).where(OutboxEvent.id.in_(published)))
+            session.commit()
+            self.relayed += len(published)
+            return len(rows)
+
+    def _defer(self, rows, error: str, now: datetime):
+        self.failed += len(rows)
+        for row in rows:
+            row.attempts += 1
+            row.last_error = error[:1000]
+            if row.attempts >= self.max_attempts:
+                row.status = "dead"
+                self.dead += 1
+                logger.error(f"Outbox event {row.id} to {row.topic} is dead after {row.attempts} attempts: {error}")
+            else:
+                row.next_attempt_at = now + self.backoff(row.attempts)
+                logger.warning(f"Outbox event {row.id} to {row.topic} failed, retrying at {row.next_attempt_at}: {error}")
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                claimed = self.relay_once()
+            except Exception as e:
+                logger.error(f"Outbox relay failed: {e}")
+                claimed = 0
+            # Keep draining while there is a backlog, otherwise poll
+            if claimed < self.batch_size:
+                self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="outbox-relay", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None,
+            "relayed": self.relayed,
+            "failed": self.failed,
+            "dead": self.dead,
+            "batches": self.batches,
+        }
+
+outbox_relay = OutboxRelay()
@@ -5,31 +5,191 @@ except ImportError:
     class DaprClient:
         def __enter__(self): return self
         def __exit__(self, exc_type, exc_value, traceback): pass
+        def close(self): pass
         def publish_event(self, *args, **kwargs):
             logger.info(f"MOCK PUBLISH: {kwargs}")
 
 import json
 import logging
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from app.core.batching import BatchWorker
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 PUBSUB_NAME = "pubsub"
 
-def publish_event(topic: str, data: dict, event_type: str = "com.hackathon.event"):
+class EventPublisher(BatchWorker):
     """
-    Publishes an event to the configured Dapr PubSub component.
+    Process-wide publisher. Callers only enqueue; a background thread drains
+    the queue in batches over one long-lived DaprClient, using bulk publish
+    when the SDK supports it.
+
+    Events that must not be lost go through the outbox, which calls
+    send_batch() directly. The queue is for fire-and-forget signals such as
+    the realtime hub's todo-sync, sent from request handlers and commit
+    hooks on the event loop: publish() never blocks, and drops the event
+    when the bounded queue is full.
     """
-    try:
-        with DaprClient() as client:
-            client.publish_event(
-                pubsub_name=PUBSUB_NAME,
-                topic_name=topic,
-                data=json.dumps(data),
-                data_content_type='application/json',
-                metadata={"cloudevent.type": event_type}
-            )
-            logger.info(f"Published event to {topic}: {data}")
-    except Exception as e:
-        logger.error(f"Failed to publish event to {topic}: {e}")
-        # raise e  <-- Suppress error in Vercel to allow app to run
 
+    thread_name = "event-publisher"
+
+    def __init__(
+        self,
+        client_factory: Callable[[], DaprClient] = DaprClient,
+        max_queue: int = settings.EVENT_QUEUE_SIZE,
+        batch_size: int = settings.EVENT_BATCH_SIZE,
+        linger: float = settings.EVENT_BATCH_LINGER_MS / 1000,
+        enabled: bool = settings.EVENT_PUBLISHING_ENABLED,
+    ):
+        super().__init__(max_queue, batch_size, linger)
+        self.client_factory = client_factory
+        self.enabled = enabled
+        self._client: Optional[DaprClient] = None
+        # The worker and the outbox relay share the client. Guards creating
+        # and replacing it, and counts the threads using each client so a
+        # replaced one is closed only once the last of them is done with it
+        self._client_lock = threading.Lock()
+        self._client_users: Dict[int, int] = {}
+        self.enqueued = 0
+        self.published = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def publish(self, topic: str, data: dict, event_type: str = "com.hackathon.event") -> bool:
+        """
+        Queues an event for publishing without blocking. Returns False if it
+        was dropped.
+        """
+        if not self.enabled:
+            return False
+        if not self.offer((topic, event_type, data)):
+            with self._stats_lock:
+                self.dropped += 1
+            logger.error(f"Event queue full, dropping event for {topic}: {data}")
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def send_batch(self, topic: str, events: List[dict], event_type: str = "com.hackathon.event"):
+        """
+        Publishes events synchronously on the shared client. Raises if the
+        broker rejects any of them.
+        """
+        client = self._checkout_client()
+        payloads = [json.dumps(data) for data in events]
+        metadata = {"cloudevent.type": event_type}
+        try:
+            bulk_publish = getattr(client, "publish_events", None)
+            if bulk_publish is not None and len(payloads) > 1:
+                response = bulk_publish(
+                    pubsub_name=PUBSUB_NAME,
+                    topic_name=topic,
+                    data=payloads,
+                    data_content_type="application/json",
+                    publish_metadata=metadata,
+                )
+                failed = getattr(response, "failed_entries", None)
+                if failed:
+                    raise RuntimeError(f"{len(failed)} of {len(payloads)} events rejected")
+            else:
+                for payload in payloads:
+                    client.publish_event(
+                        pubsub_name=PUBSUB_NAME,
+                        topic_name=topic,
+                        data=payload,
+                        data_content_type="application/json",
+                        metadata=metadata,
+                    )
+        except Exception:
+            # The sidecar may have restarted; reconnect on the next batch
+            self._checkin_client(client, failed=True)
+            raise
+        self._checkin_client(client)
+        logger.info(f"Published {len(payloads)} event(s) to {topic}")
+
+    def close(self, timeout: float = 5.0):
+        """
+        Flushes pending events and stops the worker. Called on shutdown.
+        """
+        super().close(timeout)
+        self._reset_client()
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "enabled": self.enabled,
+                "queued": self._queue.qsize(),
+                "enqueued": self.enqueued,
+                "published": self.published,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "batches": self.batches,
+            }
+
+    def _checkout_client(self) -> DaprClient:
+        with self._client_lock:
+            if self._client is None:
+                self._client = self.client_factory()
+            client = self._client
+            self._client_users[id(client)] = self._client_users.get(id(client), 0) + 1
+        return client
+
+    def _checkin_client(self, client: DaprClient, failed: bool = False):
+        """
+        Hands back a client taken by _checkout_client. A failed client is
+        replaced on the next checkout, and closed once no thread uses it.
+        """
+        with self._client_lock:
+            if failed and self._client is client:
+                self._client = None
+            users = self._client_users.pop(id(client)) - 1
+            if users:
+                self._client_users[id(client)] = users
+            retired = not users and self._client is not client
+        if retired:
+            self._close_client(client)
+
+    def _reset_client(self):
+        with self._client_lock:
+            client, self._client = self._client, None
+            idle = client is not None and id(client) not in self._client_users
+        if idle:
+            self._close_client(client)
+
+    def _close_client(self, client: DaprClient):
+        try:
+            getattr(client, "close", lambda: None)()
+        except Exception as e:
+            logger.warning(f"Failed to close DaprClient: {e}")
+
+    def handle_batch(self, batch: list):
+        groups = defaultdict(list)
+        for topic, event_type, data in batch:
+            groups[(topic, event_type)].append(data)
+
+        for (topic, event_type), events in groups.items():
+            try:
+                self.send_batch(topic, events, event_type)
+                with self._stats_lock:
+                    self.batches += 1
+                    self.published += len(events)
+            except Exception as e:
+                with self._stats_lock:
+                    self.batches += 1
+                    self.failed += len(events)
+                logger.error(f"Failed to publish {len(events)} event(s) to {topic}: {e}")
+
+publisher = EventPublisher()
+
+def publish_event(topic: str, data: dict, event_type: str = "com.hackathon.event"):
+    """
+    Queues an event for the configured Dapr PubSub component. Returns
+    immediately; delivery happens on the publisher's background thread.
+    """
+    publisher.publish(topic, data, event_type)
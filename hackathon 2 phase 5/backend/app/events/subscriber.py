@@ -1,9 +1,25 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Depends, Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+import json
 import logging
 
+from app.api import deps
+from app.db.session import get_async_session
+from app.events.hub import INSTANCE_ID, hub
+from app.services.recurring import create_next_occurrence
+
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Consumed once per replica instead of once per app; see
+# dapr/components/pubsub-broadcast.yaml
+BROADCAST_PUBSUB_NAME = "pubsub-broadcast"
+
+def event_data(body: dict) -> dict:
+    # CloudEvents carry our payload in "data"
+    data = body.get("data", body)
+    return json.loads(data) if isinstance(data, str) else data
+
 # Programmatic Subscription (optional, if not using declarative subscription via k8s)
 @router.get("/dapr/subscribe")
 def subscribe():
@@ -17,20 +33,78 @@ def subscribe():
             'pubsubname': 'pubsub',
             'topic': 'reminders',
             'route': 'events/reminder-triggered'
+        },
+        {
+            'pubsubname': BROADCAST_PUBSUB_NAME,
+            'topic': 'task-events',
+            'route': 'events/task-broadcast'
+        },
+        {
+            'pubsubname': BROADCAST_PUBSUB_NAME,
+            'topic': 'todo-sync',
+            'route': 'events/todo-sync'
         }
     ]
     return subscriptions
 
-@router.post("/events/task-processed")
-async def handle_task_event(request: Request):
+def completed_task_ids(data: dict) -> list:
+    if data.get("event_type") == "task.completed":
+        return [data["task_id"]]
+    if data.get("event_type") == "task.bulk_updated":
+        return data.get("completed_task_ids", [])
+    return []
+
+@router.post("/events/task-processed", dependencies=[Depends(deps.require_dapr_token)])
+async def handle_task_event(request: Request, session: AsyncSession = Depends(get_async_session)):
+    """
+    Creates the next occurrence of recurring todos that were completed.
+    Delivered once per app; redelivery creates nothing twice, so failures
+    are retried.
+    """
     try:
         body = await request.json()
         logger.info(f"Received task event: {body}")
-        # Logic to handle task event (e.g. update local state)
-        return {"status": "SUCCESS"}
+        task_ids = completed_task_ids(event_data(body))
     except Exception as e:
         logger.error(f"Error handling task event: {e}")
         return {"status": "DROP"}
+    try:
+        for task_id in task_ids:
+            await session.run_sync(lambda sync_session, task_id=task_id: create_next_occurrence(sync_session, int(task_id)))
+        return {"status": "SUCCESS"}
+    except Exception as e:
+        logger.error(f"Error creating next occurrence: {e}")
+        await session.rollback()
+        return {"status": "RETRY"}
+
+@router.post("/events/task-broadcast", dependencies=[Depends(deps.require_dapr_token)])
+async def fan_out_task_event(request: Request):
+    """
+    Pushes a task event to its user's realtime connections on this replica.
+    """
+    try:
+        data = event_data(await request.json())
+        if data.get("user_id") is not None:
+            hub.publish(int(data["user_id"]), {"type": "task.event", "event": data})
+        return {"status": "SUCCESS"}
+    except Exception as e:
+        logger.error(f"Error fanning out task event: {e}")
+        return {"status": "DROP"}
+
+@router.post("/events/todo-sync", dependencies=[Depends(deps.require_dapr_token)])
+async def fan_out_todo_sync(request: Request):
+    """
+    Tells a user's connections on this replica that their todos changed on
+    another one. Our own messages were delivered when they were sent.
+    """
+    try:
+        data = event_data(await request.json())
+        if data.get("origin") != INSTANCE_ID:
+            hub.publish(int(data["user_id"]), {"type": "todos.changed", "version": data["version"]})
+        return {"status": "SUCCESS"}
+    except Exception as e:
+        logger.error(f"Error fanning out todo sync: {e}")
+        return {"status": "DROP"}
 
 @router.post("/events/reminder-triggered")
 async def handle_reminder(request: Request):
@@ -1,3 +1,4 @@
 from app.models.user import User
-from app.models.todo import Todo
+from app.models.todo import Todo, TodoChange, TodoCollectionVersion
 from app.models.audit_log import AiAuditLog
+from app.models.outbox import OutboxEvent
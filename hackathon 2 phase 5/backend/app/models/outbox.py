@@ -0,0 +1,37 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index, text
+from sqlmodel import SQLModel, Field
+
+class OutboxEvent(SQLModel, table=True):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Relay scan: pending rows that are due, oldest first
+        Index(
+            "ix_outbox_events_pending",
+            "next_attempt_at",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+        # Earliest pending row per ordering key
+        Index(
+            "ix_outbox_events_pending_key",
+            "ordering_key",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    topic: str
+    event_type: str = Field(default="com.hackathon.event")
+    payload: str  # JSON-encoded event data
+    # Rows with the same key are delivered in id order
+    ordering_key: Optional[str] = None
+    status: str = Field(default="pending")  # pending, dead
+    attempts: int = Field(default=0)
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
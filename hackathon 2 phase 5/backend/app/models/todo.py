@@ -1,22 +1,78 @@
 from typing import Optional, TYPE_CHECKING
 from datetime import datetime
+from sqlalchemy import Index, text
 from sqlmodel import SQLModel, Field, Relationship
 
 if TYPE_CHECKING:
     from app.models.user import User
 
+# Rows the reminder scan still has to look at. Queries must use this exact
+# predicate for SQLite and Postgres to match the partial index below.
+REMINDER_PENDING = "reminder_sent = false AND status <> 'completed'"
+
 class Todo(SQLModel, table=True):
+    __table_args__ = (
+        # Keyset pagination: (user_id, id) and (user_id, due_date, id) orderings
+        Index("ix_todo_user_id_id", "user_id", "id"),
+        Index("ix_todo_user_id_due_date_id", "user_id", "due_date", "id"),
+        # The same orderings within one status, e.g. pending todos by due date
+        Index("ix_todo_user_id_status_id", "user_id", "status", "id"),
+        Index("ix_todo_user_id_status_due_date_id", "user_id", "status", "due_date", "id"),
+        # One todo per occurrence of a recurring series, however many paths
+        # create it; rows outside a series (NULL series_id) never conflict
+        Index("ix_todo_series_id_occurrence", "series_id", "occurrence", unique=True),
+        # Reminder scan; only unsent reminders on open tasks are indexed
+        Index(
+            "ix_todo_reminder_pending",
+            "reminder_time",
+            postgresql_where=text(REMINDER_PENDING),
+            sqlite_where=text(REMINDER_PENDING),
+        ),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     title: str = Field(index=True)
     description: Optional[str] = None
     status: str = Field(default="pending") # pending, completed
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Refreshed by every UPDATE, ORM or set-based, that does not set it itself
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
     due_date: Optional[datetime] = Field(default=None)
-    recurrence_rule: Optional[str] = Field(default=None) # e.g., "daily", "weekly", "monthly"
+    recurrence_rule: Optional[str] = Field(default=None) # RFC 5545 RRULE, or "daily", "weekly", "monthly"
+    # Recurring todos: the id of the series' first todo, and the start time
+    # of the occurrence this todo stands for (app/services/recurring.py)
+    series_id: Optional[int] = Field(default=None)
+    occurrence: Optional[datetime] = Field(default=None)
     
     reminder_time: Optional[datetime] = Field(default=None)
     reminder_sent: bool = Field(default=False)
 
     user_id: Optional[int] = Field(default=None, foreign_key="users.id")
     user: Optional["User"] = Relationship(back_populates="todos")
+
+class TodoCollectionVersion(SQLModel, table=True):
+    """
+    Per-user counter that changes with every write to the user's todos, in
+    the same transaction. Maintained by app/services/versions.py.
+    """
+    __tablename__ = "todo_versions"
+
+    user_id: int = Field(primary_key=True, foreign_key="users.id")
+    version: int = Field(default=0)
+
+class TodoChange(SQLModel, table=True):
+    """
+    The latest change to each of a user's todos, stamped with the todo
+    version it was written at. Rows outlive their todo as tombstones, so
+    deletes reach clients syncing with GET /todos/changes.
+    """
+    __tablename__ = "todo_changes"
+    __table_args__ = (
+        Index("ix_todo_changes_user_id_seq_todo_id", "user_id", "seq", "todo_id"),
+    )
+
+    user_id: int = Field(primary_key=True, foreign_key="users.id")
+    # Not a foreign key: tombstones refer to deleted todos
+    todo_id: int = Field(primary_key=True)
+    seq: int = Field(default=0)
+    deleted: bool = Field(default=False)
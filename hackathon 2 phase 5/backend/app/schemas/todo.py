@@ -1,7 +1,17 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field, field_validator
 from datetime import datetime
 
+from app.services.rrule import InvalidRule, parse_rule
+
+def check_recurrence_rule(value: Optional[str]) -> Optional[str]:
+    if value is not None:
+        try:
+            parse_rule(value)
+        except InvalidRule as e:
+            raise ValueError(f"invalid recurrence rule: {e}")
+    return value
+
 class TodoBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -10,6 +20,8 @@ class TodoBase(BaseModel):
     recurrence_rule: Optional[str] = None
     reminder_time: Optional[datetime] = None
 
+    _check_recurrence_rule = field_validator("recurrence_rule")(check_recurrence_rule)
+
 class TodoCreate(TodoBase):
     pass
 
@@ -21,6 +33,8 @@ class TodoUpdate(BaseModel):
     recurrence_rule: Optional[str] = None
     reminder_time: Optional[datetime] = None
 
+    _check_recurrence_rule = field_validator("recurrence_rule")(check_recurrence_rule)
+
 class TodoRead(TodoBase):
     id: int
     created_at: datetime
@@ -29,3 +43,39 @@ class TodoRead(TodoBase):
     
     class Config:
         orm_mode = True
+
+class TodoPage(BaseModel):
+    items: List[TodoRead]
+    next_cursor: Optional[str] = None
+
+class TodoChanges(BaseModel):
+    upserts: List[TodoRead]
+    deleted: List[int]
+    # Pass as `since` on the next sync; while has_more, right away
+    next_cursor: str
+    has_more: bool
+
+class TodoImportResult(BaseModel):
+    imported: int
+
+# Upper bound on items per bulk request
+BULK_MAX_ITEMS = 1000
+
+class TodoBulkCreate(BaseModel):
+    items: List[TodoCreate] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoPatch(TodoUpdate):
+    id: int
+
+class TodoBulkUpdate(BaseModel):
+    items: List[TodoPatch] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoBulkDelete(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoBulkItemResult(BaseModel):
+    id: Optional[int] = None
+    status: str  # created, updated, deleted, not_found
+
+class TodoBulkResult(BaseModel):
+    results: List[TodoBulkItemResult]
@@ -0,0 +1,192 @@
+import base64
+import json
+from datetime import datetime
+from typing import Generator, List, Optional, Tuple
+
+from sqlalchemy import func, tuple_
+from sqlmodel import select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.models.todo import Todo
+
+# Keyset ordering columns. Every key is paired with Todo.id so the ordering is
+# total, and each (user_id, <key>, id) combination has a matching index on Todo.
+SORT_KEYS = {
+    "id": None,
+    "due_date": Todo.due_date,
+}
+
+class InvalidCursor(ValueError):
+    pass
+
+def todo_list_statement(
+    user_id: int,
+    status: Optional[str] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None,
+    has_reminder: Optional[bool] = None,
+    recurrence_rule: Optional[str] = None,
+) -> SelectOfScalar:
+    """
+    The unordered GET /todos query for a user and its filters.
+    """
+    statement = select(Todo).where(Todo.user_id == user_id)
+    # user_id, status and due_date are served by the composite indexes on
+    # Todo; the remaining filters are checked on the rows those return
+    if status is not None:
+        statement = statement.where(Todo.status == status)
+    if due_after is not None:
+        statement = statement.where(Todo.due_date >= due_after)
+    if due_before is not None:
+        statement = statement.where(Todo.due_date < due_before)
+    if has_reminder is not None:
+        statement = statement.where(Todo.reminder_time.is_not(None) if has_reminder else Todo.reminder_time.is_(None))
+    if recurrence_rule is not None:
+        statement = statement.where(Todo.recurrence_rule == recurrence_rule)
+    return statement
+
+def _order(sort: str, descending: bool) -> str:
+    return f"-{sort}" if descending else sort
+
+def encode_cursor(sort: str, todo: Todo, descending: bool = False) -> str:
+    column = SORT_KEYS[sort]
+    value = getattr(todo, column.key) if column is not None else None
+    payload = {
+        "s": _order(sort, descending),
+        "v": value.isoformat() if isinstance(value, datetime) else value,
+        "id": todo.id,
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, descending: bool = False) -> Tuple[Optional[datetime], int]:
+    """
+    Returns the (value, id) position encoded in a cursor issued for `sort`
+    in the given direction.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        last_id = int(payload["id"])
+        value = payload.get("v")
+        if value is not None:
+            value = datetime.fromisoformat(value)
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor(f"Malformed cursor: {e}")
+
+    if payload.get("s") != _order(sort, descending):
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    return value, last_id
+
+def keyset_statements(
+    statement: SelectOfScalar,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    descending: bool = False,
+) -> List[SelectOfScalar]:
+    """
+    Builds the statement(s) that return the page after `cursor`.
+
+    Nullable sort keys are paged in two phases, non-null values first and then
+    the NULL tail ordered by id, so each phase is a plain range scan on the
+    composite index instead of an OR that would defeat it. Callers run the
+    statements in order until they have collected enough rows.
+
+    `descending` reverses both phases; the NULL tail still comes last.
+    Indexes serve either direction, scanned backwards.
+    """
+    column = SORT_KEYS[sort]
+    id_order = Todo.id.desc() if descending else Todo.id
+    if column is None:
+        if cursor:
+            _, last_id = decode_cursor(cursor, sort, descending)
+            statement = statement.where(Todo.id < last_id if descending else Todo.id > last_id)
+        return [statement.order_by(id_order)]
+
+    value, last_id = decode_cursor(cursor, sort, descending) if cursor else (None, None)
+
+    null_phase = statement.where(column.is_(None)).order_by(id_order)
+    if last_id is not None and value is None:
+        # Already inside the NULL tail
+        return [null_phase.where(Todo.id < last_id if descending else Todo.id > last_id)]
+
+    value_phase = statement.where(column.is_not(None)).order_by(column.desc() if descending else column, id_order)
+    if last_id is not None:
+        position = tuple_(column, Todo.id)
+        value_phase = value_phase.where(
+            position < tuple_(value, last_id) if descending else position > tuple_(value, last_id)
+        )
+    return [value_phase, null_phase]
+
+def encode_change_cursor(seq: int, todo_id: int) -> str:
+    return f"{seq}.{todo_id}"
+
+def decode_change_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Returns the (seq, todo_id) position of a GET /todos/changes cursor.
+    """
+    try:
+        seq, todo_id = cursor.split(".")
+        return int(seq), int(todo_id)
+    except ValueError:
+        raise InvalidCursor("Malformed change cursor")
+
+def _collect_page(statements: List[SelectOfScalar], limit: int) -> Generator[SelectOfScalar, List[Todo], Tuple[List[Todo], bool]]:
+    """
+    The paging loop shared by fetch_page and fetch_page_sync. Yields each
+    statement to run and is sent back its rows; returns the page and
+    whether more rows exist after it.
+    """
+    rows: List[Todo] = []
+    for statement in statements:
+        rows.extend((yield statement.limit(limit + 1 - len(rows))))
+        if len(rows) > limit:
+            break
+    return rows[:limit], len(rows) > limit
+
+async def fetch_page(session, statements: List[SelectOfScalar], limit: int) -> Tuple[List[Todo], bool]:
+    """
+    Runs keyset statements until `limit` rows are collected. Returns the rows
+    and whether more rows exist after them.
+    """
+    page = _collect_page(statements, limit)
+    try:
+        statement = next(page)
+        while True:
+            result = await session.exec(statement)
+            statement = page.send(result.all())
+    except StopIteration as done:
+        return done.value
+
+def fetch_page_sync(session, statements: List[SelectOfScalar], limit: int) -> Tuple[List[Todo], bool]:
+    """
+    fetch_page for a sync Session.
+    """
+    page = _collect_page(statements, limit)
+    try:
+        statement = next(page)
+        while True:
+            statement = page.send(session.exec(statement).all())
+    except StopIteration as done:
+        return done.value
+
+async def fetch_offset_page(session, statements: List[SelectOfScalar], skip: int, limit: int) -> List[Todo]:
+    """
+    Offset paging over keyset_statements' phases: skips `skip` rows across
+    the phases in order and returns up to `limit` rows after them. A phase
+    the offset passes entirely is counted instead of read, so each phase
+    stays an index range scan.
+    """
+    rows: List[Todo] = []
+    for i, statement in enumerate(statements):
+        if len(rows) >= limit:
+            break
+        result = await session.exec(statement.offset(skip).limit(limit - len(rows)))
+        found = result.all()
+        rows.extend(found)
+        if found:
+            skip = 0
+        elif skip and i + 1 < len(statements):
+            counted = await session.exec(select(func.count()).select_from(statement.order_by(None).subquery()))
+            skip = max(0, skip - counted.one())
+    return rows
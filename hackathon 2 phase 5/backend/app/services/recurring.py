@@ -1,60 +1,252 @@
+import time
 from datetime import datetime, timedelta
-from typing import Optional
-from sqlmodel import Session
+from itertools import groupby
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, insert, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+from app.core.config import settings
 from app.models.todo import Todo
-from app.events.publisher import publish_event
+from app.events.outbox import add_event
+from app.services.rrule import InvalidRule, expand, next_occurrence, parse_rule
+from app.services.versions import record_changes
 import logging
 
 logger = logging.getLogger(__name__)
 
+# A recurring todo belongs to a series: the todos sharing its series_id (the
+# id of the first one), each standing for one occurrence of the rule. The
+# rule is anchored at the series' earliest remaining occurrence, so COUNT
+# counts from there, and read from its latest todo, so editing or clearing
+# recurrence_rule there changes or ends the series.
+#
+# Occurrences are created on two paths: the task.completed consumer
+# (app/events/subscriber.py) adds the one after a completed todo, and the
+# recurrence cron adds every occurrence up to RECURRENCE_HORIZON_DAYS
+# ahead. Both insert with ON CONFLICT DO NOTHING on the unique
+# (series_id, occurrence) index, so each occurrence is created once.
+
 def calculate_next_due_date(current_due: datetime, rule: str) -> Optional[datetime]:
     if not current_due:
         current_due = datetime.utcnow()
-    
-    if rule == "daily":
-        return current_due + timedelta(days=1)
-    elif rule == "weekly":
-        return current_due + timedelta(weeks=1)
-    elif rule == "monthly":
-        # Simplified monthly logic (add 30 days) - can be enhanced for exact calendar months
-        return current_due + timedelta(days=30)
-    else:
+    try:
+        return next_occurrence(parse_rule(rule), current_due, current_due)
+    except InvalidRule:
+        return None
+
+def _reminder_for(due_date: datetime, previous_due: Optional[datetime], previous_reminder: Optional[datetime]):
+    # Same lead time as the todo the occurrence was copied from
+    if previous_due is None or previous_reminder is None:
         return None
+    return due_date - (previous_due - previous_reminder)
 
-def process_recurrence(task: Todo, db: Session):
+def _insert_occurrences(db: Session, rows: List[dict]) -> List[Tuple[int, int]]:
     """
-    Checks if a completed task is recurring and creates the next instance.
+    Inserts the rows, skipping occurrences that exist already. Returns the
+    (id, user_id) of the todos created.
     """
-    if not task.recurrence_rule:
-        return
+    table = Todo.__table__
+    connection = db.connection()
+    dialect = {"postgresql": postgresql, "sqlite": sqlite}.get(connection.dialect.name)
+    if dialect is not None:
+        # Batched into multi-row INSERTs by SQLAlchemy
+        statement = dialect.insert(table).on_conflict_do_nothing(
+            index_elements=[table.c.series_id, table.c.occurrence]
+        ).returning(table.c.id, table.c.user_id)
+        return [tuple(row) for row in connection.execute(statement, rows)]
+    existing = set(connection.execute(
+        select(table.c.series_id, table.c.occurrence).where(
+            tuple_(table.c.series_id, table.c.occurrence).in_([(row["series_id"], row["occurrence"]) for row in rows])
+        )
+    ).all())
+    rows = [row for row in rows if (row["series_id"], row["occurrence"]) not in existing]
+    if not rows:
+        return []
+    return [tuple(row) for row in connection.execute(insert(table).returning(table.c.id, table.c.user_id), rows)]
+
+def create_next_occurrence(db: Session, task_id: int) -> Optional[int]:
+    """
+    Creates the todo for the occurrence after the completed task `task_id`
+    and commits. Returns its id, or None if there is nothing to create:
+    the task is gone, reopened or not recurring, its series has ended, or
+    the occurrence exists already (a redelivered event, a racing
+    completion or the recurrence cron). Safe to call any number of times.
+    """
+    task = db.get(Todo, task_id)
+    if task is None or task.status != "completed" or not task.recurrence_rule:
+        return None
 
     logger.info(f"Processing recurrence for task {task.id} with rule {task.recurrence_rule}")
 
-    next_due = calculate_next_due_date(task.due_date, task.recurrence_rule)
-    
+    try:
+        rule = parse_rule(task.recurrence_rule)
+    except InvalidRule as e:
+        logger.warning(f"Could not parse recurrence rule {task.recurrence_rule!r}: {e}")
+        return None
+    series_id, occurrence = task.series_id, task.occurrence
+    if series_id is None:
+        # Completing a todo that is not in a series yet starts one. Derived
+        # from the row only, so retries agree; updated_at is kept, as
+        # nothing a client sees changed.
+        series_id, occurrence = task.id, task.due_date or task.updated_at
+        db.exec(
+            update(Todo)
+            .where(Todo.id == task.id, Todo.series_id.is_(None))
+            .values(series_id=series_id, occurrence=occurrence, updated_at=Todo.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+    anchor = db.exec(select(func.min(Todo.occurrence)).where(Todo.series_id == series_id)).one()
+
+    next_due = next_occurrence(rule, min(anchor or occurrence, occurrence), occurrence)
     if not next_due:
-        logger.warning(f"Could not calculate next due date for rule: {task.recurrence_rule}")
-        return
-
-    new_task = Todo(
-        title=task.title,
-        description=task.description,
-        user_id=task.user_id,
-        status="pending",
-        due_date=next_due,
-        recurrence_rule=task.recurrence_rule
-    )
+        logger.info(f"Recurrence of task {task.id} has ended")
+        db.commit()
+        return None
+    created = _insert_occurrences(db, [{
+        "title": task.title,
+        "description": task.description,
+        "status": "pending",
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow(),
+        "due_date": next_due,
+        "recurrence_rule": task.recurrence_rule,
+        "reminder_time": _reminder_for(next_due, task.due_date, task.reminder_time),
+        "reminder_sent": False,
+        "user_id": task.user_id,
+        "series_id": series_id,
+        "occurrence": next_due,
+    }])
+    if not created:
+        db.commit()
+        return None
+    new_id, user_id = created[0]
+    record_changes(db, [(user_id, new_id, False)])
 
-    db.add(new_task)
-    db.commit()
-    db.refresh(new_task)
+    logger.info(f"Generated new recurring task {new_id} due on {next_due}")
 
-    logger.info(f"Generated new recurring task {new_task.id} due on {new_task.due_date}")
-    
     # Publish event
-    publish_event("task-events", {
+    add_event(db, "task-events", {
         "event_type": "task.created",
-        "task_id": new_task.id,
-        "user_id": new_task.user_id,
+        "task_id": new_id,
+        "user_id": user_id,
         "origin": "recurrence"
     })
+    db.commit()
+    return new_id
+
+def materialize_occurrences(
+    db: Session,
+    horizon_days: int = settings.RECURRENCE_HORIZON_DAYS,
+    chunk_size: int = settings.RECURRENCE_CHUNK_SIZE,
+) -> dict:
+    """
+    Creates the todos of every series' occurrences from now until
+    `horizon_days` ahead. Occurrences missed while the job did not run are
+    not backfilled.
+
+    Series are read `chunk_size` at a time in series_id order, their rules
+    expanded together, and the new todos inserted and committed per chunk.
+    Runs on several replicas at once create nothing twice. Returns per-run
+    stats.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    horizon = now + timedelta(days=horizon_days)
+    stats = {"series": 0, "created": 0, "chunks": 0, "invalid": 0}
+
+    # Open recurring todos created since the last run start their series.
+    # updated_at is kept: nothing a client sees changed.
+    db.exec(
+        update(Todo)
+        .where(Todo.recurrence_rule.is_not(None), Todo.series_id.is_(None), Todo.status != "completed")
+        .values(series_id=Todo.id, occurrence=func.coalesce(Todo.due_date, Todo.created_at), updated_at=Todo.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+    after_series = 0
+    while True:
+        # Series with occurrences left to create, from their index entries
+        series = (
+            select(
+                Todo.series_id,
+                func.min(Todo.occurrence).label("first"),
+                func.max(Todo.occurrence).label("last"),
+            )
+            .where(Todo.series_id > after_series)
+            .group_by(Todo.series_id)
+            .having(func.max(Todo.occurrence) < horizon)
+            .order_by(Todo.series_id)
+            .limit(chunk_size)
+            .subquery()
+        )
+        # Each series continues from its latest todo
+        rows = db.exec(
+            select(
+                series.c.series_id, series.c.first, series.c.last, Todo.user_id, Todo.title,
+                Todo.description, Todo.recurrence_rule, Todo.due_date, Todo.reminder_time,
+            )
+            .join(Todo, (Todo.series_id == series.c.series_id) & (Todo.occurrence == series.c.last))
+            .order_by(series.c.series_id)
+        ).all()
+        if not rows:
+            break
+        stats["chunks"] += 1
+        stats["series"] += len(rows)
+        after_series = rows[-1].series_id
+
+        templates, rules = [], []
+        for row in rows:
+            if not row.recurrence_rule:
+                continue
+            try:
+                rules.append(parse_rule(row.recurrence_rule))
+            except InvalidRule:
+                stats["invalid"] += 1
+                continue
+            templates.append(row)
+        if rules:
+            indices, times = expand(
+                rules,
+                [row.first for row in templates],
+                np.maximum(np.array([row.last for row in templates], dtype="datetime64[us]"), np.datetime64(now, "us")),
+                horizon,
+            )
+            values = []
+            for i, occurrence in zip(indices.tolist(), times.tolist()):
+                row = templates[i]
+                values.append({
+                    "title": row.title,
+                    "description": row.description,
+                    "status": "pending",
+                    "created_at": now,
+                    "updated_at": now,
+                    "due_date": occurrence,
+                    "recurrence_rule": row.recurrence_rule,
+                    "reminder_time": _reminder_for(occurrence, row.due_date, row.reminder_time),
+                    "reminder_sent": False,
+                    "user_id": row.user_id,
+                    "series_id": row.series_id,
+                    "occurrence": occurrence,
+                })
+            created = _insert_occurrences(db, values) if values else []
+            if created:
+                record_changes(db, [(user_id, id, False) for id, user_id in created])
+                for user_id, group in groupby(sorted(created, key=lambda row: (row[1], row[0])), key=lambda row: row[1]):
+                    add_event(db, "task-events", {
+                        "event_type": "task.bulk_created",
+                        "task_ids": [id for id, _ in group],
+                        "user_id": user_id,
+                        "origin": "recurrence"
+                    })
+            db.commit()
+            stats["created"] += len(created)
+
+        if len(rows) < chunk_size:
+            break
+
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    logger.info(f"Materialized recurring todos: {stats}")
+    return stats
@@ -0,0 +1,372 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# RFC 5545 recurrence rules (the RRULE property), for the subset todos
+# need: FREQ=DAILY/WEEKLY/MONTHLY/YEARLY with INTERVAL, COUNT, UNTIL,
+# BYDAY (with ordinals such as 1MO or -1FR), BYMONTHDAY, BYMONTH and WKST.
+# Occurrences follow python-dateutil's rrule: DTSTART is the first
+# occurrence only if it matches the rule, and days a month lacks (the 31st,
+# 30 February) are skipped rather than clamped.
+#
+# expand() works on many rules at once. Rows are grouped by rule; within a
+# group every row's candidate days for a block of periods are laid out as
+# one (rows, periods, days-per-period) numpy array and filtered with
+# vectorized calendar arithmetic, so the Python-level work is per block,
+# not per occurrence. All times are naive UTC.
+
+# Plain words accepted for rules stored before RRULE support
+ALIASES = {
+    "daily": "FREQ=DAILY",
+    "weekly": "FREQ=WEEKLY",
+    "monthly": "FREQ=MONTHLY",
+    "yearly": "FREQ=YEARLY",
+}
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+# Longest stretch next_occurrence() searches, for rules that rarely match
+MAX_LOOKAHEAD = timedelta(days=366 * 100)
+
+_BYDAY = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+_UNTIL = re.compile(r"^(\d{8})(?:T(\d{6})Z?)?$")
+
+class InvalidRule(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Rule:
+    freq: str
+    interval: int = 1
+    count: Optional[int] = None
+    until: Optional[datetime] = None
+    # (ordinal, weekday): ordinal 0 means every such weekday; weekday 0 is Monday
+    byday: Tuple[Tuple[int, int], ...] = ()
+    bymonthday: Tuple[int, ...] = ()
+    bymonth: Tuple[int, ...] = ()
+    wkst: int = 0
+
+def _int_list(value: str, name: str, low: int, high: int, signed: bool = False) -> Tuple[int, ...]:
+    try:
+        values = tuple(int(part) for part in value.split(","))
+    except ValueError:
+        raise InvalidRule(f"{name} must be a list of integers")
+    for number in values:
+        if not low <= (abs(number) if signed else number) <= high:
+            raise InvalidRule(f"{name} value {number} is out of range")
+    return values
+
+def _until(value: str) -> datetime:
+    match = _UNTIL.match(value)
+    if not match:
+        raise InvalidRule("UNTIL must look like 20301231 or 20301231T235959Z")
+    try:
+        if match.group(2):
+            return datetime.strptime(match.group(1) + match.group(2), "%Y%m%d%H%M%S")
+        # A date includes the whole day
+        return datetime.strptime(match.group(1), "%Y%m%d") + timedelta(days=1, microseconds=-1)
+    except ValueError:
+        raise InvalidRule("UNTIL is not a valid date")
+
+@lru_cache(maxsize=4096)
+def parse_rule(text: str) -> Rule:
+    """
+    Parses an RRULE value such as "FREQ=MONTHLY;BYDAY=-1FR;COUNT=6", with or
+    without the "RRULE:" prefix, or one of the ALIASES. Raises InvalidRule.
+    """
+    text = (text or "").strip()
+    text = ALIASES.get(text.lower(), text)
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.split(";")):
+        key, sep, value = part.partition("=")
+        key = key.strip().upper()
+        if not sep or not value.strip():
+            raise InvalidRule(f"'{part}' is not a KEY=VALUE pair")
+        if key in parts:
+            raise InvalidRule(f"{key} is given twice")
+        parts[key] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise InvalidRule(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    fields = {"freq": freq}
+    if "INTERVAL" in parts:
+        fields["interval"] = _int_list(parts.pop("INTERVAL"), "INTERVAL", 1, 1000)[0]
+    if "COUNT" in parts:
+        fields["count"] = _int_list(parts.pop("COUNT"), "COUNT", 1, 100000)[0]
+    if "UNTIL" in parts:
+        if "count" in fields:
+            raise InvalidRule("COUNT and UNTIL cannot both be given")
+        fields["until"] = _until(parts.pop("UNTIL"))
+    if "BYDAY" in parts:
+        byday = []
+        for value in parts.pop("BYDAY").split(","):
+            match = _BYDAY.match(value.strip())
+            if not match:
+                raise InvalidRule(f"BYDAY value '{value}' is not a weekday such as MO or -1FR")
+            ordinal = int(match.group(1) or 0)
+            if ordinal and freq not in ("MONTHLY", "YEARLY"):
+                raise InvalidRule("BYDAY ordinals need FREQ=MONTHLY or FREQ=YEARLY")
+            if not -53 <= ordinal <= 53:
+                raise InvalidRule(f"BYDAY ordinal {ordinal} is out of range")
+            byday.append((ordinal, WEEKDAYS.index(match.group(2))))
+        fields["byday"] = tuple(sorted(set(byday)))
+    if "BYMONTHDAY" in parts:
+        if freq == "WEEKLY":
+            raise InvalidRule("BYMONTHDAY cannot be used with FREQ=WEEKLY")
+        fields["bymonthday"] = tuple(sorted(set(_int_list(parts.pop("BYMONTHDAY"), "BYMONTHDAY", 1, 31, signed=True))))
+    if "BYMONTH" in parts:
+        fields["bymonth"] = tuple(sorted(set(_int_list(parts.pop("BYMONTH"), "BYMONTH", 1, 12))))
+    if "WKST" in parts:
+        wkst = parts.pop("WKST")
+        if wkst not in WEEKDAYS:
+            raise InvalidRule("WKST must be a weekday such as MO")
+        fields["wkst"] = WEEKDAYS.index(wkst)
+    if parts:
+        raise InvalidRule(f"{', '.join(sorted(parts))} is not supported")
+    return Rule(**fields)
+
+# Calendar arithmetic on int64 day numbers (days since 1970-01-01, a Thursday)
+
+_US_PER_DAY = 86_400_000_000
+
+# (periods per block, candidate days per period): blocks hold about the
+# same number of candidates whatever the frequency
+_LAYOUT = {"DAILY": (64, 1), "WEEKLY": (16, 7), "MONTHLY": (4, 31), "YEARLY": (1, 366)}
+
+# Candidates held in memory at once, across all rows of a block
+_BLOCK_CANDIDATES = 1 << 20
+
+def _weekday(days):
+    return (days + 3) % 7
+
+def _months(days):
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+def _years(days):
+    return days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+
+def _start_day(periods, unit: str):
+    return periods.astype(f"datetime64[{unit}]").astype("datetime64[D]").astype(np.int64)
+
+def _period(rule: Rule, days):
+    if rule.freq == "DAILY":
+        return days
+    if rule.freq == "WEEKLY":
+        return (days + 3 - rule.wkst) // 7
+    return _months(days) if rule.freq == "MONTHLY" else _years(days)
+
+def _span(rule: Rule, periods):
+    """
+    First day and length in days of each period.
+    """
+    if rule.freq == "DAILY":
+        return periods, np.ones_like(periods)
+    if rule.freq == "WEEKLY":
+        return periods * 7 - 3 + rule.wkst, np.full_like(periods, 7)
+    unit = "M" if rule.freq == "MONTHLY" else "Y"
+    start = _start_day(periods, unit)
+    return start, _start_day(periods + 1, unit) - start
+
+def _nth(position, length):
+    # Ordinal of a weekday within its month or year, from the start and
+    # from the end (-1 is the last)
+    return position // 7 + 1, -((length - 1 - position) // 7 + 1)
+
+def _year_tables():
+    month, day, length = np.zeros((3, 2, 366), dtype=np.int64)
+    for leap, year in enumerate((2001, 2000)):
+        days = np.arange(np.datetime64(f"{year}-01-01"), np.datetime64(f"{year + 1}-01-01"))
+        months = days.astype("datetime64[M]")
+        month_start = months.astype("datetime64[D]")
+        month[leap, :len(days)] = months.astype(np.int64) % 12 + 1
+        day[leap, :len(days)] = (days - month_start).astype(np.int64) + 1
+        length[leap, :len(days)] = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    return month, day, length
+
+# Month, day of month and month length of each day of a common (row 0) and
+# a leap (row 1) year. YEARLY candidates are looked up here, which is much
+# cheaper than converting each one to a calendar date.
+_YEAR_MONTH, _YEAR_DAY, _YEAR_MONTH_LENGTH = _year_tables()
+
+def _calendar(rule: Rule, days, periods, span_length, day_offsets):
+    """
+    Month (1-12), day of month and month length of each candidate day.
+    """
+    if rule.freq == "MONTHLY":
+        fields = (periods % 12 + 1)[..., None], day_offsets + 1, span_length[..., None]
+        return [np.broadcast_to(field, days.shape) for field in fields]
+    if rule.freq == "YEARLY":
+        leap = (span_length == 366).astype(np.int64)[..., None]
+        return _YEAR_MONTH[leap, day_offsets], _YEAR_DAY[leap, day_offsets], _YEAR_MONTH_LENGTH[leap, day_offsets]
+    months = _months(days)
+    month_start = _start_day(months, "M")
+    return months % 12 + 1, days - month_start + 1, _start_day(months + 1, "M") - month_start
+
+def _matches(rule: Rule, days, periods, span_length, day_offsets, start_days):
+    """
+    Which candidate days the rule selects. `days` are the candidates of
+    each row and period; `start_days` holds each row's DTSTART day, for the
+    parts of the rule that default to DTSTART.
+    """
+    keep = np.ones(days.shape, dtype=bool)
+    if rule.bymonth or rule.bymonthday or rule.freq in ("MONTHLY", "YEARLY"):
+        month, day_of_month, month_length = _calendar(rule, days, periods, span_length, day_offsets)
+    if rule.bymonth:
+        keep &= np.isin(month, rule.bymonth)
+    if rule.bymonthday:
+        positive = [day for day in rule.bymonthday if day > 0]
+        negative = [day for day in rule.bymonthday if day < 0]
+        selected = np.isin(day_of_month, positive)
+        if negative:
+            selected |= np.isin(day_of_month - month_length - 1, negative)
+        keep &= selected
+    if rule.byday:
+        weekday = _weekday(days)
+        selected = np.zeros(days.shape, dtype=bool)
+        if any(ordinal for ordinal, _ in rule.byday):
+            if rule.freq == "MONTHLY" or rule.bymonth:
+                first, last = _nth(day_of_month - 1, month_length)
+            else:
+                first, last = _nth(day_offsets, span_length[..., None])
+        for ordinal, day in rule.byday:
+            if ordinal > 0:
+                selected |= (weekday == day) & (first == ordinal)
+            elif ordinal < 0:
+                selected |= (weekday == day) & (last == ordinal)
+            else:
+                selected |= weekday == day
+        keep &= selected
+
+    # Parts taken from DTSTART when the rule leaves them open
+    if rule.freq == "WEEKLY" and not rule.byday:
+        keep &= _weekday(days) == _weekday(start_days)
+    elif rule.freq in ("MONTHLY", "YEARLY") and not (rule.bymonthday or rule.byday):
+        start_months = _months(start_days)
+        keep &= day_of_month == start_days - _start_day(start_months, "M") + 1
+        if rule.freq == "YEARLY" and not rule.bymonth:
+            keep &= month == start_months % 12 + 1
+    return keep
+
+def _expand_group(rule: Rule, starts, after, until, limit: Optional[int]):
+    """
+    expand() for rows sharing one rule; returns (row, occurrence) arrays in
+    int64 microseconds.
+    """
+    rows = len(starts)
+    start_days = starts // _US_PER_DAY
+    time_of_day = starts - start_days * _US_PER_DAY
+    if rule.until is not None:
+        until = np.minimum(until, np.datetime64(rule.until, "us").astype(np.int64))
+    first_period = _period(rule, start_days)
+    # Periods to skip: none when COUNT has to count from DTSTART
+    skip = np.zeros(rows, dtype=np.int64)
+    if rule.count is None:
+        behind = _period(rule, np.maximum(after, starts) // _US_PER_DAY) - first_period
+        skip = np.maximum(0, -(-behind // rule.interval))
+
+    periods_per_block, width = _LAYOUT[rule.freq]
+    offsets = np.arange(periods_per_block, dtype=np.int64) * rule.interval
+    day_offsets = np.arange(width, dtype=np.int64)
+    counted = np.zeros(rows, dtype=np.int64)
+    emitted = np.zeros(rows, dtype=np.int64)
+    active = np.arange(rows)
+    found_rows, found_times = [], []
+    while len(active):
+        periods = first_period[active, None] + skip[active, None] * rule.interval + offsets
+        span_start, span_length = _span(rule, periods)
+        days = span_start[..., None] + day_offsets
+        candidates = (day_offsets < span_length[..., None]) & _matches(
+            rule, days, periods, span_length, day_offsets, start_days[active, None, None]
+        )
+        times = days * _US_PER_DAY + time_of_day[active, None, None]
+        candidates &= (times >= starts[active, None, None]) & (times <= until[active, None, None])
+        candidates = candidates.reshape(len(active), -1)
+        times = times.reshape(len(active), -1)
+        if rule.count is not None:
+            running = np.cumsum(candidates, axis=1) + counted[active, None]
+            candidates &= running <= rule.count
+            counted[active] = running[:, -1]
+        wanted = candidates & (times > after[active, None])
+        if limit is not None:
+            wanted &= np.cumsum(wanted, axis=1) + emitted[active, None] <= limit
+        hit_rows, hit_columns = np.nonzero(wanted)
+        found_rows.append(active[hit_rows])
+        found_times.append(times[hit_rows, hit_columns])
+        emitted[active] += wanted.sum(axis=1)
+
+        skip[active] += periods_per_block
+        next_start, _ = _span(rule, first_period[active] + skip[active] * rule.interval)
+        done = next_start * _US_PER_DAY > until[active]
+        if rule.count is not None:
+            done |= counted[active] >= rule.count
+        if limit is not None:
+            done |= emitted[active] >= limit
+        active = active[~done]
+    return np.concatenate(found_rows), np.concatenate(found_times)
+
+def _as_us(values, rows: int):
+    array = np.asarray(values, dtype="datetime64[us]").astype(np.int64)
+    return np.broadcast_to(array, (rows,))
+
+def expand(
+    rules: Sequence[Rule],
+    starts,
+    after,
+    until,
+    limit: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Occurrences of many rules at once: for row i, those of rules[i] started
+    at starts[i] that fall in (after, until], at most `limit` per row.
+    `starts`, `after` and `until` are datetimes or sequences of them, one
+    per row.
+
+    Returns two arrays ordered by row, then time: the row of each
+    occurrence, and the occurrence as datetime64[us].
+    """
+    rows = len(rules)
+    starts = _as_us(starts, rows)
+    after = _as_us(after, rows)
+    until = _as_us(until, rows)
+    groups = defaultdict(list)
+    for i, rule in enumerate(rules):
+        groups[rule].append(i)
+
+    found_rows, found_times = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for rule, members in groups.items():
+        members = np.asarray(members)
+        periods_per_block, width = _LAYOUT[rule.freq]
+        chunk = max(1, _BLOCK_CANDIDATES // (periods_per_block * width))
+        for i in range(0, len(members), chunk):
+            part = members[i:i + chunk]
+            hit_rows, hit_times = _expand_group(rule, starts[part], after[part], until[part], limit)
+            found_rows.append(part[hit_rows])
+            found_times.append(hit_times)
+    found_rows = np.concatenate(found_rows)
+    found_times = np.concatenate(found_times)
+    # Each row's occurrences were found in time order
+    order = np.argsort(found_rows, kind="stable")
+    return found_rows[order], found_times[order].astype("datetime64[us]")
+
+def occurrences(rule: Rule, dtstart: datetime, after: datetime, until: datetime) -> List[datetime]:
+    """
+    The rule's occurrences in (after, until].
+    """
+    _, times = expand([rule], dtstart, after, until)
+    return times.astype(datetime).tolist()
+
+def next_occurrence(rule: Rule, dtstart: datetime, after: datetime) -> Optional[datetime]:
+    """
+    The rule's first occurrence after `after`, or None once it has ended.
+    """
+    _, times = expand([rule], dtstart, after, after + MAX_LOOKAHEAD, limit=1)
+    return times[0].astype(datetime) if len(times) else None
@@ -1,56 +1,76 @@
+import time
+from sqlalchemy import text, update
 from sqlmodel import Session, select
 from datetime import datetime
-from app.models.todo import Todo
-from app.events.publisher import publish_event
+from app.core.config import settings
+from app.models.todo import REMINDER_PENDING, Todo
+from app.events.outbox import add_event
+from app.services.versions import record_changes
 import logging
 
 logger = logging.getLogger(__name__)
 
-def check_and_publish_reminders(db: Session):
+def check_and_publish_reminders(db: Session, chunk_size: int = settings.REMINDER_CHUNK_SIZE) -> dict:
     """
     Finds tasks with pending reminders and publishes them to the 'reminders' topic.
+
+    Due rows are read from the partial reminder index in fixed-size chunks.
+    Each chunk is locked with SKIP LOCKED, so concurrent runs on other
+    replicas take different rows. It is marked sent with one UPDATE and
+    committed together with its outbox events. Returns per-run stats.
     """
+    started = time.perf_counter()
     now = datetime.utcnow()
-    
+    stats = {"scanned": 0, "published": 0, "chunks": 0}
+
     # Query for tasks where reminder_time is passed, not yet sent, and task is not completed
-    statement = select(Todo).where(
-        Todo.reminder_time <= now,
-        Todo.reminder_sent == False,
-        Todo.status != "completed"
+    statement = (
+        select(Todo.id, Todo.user_id, Todo.title, Todo.due_date)
+        .where(Todo.reminder_time <= now, text(REMINDER_PENDING))
+        .order_by(Todo.reminder_time)
+        .limit(chunk_size)
+        .with_for_update(skip_locked=True)
     )
-    
-    tasks = db.exec(statement).all()
-    
-    if not tasks:
-        logger.info("No pending reminders found.")
-        return
 
-    logger.info(f"Found {len(tasks)} pending reminders.")
+    while True:
+        rows = db.exec(statement).all()
+        if not rows:
+            break
+        stats["chunks"] += 1
+        stats["scanned"] += len(rows)
 
-    for task in tasks:
-        try:
-            # Publish event
+        for task_id, user_id, title, due_date in rows:
             reminder_payload = {
-                "reminder_id": f"rem-{task.id}-{int(now.timestamp())}",
-                "task_id": task.id,
-                "user_id": task.user_id,
-                "message": f"Reminder: Task '{task.title}' is due on {task.due_date}",
-                "due_date": str(task.due_date)
+                "reminder_id": f"rem-{task_id}-{int(now.timestamp())}",
+                "task_id": task_id,
+                "user_id": user_id,
+                "message": f"Reminder: Task '{title}' is due on {due_date}",
+                "due_date": str(due_date)
             }
-            
-            publish_event("reminders", reminder_payload, event_type="task.reminder")
-            
-            # Mark as sent
-            task.reminder_sent = True
-            db.add(task)
-            
+            add_event(db, "reminders", reminder_payload, event_type="task.reminder")
+
+        # Mark as sent
+        db.exec(
+            update(Todo)
+            .where(Todo.id.in_([row[0] for row in rows]))
+            .values(reminder_sent=True)
+            .execution_options(synchronize_session=False)
+        )
+        record_changes(db, [(row[1], row[0], False) for row in rows])
+        try:
+            db.commit()
         except Exception as e:
-            logger.error(f"Failed to publish reminder for task {task.id}: {e}")
-            # Continue to next task, don't break loop
-            
-    try:
-        db.commit()
-        logger.info("Processed reminders and updated DB state.")
-    except Exception as e:
-        logger.error(f"Failed to commit reminder state updates: {e}")
-        db.rollback()
+            logger.error(f"Failed to commit reminder state updates: {e}")
+            db.rollback()
+            raise
+        stats["published"] += len(rows)
+
+        if len(rows) < chunk_size:
+            break
+
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    if stats["scanned"]:
+        logger.info(f"Processed reminders: {stats}")
+    else:
+        logger.info("No pending reminders found.")
+    return stats
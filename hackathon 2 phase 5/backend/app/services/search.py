@@ -0,0 +1,123 @@
+import re
+from typing import List, Optional
+
+from sqlalchemy import column, event, func, literal_column, table, text
+from sqlmodel import select
+from sqlmodel.sql.expression import SelectOfScalar
+
+from app.models.todo import Todo
+
+# Full-text search over todo titles and descriptions. Postgres keeps a
+# generated tsvector column with a GIN index; SQLite keeps an FTS5
+# external-content table in sync with triggers. Neither is part of the
+# Todo model, so they are invisible to regular queries.
+#
+# Both use English stemming and prefix matching, and require every term
+# outside STOPWORDS to match, so results agree across the two.
+
+STOPWORDS = {
+    "a", "an", "the", "one", "my", "me", "i", "to", "of", "for", "and", "or",
+    "in", "on", "at", "with", "is", "it", "todo", "todos", "task", "tasks",
+}
+
+todo_fts = table("todo_fts", column("rowid"))
+
+POSTGRES_DDL = [
+    """
+    ALTER TABLE todo ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_todo_search_vector ON todo USING GIN (search_vector)",
+]
+
+SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todo_fts USING fts5(
+        title, description, content='todo', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_fts_insert AFTER INSERT ON todo BEGIN
+        INSERT INTO todo_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_fts_delete AFTER DELETE ON todo BEGIN
+        INSERT INTO todo_fts(todo_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todo_fts_update AFTER UPDATE OF title, description ON todo BEGIN
+        INSERT INTO todo_fts(todo_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO todo_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+]
+
+def install_search_index(connection):
+    """
+    Creates the search column/index or FTS table for the connection's
+    dialect if missing. Safe to run on every startup.
+    """
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for ddl in POSTGRES_DDL:
+            connection.execute(text(ddl))
+    elif dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todo_fts'")
+        ).first()
+        for ddl in SQLITE_DDL:
+            connection.execute(text(ddl))
+        if not exists:
+            # Index rows written before the FTS table existed
+            connection.execute(text("INSERT INTO todo_fts(todo_fts) VALUES ('rebuild')"))
+
+@event.listens_for(Todo.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    install_search_index(connection)
+
+@event.listens_for(Todo.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS todo_fts"))
+
+def search_terms(query: str) -> List[str]:
+    # Words only: operators and quotes in user input never reach the
+    # FTS5 / tsquery parsers
+    words = re.findall(r"[^\W_]+", query.lower())
+    return [word for word in words if word not in STOPWORDS][:16]
+
+def search_statement(dialect: str, user_id: int, query: str) -> Optional[SelectOfScalar]:
+    """
+    The user's todos matching every term of `query`, best match first.
+    None if the query has no searchable terms.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return None
+    statement = select(Todo).where(Todo.user_id == user_id)
+
+    if dialect == "postgresql":
+        vector = literal_column("todo.search_vector")
+        tsquery = func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+        return statement.where(vector.op("@@")(tsquery)).order_by(func.ts_rank_cd(vector, tsquery).desc(), Todo.id)
+
+    if dialect == "sqlite":
+        fts = literal_column("todo_fts")
+        match = " ".join(f'"{term}"*' for term in terms)
+        return (
+            statement.join(todo_fts, todo_fts.c.rowid == Todo.id)
+            .where(fts.op("MATCH")(match))
+            # bm25 is lower for better matches; title hits weigh more
+            .order_by(func.bm25(fts, 10.0, 1.0), Todo.id)
+        )
+
+    # Other databases: unranked substring match
+    for term in terms:
+        pattern = f"%{term}%"
+        statement = statement.where(Todo.title.ilike(pattern) | Todo.description.ilike(pattern))
+    return statement.order_by(Todo.id)
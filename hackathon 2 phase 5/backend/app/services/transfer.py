@@ -0,0 +1,280 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, List, Literal, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+
+from app.core.config import settings
+from app.models.todo import Todo
+from app.services.versions import record_inserted
+
+# Bulk export and import of a user's todos. Both sides stream: the export
+# reads from a server-side cursor and serializes rows straight from the
+# driver's tuples, the import parses the request body as it arrives and
+# writes it TODO_IMPORT_BATCH_SIZE rows at a time (COPY on Postgres,
+# executemany elsewhere). Memory stays flat in the number of rows, and
+# neither side builds a Todo or a Pydantic model per row.
+
+Format = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+EXPORT_COLUMNS = [
+    "id", "title", "description", "status", "created_at", "updated_at",
+    "due_date", "recurrence_rule", "reminder_time", "reminder_sent",
+]
+
+# Written by the import; an exported id or updated_at is ignored, so an
+# export can be imported again as new todos
+IMPORT_COLUMNS = [
+    "user_id", "title", "description", "status", "created_at", "updated_at",
+    "due_date", "recurrence_rule", "reminder_time", "reminder_sent",
+]
+
+STATUSES = {"pending", "completed"}
+
+# Longest line the import buffers while waiting for its end
+MAX_LINE_LENGTH = 1024 * 1024
+
+class InvalidImport(ValueError):
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(f"line {line}: {message}" if line else message)
+        self.line = line
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=_json_default) + "\n" for row in rows
+    )
+
+def _csv_chunk(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+async def export_todos(session, user_id: int, format: Format) -> AsyncIterator[str]:
+    """
+    The user's todos in id order, one chunk of serialized rows per
+    TODO_EXPORT_BATCH_SIZE fetched from the cursor.
+    """
+    columns = [getattr(Todo, name) for name in EXPORT_COLUMNS]
+    statement = (
+        select(*columns)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .execution_options(yield_per=settings.TODO_EXPORT_BATCH_SIZE)
+    )
+    serialize = _ndjson_chunk if format == "ndjson" else _csv_chunk
+    if format == "csv":
+        yield ",".join(EXPORT_COLUMNS) + "\n"
+    result = await session.stream(statement)
+    try:
+        async for rows in result.partitions():
+            yield serialize(rows)
+    finally:
+        await result.close()
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[List[str]]:
+    """
+    The upload's complete lines, newline included, as many as each chunk
+    finishes.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    tail = ""
+    try:
+        async for chunk in chunks:
+            lines = (tail + decoder.decode(chunk)).split("\n")
+            tail = lines.pop()
+            if len(tail) > MAX_LINE_LENGTH:
+                raise InvalidImport(f"a line is longer than {MAX_LINE_LENGTH} characters")
+            if lines:
+                yield [line + "\n" for line in lines]
+        tail += decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        raise InvalidImport("the upload is not UTF-8")
+    if tail:
+        yield [tail]
+
+async def _ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[List[Tuple[int, dict]]]:
+    line_number = 0
+    async for lines in _lines(chunks):
+        records = []
+        for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise InvalidImport("not a JSON object", line_number)
+            if not isinstance(record, dict):
+                raise InvalidImport("not a JSON object", line_number)
+            records.append((line_number, record))
+        yield records
+
+def _ends_in_quotes(line: str, in_quotes: bool) -> bool:
+    """
+    Whether a quoted field is still open at the end of `line`, read the way
+    the csv module's default dialect reads it: a quote opens a field only
+    at the field's start, and a doubled quote inside one is a literal quote.
+    """
+    i = line.find('"')
+    while i != -1:
+        if in_quotes:
+            if line.startswith('"', i + 1):
+                i += 1
+            else:
+                in_quotes = False
+        elif i == 0 or line[i - 1] == ",":
+            in_quotes = True
+        i = line.find('"', i + 1)
+    return in_quotes
+
+async def _csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[List[Tuple[int, dict]]]:
+    header = None
+    # Lines handed to the csv module so far
+    consumed = 0
+    pending: List[str] = []
+    # Characters in the pending lines from the first incomplete one on
+    open_length = 0
+    in_quotes = False
+    async for lines in _lines(chunks):
+        # Hand the csv module whole records only: a quoted field may span
+        # lines, and a record ends on a line that leaves no field open
+        pending += lines
+        complete = 0
+        for i in range(len(pending) - len(lines), len(pending)):
+            in_quotes = _ends_in_quotes(pending[i], in_quotes)
+            open_length += len(pending[i])
+            if not in_quotes:
+                complete = i + 1
+                open_length = 0
+            elif open_length > MAX_LINE_LENGTH:
+                raise InvalidImport(f"a record is longer than {MAX_LINE_LENGTH} characters", consumed + complete + 1)
+        if not complete:
+            continue
+        batch, pending = pending[:complete], pending[complete:]
+        reader = csv.reader(batch)
+        if header is None:
+            header = next(reader, None)
+        records = []
+        for values in reader:
+            line_number = consumed + reader.line_num
+            if not values:
+                continue
+            if len(values) > len(header):
+                raise InvalidImport("more values than columns", line_number)
+            records.append((line_number, dict(zip(header, values))))
+        consumed += len(batch)
+        yield records
+    if pending:
+        raise InvalidImport("unterminated quoted field", consumed + 1)
+
+def _text(value, field: str) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{field} must be a string")
+    return value
+
+def _datetime(value, field: str) -> Optional[datetime]:
+    if value is None or value == "":
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an ISO 8601 date-time")
+    if parsed.tzinfo is not None:
+        # Stored as naive UTC, like the rest of the API
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _bool(value, field: str) -> bool:
+    if value is None or value == "":
+        return False
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.lower() in ("true", "1", "false", "0"):
+        return value.lower() in ("true", "1")
+    raise ValueError(f"{field} must be true or false")
+
+def _todo_row(record: dict, user_id: int, now: datetime) -> tuple:
+    title = record.get("title")
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("title is required")
+    status = record.get("status") or "pending"
+    if status not in STATUSES:
+        raise ValueError("status must be pending or completed")
+    # In IMPORT_COLUMNS order
+    return (
+        user_id,
+        title,
+        _text(record.get("description"), "description"),
+        status,
+        _datetime(record.get("created_at"), "created_at") or now,
+        now,
+        _datetime(record.get("due_date"), "due_date"),
+        _text(record.get("recurrence_rule"), "recurrence_rule"),
+        _datetime(record.get("reminder_time"), "reminder_time"),
+        _bool(record.get("reminder_sent"), "reminder_sent"),
+    )
+
+async def _insert(connection, rows: List[tuple]):
+    if connection.dialect.driver == "asyncpg":
+        # The session's transaction is already open on this connection, so
+        # COPY commits or rolls back with the rest of the import
+        raw = await connection.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            Todo.__tablename__, records=rows, columns=IMPORT_COLUMNS
+        )
+    else:
+        await connection.execute(
+            insert(Todo.__table__), [dict(zip(IMPORT_COLUMNS, row)) for row in rows]
+        )
+
+async def import_todos(session, user_id: int, chunks: AsyncIterable[bytes], format: Format) -> int:
+    """
+    Inserts the todos in an NDJSON or CSV upload for the user and returns
+    how many there were. Nothing is committed: the caller commits, or rolls
+    back on InvalidImport, which names the offending line.
+    """
+    records = _ndjson_records(chunks) if format == "ndjson" else _csv_records(chunks)
+    # Opens the transaction; every id the import is given is above this one
+    after_id = (await session.exec(select(func.max(Todo.id)))).scalar() or 0
+    connection = await session.connection()
+    now = datetime.utcnow()
+    batch: List[tuple] = []
+    count = 0
+    async for chunk in records:
+        for line_number, record in chunk:
+            try:
+                batch.append(_todo_row(record, user_id, now))
+            except ValueError as e:
+                raise InvalidImport(str(e), line_number)
+        if len(batch) >= settings.TODO_IMPORT_BATCH_SIZE:
+            await _insert(connection, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        await _insert(connection, batch)
+        count += len(batch)
+    if count:
+        await session.run_sync(lambda sync_session: record_inserted(sync_session, user_id, after_id))
+    return count
@@ -0,0 +1,154 @@
+from typing import Dict, Iterable, Tuple
+
+from sqlalchemy import delete, event, false, insert, literal, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from sqlmodel import select
+
+from app.events.hub import hub
+from app.models.todo import Todo, TodoChange, TodoCollectionVersion
+
+# (user_id, todo_id, deleted)
+Change = Tuple[int, int, bool]
+
+# Session.info key: versions written by the session's current transaction
+_COMMITTED_VERSIONS = "todo_versions"
+
+def _dialect(connection: Connection):
+    return {"postgresql": postgresql, "sqlite": sqlite}.get(connection.dialect.name)
+
+def bump_versions(connection: Connection, user_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Increments the todo version of each user, creating missing rows. Runs on
+    the caller's connection so it commits or rolls back with the write.
+    Returns the new version of each user.
+
+    Writes to Todo should go through record_changes so the change feed
+    sees them; this alone only invalidates versioned caches.
+    """
+    # Sorted so concurrent transactions lock version rows in the same order
+    user_ids = sorted({id for id in user_ids if id is not None})
+    if not user_ids:
+        return {}
+    table = TodoCollectionVersion.__table__
+    dialect = _dialect(connection)
+    if dialect is not None:
+        statement = dialect.insert(table).values([{"user_id": id, "version": 1} for id in user_ids])
+        result = connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"version": table.c.version + 1},
+        ).returning(table.c.user_id, table.c.version))
+        return dict(result.all())
+    for id in user_ids:
+        result = connection.execute(update(table).where(table.c.user_id == id).values(version=table.c.version + 1))
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(user_id=id, version=1))
+    return dict(connection.execute(
+        select(table.c.user_id, table.c.version).where(table.c.user_id.in_(user_ids))
+    ).all())
+
+def record_changes(session: Session, changes: Iterable[Change]):
+    """
+    Bumps the version of every user in `changes` and stamps each changed
+    todo's TodoChange row with it, in the session's transaction. The
+    users' realtime connections are notified once it commits.
+
+    ORM writes to Todo are covered by the flush hook below; call this
+    directly after set-based statements such as update(Todo) or delete(Todo).
+    """
+    connection = session.connection()
+    # The last change to a todo wins; one row per key keeps the upsert valid
+    latest = {(user_id, todo_id): deleted for user_id, todo_id, deleted in changes if user_id is not None}
+    versions = bump_versions(connection, [user_id for user_id, _ in latest])
+    if not latest:
+        return
+    session.info.setdefault(_COMMITTED_VERSIONS, {}).update(versions)
+    rows = [
+        {"user_id": user_id, "todo_id": todo_id, "seq": versions[user_id], "deleted": deleted}
+        for (user_id, todo_id), deleted in sorted(latest.items())
+    ]
+    table = TodoChange.__table__
+    dialect = _dialect(connection)
+    if dialect is not None:
+        statement = dialect.insert(table).values(rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.todo_id],
+            set_={"seq": statement.excluded.seq, "deleted": statement.excluded.deleted},
+        ))
+        return
+    for row in rows:
+        result = connection.execute(
+            update(table)
+            .where(table.c.user_id == row["user_id"], table.c.todo_id == row["todo_id"])
+            .values(seq=row["seq"], deleted=row["deleted"])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(table).values(**row))
+
+def record_inserted(session: Session, user_id: int, after_id: int):
+    """
+    record_changes for todos of `user_id` inserted in bulk (e.g. by COPY)
+    with ids above `after_id`, without listing them: one version bump and
+    a single INSERT ... SELECT of their change rows.
+    """
+    connection = session.connection()
+    version = bump_versions(connection, [user_id])[user_id]
+    table = TodoChange.__table__
+    todos = Todo.__table__
+    columns = [table.c.user_id, table.c.todo_id, table.c.seq, table.c.deleted]
+    rows = select(todos.c.user_id, todos.c.id, literal(version), false()).where(
+        todos.c.user_id == user_id, todos.c.id > after_id
+    )
+    dialect = _dialect(connection)
+    if dialect is not None:
+        # SQLite may hand out the id of a deleted todo again, which can
+        # still have a tombstone
+        statement = dialect.insert(table).from_select(columns, rows)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.todo_id],
+            set_={"seq": statement.excluded.seq, "deleted": statement.excluded.deleted},
+        ))
+    else:
+        connection.execute(delete(table).where(
+            table.c.user_id == user_id, table.c.todo_id.in_(rows.with_only_columns(todos.c.id))
+        ))
+        connection.execute(insert(table).from_select(columns, rows))
+    session.info.setdefault(_COMMITTED_VERSIONS, {})[user_id] = version
+
+def _version_statement(user_id: int):
+    return select(TodoCollectionVersion.version).where(TodoCollectionVersion.user_id == user_id)
+
+def get_version(session, user_id: int) -> int:
+    """
+    Current todo version of a user; 0 before their first write.
+    """
+    return session.exec(_version_statement(user_id)).first() or 0
+
+async def get_version_async(session, user_id: int) -> int:
+    """
+    get_version for an AsyncSession.
+    """
+    result = await session.exec(_version_statement(user_id))
+    return result.first() or 0
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_changes(session: Session, flush_context):
+    # new/dirty/deleted still describe what was just flushed
+    changes = [(obj.user_id, obj.id, False) for obj in session.new if isinstance(obj, Todo)]
+    changes += [
+        (obj.user_id, obj.id, False) for obj in session.dirty
+        if isinstance(obj, Todo) and session.is_modified(obj, include_collections=False)
+    ]
+    changes += [(obj.user_id, obj.id, True) for obj in session.deleted if isinstance(obj, Todo)]
+    if changes:
+        record_changes(session, changes)
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed_versions(session: Session):
+    for user_id, version in session.info.pop(_COMMITTED_VERSIONS, {}).items():
+        hub.notify_changed(user_id, version)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session: Session):
+    session.info.pop(_COMMITTED_VERSIONS, None)
@@ -0,0 +1,85 @@
+"""
+Per-request overhead of AiService.process_chat with Gemini stubbed out:
+building a GenerativeModel and tool declarations for every chat (the old
+behaviour) versus the shared model registry with per-request dispatch.
+
+The stub answers each message with one list_todos call and then a text
+reply, so both paths run a full function-calling round.
+
+    python benchmarks/bench_ai_overhead.py --requests 2000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+import google.generativeai as genai
+from google.generativeai import protos
+from google.generativeai.types import generation_types
+from sqlmodel import Session, SQLModel, create_engine
+
+from app.core.ai_config import ai_settings
+from app.core.ai_service import AiService
+from app.core.ai_tools import AiTools
+from app.models.user import User
+
+def model_response(part: protos.Part):
+    return generation_types.GenerateContentResponse.from_response(protos.GenerateContentResponse(candidates=[
+        protos.Candidate(
+            content=protos.Content(role="model", parts=[part]),
+            finish_reason=protos.Candidate.FinishReason.STOP,
+        )
+    ]))
+
+def stub_generate_content(self, contents, **kwargs):
+    # Serialize the request like the real client would
+    self._prepare_request(contents=contents, tools=kwargs.get("tools"), tool_config=None)
+    if contents[-1].parts[0].function_response:
+        return model_response(protos.Part(text="You have no todos."))
+    return model_response(protos.Part(function_call=protos.FunctionCall(name="list_todos", args={})))
+
+def process_chat_per_request(message: str, tools: AiTools) -> str:
+    model = genai.GenerativeModel(
+        model_name=ai_settings.GEMINI_MODEL,
+        tools=[tools.create_todo, tools.list_todos, tools.update_todo, tools.mark_todo, tools.delete_todo],
+    )
+    chat = model.start_chat(enable_automatic_function_calling=True)
+    return chat.send_message(message).text
+
+def measure(process_chat, tools: AiTools, requests: int) -> list:
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        process_chat("What is on my list?", tools)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+def main(requests: int):
+    genai.GenerativeModel.generate_content = stub_generate_content
+    engine = create_engine("sqlite:///:memory:")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        tools = AiTools(session=session, user=user)
+
+        for name, process_chat in (("per-request", process_chat_per_request), ("registry", AiService.process_chat)):
+            measure(process_chat, tools, 20)
+            latencies = measure(process_chat, tools, requests)
+            print(
+                f"{name:<12} p50={statistics.median(latencies) * 1000:.3f}ms "
+                f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f}ms"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.requests)
@@ -0,0 +1,110 @@
+"""
+Compares the async todo list endpoint against an equivalent sync handler at
+the same concurrency. The sync handler is the pre-async read_todos: a plain
+`def` on the sync engine, so every request holds a Starlette thread-pool
+worker for the length of its query.
+
+    python benchmarks/bench_async_db.py --requests 2000 --concurrency 100
+    DATABASE_URL=postgresql://... python benchmarks/bench_async_db.py
+
+Without DATABASE_URL a seeded SQLite file is used.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlmodel import Session, SQLModel, select
+
+from app.api import deps
+from app.api.v1.endpoints import todos
+from app.core import security
+from app.db import session as db
+from app.models.todo import Todo
+from app.models.user import User
+
+def seed(rows: int) -> int:
+    SQLModel.metadata.create_all(db.engine)
+    with Session(db.engine) as session:
+        user = session.exec(select(User).where(User.email == "bench@example.com")).first()
+        if not user:
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+            session.add_all(Todo(title=f"Todo {i}", user_id=user.id) for i in range(rows))
+            session.commit()
+        return user.id
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(todos.router, prefix="/async/todos")
+
+    @app.get("/sync/todos")
+    def read_todos_sync(
+        session: Session = Depends(db.get_session),
+        limit: int = 100,
+        current_user: User = Depends(deps.get_current_user),
+    ):
+        statement = select(Todo).where(Todo.user_id == current_user.id).limit(limit)
+        return session.exec(statement).all()
+
+    return app
+
+async def run(client: httpx.AsyncClient, path: str, headers: dict, requests: int, concurrency: int):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+async def main(requests: int, concurrency: int, rows: int):
+    user_id = seed(rows)
+    token = security.create_access_token(user_id)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    transport = httpx.ASGITransport(app=build_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/sync/todos", "/async/todos"):
+            # Warm up pools and caches before measuring
+            await run(client, path, headers, min(requests, 100), concurrency)
+            result = await run(client, path, headers, requests, concurrency)
+            print(
+                f"{path:<14} concurrency={concurrency} "
+                f"rps={result['rps']:.0f} p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms"
+            )
+
+    await db.async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+    # SQL echo would dominate the timings
+    db.engine.echo = False
+    db.async_engine.echo = False
+    asyncio.run(main(args.requests, args.concurrency, args.rows))
@@ -0,0 +1,77 @@
+"""
+Items per second for creating and deleting todos one request at a time
+versus through the /todos/bulk endpoints.
+
+    python benchmarks/bench_bulk.py --items 2000 --batch 500
+    DATABASE_URL=postgresql://... python benchmarks/bench_bulk.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session, SQLModel, select
+
+from app.api.v1.endpoints import todos
+from app.core import security
+from app.db import session as db
+from app.models.user import User
+
+def seed_user() -> int:
+    SQLModel.metadata.create_all(db.engine)
+    with Session(db.engine) as session:
+        user = session.exec(select(User).where(User.email == "bench@example.com")).first()
+        if not user:
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        return user.id
+
+async def per_item(client: httpx.AsyncClient, headers: dict, items: int) -> float:
+    start = time.perf_counter()
+    ids = []
+    for i in range(items):
+        response = await client.post("/todos", headers=headers, json={"title": f"Item {i}"})
+        ids.append(response.json()["id"])
+    for id in ids:
+        await client.delete(f"/todos/{id}", headers=headers)
+    return time.perf_counter() - start
+
+async def bulk(client: httpx.AsyncClient, headers: dict, items: int, batch: int) -> float:
+    start = time.perf_counter()
+    ids = []
+    for offset in range(0, items, batch):
+        payload = {"items": [{"title": f"Item {i}"} for i in range(offset, min(items, offset + batch))]}
+        response = await client.post("/todos/bulk", headers=headers, json=payload)
+        ids += [r["id"] for r in response.json()["results"]]
+    for offset in range(0, len(ids), batch):
+        await client.request("DELETE", "/todos/bulk", headers=headers, json={"ids": ids[offset:offset + batch]})
+    return time.perf_counter() - start
+
+async def main(items: int, batch: int):
+    headers = {"Authorization": f"Bearer {security.create_access_token(seed_user())}"}
+    app = FastAPI()
+    app.include_router(todos.router, prefix="/todos")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        elapsed = await per_item(client, headers, items)
+        print(f"per-item  {items} created+deleted in {elapsed:.2f}s  {2 * items / elapsed:.0f} items/s")
+        elapsed = await bulk(client, headers, items, batch)
+        print(f"bulk({batch}) {items} created+deleted in {elapsed:.2f}s  {2 * items / elapsed:.0f} items/s")
+
+    await db.async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.items, args.batch))
@@ -0,0 +1,122 @@
+"""
+Measures what the transactional outbox costs and delivers: PUT /todos/{id}
+latency with and without the outbox insert in the request's transaction,
+then how fast OutboxRelay drains the rows those requests left behind.
+
+No sidecar is needed: a stub client sleeps for --sidecar-ms per call to stand
+in for the gRPC round trip.
+
+    python benchmarks/bench_publish.py --requests 500 --sidecar-ms 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import delete, func
+from sqlmodel import Session, SQLModel, select
+
+from app.api.v1.endpoints import todos
+from app.core import security
+from app.db import session as db
+from app.events.outbox import OutboxRelay
+from app.events.publisher import EventPublisher
+from app.models.outbox import OutboxEvent
+from app.models.todo import Todo
+from app.models.user import User
+
+class StubClient:
+    delay = 0.005
+
+    def close(self): pass
+
+    def publish_event(self, **kwargs):
+        time.sleep(self.delay)
+
+    def publish_events(self, data, **kwargs):
+        time.sleep(self.delay)
+
+def seed() -> tuple:
+    SQLModel.metadata.create_all(db.engine)
+    with Session(db.engine) as session:
+        user = session.exec(select(User).where(User.email == "bench@example.com")).first()
+        if not user:
+            user = User(username="bench", email="bench@example.com", hashed_password="x")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        todo = Todo(title="Bench", user_id=user.id)
+        session.add(todo)
+        # Start from an empty outbox so the drain only sees this run's rows
+        session.exec(delete(OutboxEvent))
+        session.commit()
+        return user.id, todo.id
+
+def pending_events() -> int:
+    with Session(db.engine) as session:
+        return session.exec(select(func.count()).select_from(OutboxEvent).where(OutboxEvent.status == "pending")).one()
+
+async def measure(client: httpx.AsyncClient, path: str, headers: dict, requests: int) -> list:
+    latencies = []
+    for i in range(requests):
+        start = time.perf_counter()
+        response = await client.put(path, headers=headers, json={"title": f"Bench {i}"})
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+    latencies.sort()
+    return latencies
+
+async def main(requests: int):
+    user_id, todo_id = seed()
+    headers = {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+    app = FastAPI()
+    app.include_router(todos.router, prefix="/todos")
+    path = f"/todos/{todo_id}"
+
+    add_event = todos.add_event
+    modes = {
+        "off": lambda *args, **kwargs: None,
+        "on": add_event,
+    }
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, add in modes.items():
+            todos.add_event = add
+            await measure(client, path, headers, 20)
+            latencies = await measure(client, path, headers, requests)
+            print(
+                f"outbox={name:<4} p50={statistics.median(latencies) * 1000:.2f}ms "
+                f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.2f}ms"
+            )
+    todos.add_event = add_event
+
+    publisher = EventPublisher(client_factory=StubClient, enabled=True)
+    relay = OutboxRelay(engine=db.engine, event_publisher=publisher)
+    backlog = pending_events()
+    start = time.perf_counter()
+    while relay.relay_once():
+        pass
+    elapsed = time.perf_counter() - start
+    print(
+        f"relay drained {backlog} events in {elapsed:.2f}s ({backlog / elapsed:.0f}/s) "
+        f"with batch_size={relay.batch_size}: {relay.stats()}"
+    )
+
+    publisher.close()
+    await db.async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sidecar-ms", type=float, default=5)
+    args = parser.parse_args()
+    StubClient.delay = args.sidecar_ms / 1000
+    asyncio.run(main(args.requests))
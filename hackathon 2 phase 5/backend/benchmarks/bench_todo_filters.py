@@ -0,0 +1,171 @@
+"""
+Query plans and latency of filtered, sorted GET /todos pages on a seeded
+dataset (100k todos by default, spread over --users users).
+
+For every query shape the endpoint builds, prints the database plan and
+flags it if the table is scanned or the rows are sorted outside an index,
+then times the first and a later keyset page through the endpoint.
+
+    python benchmarks/bench_todo_filters.py --rows 100000
+    DATABASE_URL=postgresql://... python benchmarks/bench_todo_filters.py
+
+Without DATABASE_URL a seeded SQLite file is used.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import func, insert
+from sqlmodel import Session, SQLModel, select
+
+from app.api.v1.endpoints import todos
+from app.core import security
+from app.db import session as db
+from app.models.todo import Todo
+from app.models.user import User
+from app.services.pagination import keyset_statements, todo_list_statement
+
+NOW = datetime(2030, 1, 1)
+
+# (label, query parameters) for the views the web client shows
+QUERIES = [
+    ("all by id", {}),
+    ("all by id desc", {"direction": "desc"}),
+    ("all by due date", {"order_by": "due_date"}),
+    ("pending by id", {"status": "pending"}),
+    ("pending by due date", {"status": "pending", "order_by": "due_date"}),
+    ("pending due this week", {
+        "status": "pending", "order_by": "due_date",
+        "due_after": NOW.isoformat(), "due_before": (NOW + timedelta(days=7)).isoformat(),
+    }),
+    ("completed by due date desc", {"status": "completed", "order_by": "due_date", "direction": "desc"}),
+    ("pending with reminder", {"status": "pending", "order_by": "due_date", "has_reminder": "true"}),
+    ("weekly by due date", {"order_by": "due_date", "recurrence_rule": "weekly"}),
+    ("pending without reminder", {"status": "pending", "order_by": "due_date", "has_reminder": "false"}),
+]
+
+def seed(rows: int, users: int) -> int:
+    SQLModel.metadata.create_all(db.engine)
+    db.create_db_and_tables()
+    with Session(db.engine) as session:
+        ids = []
+        for i in range(users):
+            email = f"bench{i}@example.com"
+            user = session.exec(select(User).where(User.email == email)).first()
+            if not user:
+                user = User(username=f"bench{i}", email=email, hashed_password="x")
+                session.add(user)
+                session.commit()
+                session.refresh(user)
+            ids.append(user.id)
+        existing = session.exec(select(func.count()).select_from(Todo).where(Todo.user_id.in_(ids))).one()
+
+    random.seed(1)
+    batch = []
+    with db.engine.begin() as connection:
+        for i in range(existing, rows):
+            due = NOW + timedelta(hours=random.randint(-24 * 90, 24 * 90)) if random.random() < 0.8 else None
+            batch.append({
+                "title": f"Bench todo {i}",
+                "status": "completed" if random.random() < 0.6 else "pending",
+                "due_date": due,
+                "reminder_time": due - timedelta(hours=1) if due and random.random() < 0.2 else None,
+                "reminder_sent": False,
+                "recurrence_rule": random.choice([None] * 8 + ["daily", "weekly"]),
+                "created_at": NOW,
+                "updated_at": NOW,
+                "user_id": ids[i % users],
+            })
+            if len(batch) == 5000:
+                connection.execute(insert(Todo), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(Todo), batch)
+        if db.engine.dialect.name == "postgresql":
+            connection.exec_driver_sql("ANALYZE todo")
+        else:
+            connection.exec_driver_sql("ANALYZE")
+    return ids[0]
+
+def statement_for(user_id: int, params: dict):
+    # The first page's statement, built the way GET /todos builds it
+    statement = todo_list_statement(
+        user_id,
+        status=params.get("status"),
+        due_after=datetime.fromisoformat(params["due_after"]) if "due_after" in params else None,
+        due_before=datetime.fromisoformat(params["due_before"]) if "due_before" in params else None,
+        has_reminder=params["has_reminder"] == "true" if "has_reminder" in params else None,
+        recurrence_rule=params.get("recurrence_rule"),
+    )
+    return keyset_statements(
+        statement, sort=params.get("order_by", "id"), descending=params.get("direction") == "desc"
+    )[0].limit(51)
+
+def explain(statement) -> list:
+    compiled = statement.compile(db.engine)
+    with db.engine.connect() as connection:
+        if db.engine.dialect.name == "postgresql":
+            rows = connection.exec_driver_sql("EXPLAIN " + compiled.string, compiled.params)
+            return [row[0] for row in rows]
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + compiled.string, tuple(compiled.params[name] for name in compiled.positiontup)
+        )
+        return [row[-1] for row in rows]
+
+def problems(plan: list) -> list:
+    text = "\n".join(plan)
+    found = []
+    if "Seq Scan" in text or any(line.startswith("SCAN todo") and "INDEX" not in line for line in plan):
+        found.append("table scan")
+    if "USE TEMP B-TREE" in text or "Sort " in text or text.startswith("Sort"):
+        found.append("sort")
+    return found
+
+async def time_pages(client: httpx.AsyncClient, headers: dict, params: dict, requests: int) -> tuple:
+    first, later = [], []
+    for _ in range(requests):
+        start = time.perf_counter()
+        page = (await client.get("/todos", headers=headers, params={**params, "cursor": "", "limit": 50})).json()
+        first.append(time.perf_counter() - start)
+        if page["next_cursor"]:
+            start = time.perf_counter()
+            await client.get("/todos", headers=headers, params={**params, "cursor": page["next_cursor"], "limit": 50})
+            later.append(time.perf_counter() - start)
+    return statistics.median(first) * 1000, statistics.median(later) * 1000 if later else 0.0
+
+async def main(rows: int, users: int, requests: int):
+    user_id = seed(rows, users)
+    headers = {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+    app = FastAPI()
+    app.include_router(todos.router, prefix="/todos")
+
+    print(f"{db.engine.dialect.name}, {rows} todos over {users} users\n")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, params in QUERIES:
+            plan = explain(statement_for(user_id, params))
+            flagged = problems(plan)
+            first, later = await time_pages(client, headers, params, requests)
+            print(f"{label:28} first page {first:6.2f}ms  next page {later:6.2f}ms  {'; '.join(flagged) or 'index range scan, no sort'}")
+            for line in plan:
+                print(f"    {line}")
+
+    await db.async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.users, args.requests))
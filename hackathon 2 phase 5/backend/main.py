@@ -2,7 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.api import api_router
+from app.core.audit import audit_sink
+from app.core.hashing import password_hasher
 from app.db.session import create_db_and_tables
+from app.events.outbox import outbox_relay
+from app.events.publisher import publisher
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -35,7 +39,16 @@ def on_startup():
         create_db_and_tables()
     except Exception as e:
         print(f"Error creating tables: {e}")
-    pass
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # Stop relaying, then deliver events still queued in the publisher
+    outbox_relay.stop()
+    publisher.close()
+    audit_sink.close()
+    password_hasher.close()
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
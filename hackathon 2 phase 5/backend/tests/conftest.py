@@ -2,24 +2,37 @@ import os
 import pytest
 from typing import Generator
 from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
 from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 # Mock DATABASE_URL before importing app modules strictly requiring it
 os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+# Cheap bcrypt cost keeps auth tests fast
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["CHAT_MEMORY_STORE"] = "memory"
 
 from main import app
-from app.db.session import get_session
+from app.db.session import get_async_session, get_session
 from app.core.config import settings
+from app.core.cache import response_cache, user_cache
+from app.core.conversation import MemoryStateStore, conversation_memory
 
 # Use SQLite for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
 )
+# TestClient may run each request on a new event loop, so async connections
+# are not pooled across requests
+async_engine = create_async_engine("sqlite+aiosqlite:///./test.db", poolclass=NullPool)
 
 @pytest.fixture(name="session")
 def session_fixture():
     SQLModel.metadata.create_all(engine)
+    # Todo versions restart with the tables, so replies cached under them must go
+    response_cache.clear()
     with Session(engine) as session:
         yield session
     SQLModel.metadata.drop_all(engine)
@@ -29,7 +42,16 @@ def client_fixture(session: Session):
     def get_session_override():
         return session
     
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            yield async_session
+
     app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    # Ids are reused once the tables are dropped, so cached users and chat
+    # histories must go too
+    user_cache.clear()
+    conversation_memory.store = MemoryStateStore()
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -0,0 +1,88 @@
+import google.generativeai as genai
+from google.generativeai import protos
+from google.generativeai.types import generation_types
+from sqlmodel import Session, select
+
+from app.core.ai_config import AISettings
+from app.core.ai_service import AiService, ModelRegistry, TOOL_NAMES
+from app.core import ai_service
+from app.core.ai_tools import AiTools
+from app.models.todo import Todo
+from app.models.user import User
+
+def model_response(part: protos.Part):
+    return generation_types.GenerateContentResponse.from_response(protos.GenerateContentResponse(candidates=[
+        protos.Candidate(
+            content=protos.Content(role="model", parts=[part]),
+            finish_reason=protos.Candidate.FinishReason.STOP,
+        )
+    ]))
+
+def test_tool_declarations_omit_self():
+    registry = ModelRegistry(AISettings(GEMINI_API_KEY="test"))
+    model, library = registry.get()
+    declaration = library["update_todo"].to_proto()
+    assert set(declaration.parameters.properties) == {"todo_id", "title", "description"}
+    assert list(declaration.parameters.required) == ["todo_id"]
+    assert [d.name for d in library.to_proto()[0].function_declarations] == list(TOOL_NAMES)
+
+def test_model_built_once_and_calls_dispatched_per_request(session: Session, monkeypatch):
+    registry = ModelRegistry(AISettings(GEMINI_API_KEY="test"))
+    monkeypatch.setattr(ai_service, "model_registry", registry)
+
+    def generate_content(self, contents, **kwargs):
+        if contents[-1].parts[0].function_response:
+            return model_response(protos.Part(text="Done"))
+        call = protos.FunctionCall(name="create_todo", args={"title": contents[-1].parts[0].text})
+        return model_response(protos.Part(function_call=call))
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+
+    users = []
+    for name in ("alice", "bob"):
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        users.append(user)
+
+    for user in users:
+        assert AiService.process_chat(f"{user.username} task", AiTools(session=session, user=user)) == "Done"
+
+    for user in users:
+        todos = session.exec(select(Todo).where(Todo.user_id == user.id)).all()
+        assert [todo.title for todo in todos] == [f"{user.username} task"]
+    assert registry.stats()["builds"] == 1
+    assert registry.stats()["requests"] == 2
+
+def test_reload_rebuilds_only_on_change():
+    registry = ModelRegistry(AISettings(GEMINI_API_KEY="test"))
+    model, _ = registry.get()
+    assert registry.reload(AISettings(GEMINI_API_KEY="test")) is False
+    assert registry.get()[0] is model
+
+    assert registry.reload(AISettings(GEMINI_API_KEY="test", GEMINI_MODEL="gemini-2.0-flash")) is True
+    new_model, _ = registry.get()
+    assert new_model is not model
+    assert new_model.model_name == "models/gemini-2.0-flash"
+
+def test_reload_endpoint(client, monkeypatch):
+    from app.api.v1.endpoints import internal
+    from app.core.config import settings
+
+    url = f"{settings.API_V1_STR}/internal/ai/reload"
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "ops-token")
+    assert client.post(url).status_code == 403
+
+    registry = ModelRegistry(AISettings(GEMINI_API_KEY="test"))
+    monkeypatch.setattr(internal, "model_registry", registry)
+    monkeypatch.setattr(internal, "AISettings", lambda: AISettings(GEMINI_API_KEY="test"))
+    response = client.post(url, headers={"X-Internal-Token": "ops-token"})
+    assert response.status_code == 200
+    assert response.json()["reloaded"] is True
+
+    # Bad settings are reported, and the current model kept
+    monkeypatch.setattr(internal, "AISettings", lambda: AISettings(GEMINI_API_KEY=None))
+    response = client.post(url, headers={"X-Internal-Token": "ops-token"})
+    assert response.status_code == 500
+    assert "GEMINI_API_KEY" in response.json()["detail"]
+    assert registry.stats()["builds"] == 1
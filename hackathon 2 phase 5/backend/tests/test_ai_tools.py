@@ -0,0 +1,68 @@
+import re
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.core.ai_tools import AiTools
+from app.core.audit import AuditSink
+from app.models.todo import Todo
+from app.models.user import User
+
+def make_tools(session: Session) -> AiTools:
+    user = User(username="heavy", email="heavy@example.com", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return AiTools(session=session, user=user, audit=AuditSink(enabled=False))
+
+def listed_ids(listing: str) -> list:
+    return [int(line.split(".")[0]) for line in listing.splitlines()[1:] if line[:1].isdigit()]
+
+def test_list_todos_filters_by_due_window_status_and_text(session: Session):
+    tools = make_tools(session)
+    now = datetime(2026, 10, 19, 9)
+    todos = [
+        Todo(title="Pay rent", due_date=now + timedelta(days=1), user_id=tools.user.id),
+        Todo(title="Call mum", due_date=now + timedelta(days=3), user_id=tools.user.id, status="completed"),
+        Todo(title="Renew passport", due_date=now + timedelta(days=30), user_id=tools.user.id),
+        Todo(title="Read 100% of book", user_id=tools.user.id),
+    ]
+    session.add_all(todos)
+    session.commit()
+
+    this_week = tools.list_todos(due_after="2026-10-19", due_before="2026-10-25")
+    assert listed_ids(this_week) == [todos[0].id, todos[1].id]
+
+    assert listed_ids(tools.list_todos(due_before="2026-10-25", status="pending")) == [todos[0].id]
+    assert listed_ids(tools.list_todos(text="REN")) == [todos[0].id, todos[2].id]
+    assert listed_ids(tools.list_todos(text="100%")) == [todos[3].id]
+    assert tools.list_todos(text="nothing") == "No matching todos."
+    assert tools.list_todos(due_after="next week").startswith("Error")
+
+def test_list_todos_pages_with_a_token(session: Session):
+    tools = make_tools(session)
+    start = datetime(2026, 1, 1)
+    session.add_all(
+        [Todo(title=f"Task {i}", due_date=start + timedelta(days=i), user_id=tools.user.id) for i in range(120)]
+        + [Todo(title=f"Someday {i}", user_id=tools.user.id) for i in range(5)]
+    )
+    session.commit()
+
+    first = tools.list_todos()
+    assert len(listed_ids(first)) == 20
+
+    seen, pages, token = [], 0, None
+    while True:
+        listing = tools.list_todos(limit=500, page_token=token)
+        seen += listed_ids(listing)
+        pages += 1
+        match = re.search(r"page_token='([^']+)'", listing)
+        if not match:
+            break
+        token = match.group(1)
+    # Capped at 50 per page, every todo exactly once, undated last
+    assert pages == 3
+    assert len(seen) == 125 and len(set(seen)) == 125
+    assert listed_ids(first) == seen[:20]
+    assert "Someday" in listing
+    assert tools.list_todos(page_token="garbage").startswith("Error")
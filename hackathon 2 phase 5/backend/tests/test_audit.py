@@ -0,0 +1,49 @@
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.core.audit import AuditSink
+from app.models.audit_log import AiAuditLog
+from tests.conftest import engine
+
+def test_entries_written_in_one_multi_row_insert(session: Session):
+    inserts = []
+
+    def count_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO ai_audit_logs"):
+            inserts.append(statement)
+    event.listen(engine, "before_cursor_execute", count_inserts)
+    try:
+        sink = AuditSink(engine=engine, batch_size=50, flush_interval=0.05, enabled=True)
+        for i in range(20):
+            assert sink.record(1, "create_todo", f"Title: {i}", "Created")
+        sink.close()
+    finally:
+        event.remove(engine, "before_cursor_execute", count_inserts)
+
+    assert len(inserts) == 1
+    logs = session.exec(select(AiAuditLog).where(AiAuditLog.user_id == 1)).all()
+    assert sorted(log.input_data for log in logs) == sorted(f"Title: {i}" for i in range(20))
+    assert sink.stats()["written"] == 20
+    assert sink.stats()["batches"] == 1
+
+def test_drop_policies_when_buffer_full():
+    for policy, kept in (("newest", ["a", "b"]), ("oldest", ["b", "c"])):
+        sink = AuditSink(engine=engine, max_queue=2, drop_policy=policy, enabled=True)
+        # Hold the worker back so the buffer fills
+        sink._thread = object()
+        assert sink.record(1, "a", None, None)
+        assert sink.record(1, "b", None, None)
+        assert not sink.record(1, "c", None, None)
+        assert [entry["action"] for entry in sink._queue.queue] == kept
+        assert sink.stats()["dropped"] == 1
+
+def test_write_failures_are_counted_not_raised():
+    class BrokenEngine:
+        def begin(self):
+            raise RuntimeError("database is down")
+
+    sink = AuditSink(engine=BrokenEngine(), flush_interval=0.01, enabled=True)
+    sink.record(1, "list_todos", None, "Listed 0 todos")
+    sink.close()
+    assert sink.stats()["failed"] == 1
+    assert sink.stats()["written"] == 0
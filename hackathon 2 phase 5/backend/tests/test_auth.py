@@ -6,6 +6,7 @@ def test_signup(client: TestClient):
         f"{settings.API_V1_STR}/auth/signup",
         json={
             "email": "test@example.com",
+            "username": "test",
             "password": "password123",
             "confirm_password": "password123"
         }
@@ -22,6 +23,7 @@ def test_login(client: TestClient):
         f"{settings.API_V1_STR}/auth/signup",
         json={
             "email": "login@example.com",
+            "username": "login",
             "password": "password123",
             "confirm_password": "password123"
         }
@@ -39,3 +41,44 @@ def test_login(client: TestClient):
     data = response.json()
     assert "access_token" in data
     assert data["token_type"] == "bearer"
+
+def test_login_rehashes_stale_cost(client: TestClient, session):
+    from passlib.hash import bcrypt
+    from sqlmodel import select
+    from app.models.user import User
+
+    session.add(User(
+        email="stale@example.com",
+        username="stale",
+        hashed_password=bcrypt.using(rounds=settings.BCRYPT_ROUNDS + 1).hash("password123"),
+    ))
+    session.commit()
+
+    response = client.post(
+        f"{settings.API_V1_STR}/auth/login",
+        data={"username": "stale@example.com", "password": "password123"}
+    )
+    assert response.status_code == 200
+
+    session.expire_all()
+    user = session.exec(select(User).where(User.email == "stale@example.com")).one()
+    assert user.hashed_password.split("$")[2] == f"{settings.BCRYPT_ROUNDS:02d}"
+
+def test_hasher_replaces_broken_pool():
+    import asyncio
+    from app.core.hashing import PasswordHasher, pwd_context
+
+    hasher = PasswordHasher(workers=1)
+
+    async def crash_and_hash():
+        await hasher.hash("password123")
+        # A dead worker breaks the pool for every later call
+        for process in list(hasher._executor._processes.values()):
+            process.kill()
+        return await hasher.hash("password123")
+
+    try:
+        assert pwd_context.verify("password123", asyncio.run(crash_and_hash()))
+        assert hasher.stats()["restarts"] == 1
+    finally:
+        hasher.close()
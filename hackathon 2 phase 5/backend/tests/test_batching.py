@@ -0,0 +1,29 @@
+from app.core.batching import BatchWorker
+
+class Collector(BatchWorker):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.batches = []
+
+    def handle_batch(self, batch):
+        self.batches.append(batch)
+
+def test_worker_batches_and_drains_on_close():
+    worker = Collector(max_queue=100, batch_size=4, linger=0.05)
+    for i in range(10):
+        assert worker.offer(i)
+    assert worker.flush(timeout=5)
+    worker.close()
+
+    assert [item for batch in worker.batches for item in batch] == list(range(10))
+    assert all(len(batch) <= 4 for batch in worker.batches)
+    assert worker.flush()
+
+def test_offer_never_blocks_when_full():
+    worker = Collector(max_queue=2, batch_size=10, linger=0)
+    # Hold the worker back so the queue stays full
+    worker._thread = object()
+    assert worker.offer("a") and worker.offer("b")
+    assert not worker.offer("c")
+    assert not worker.offer("d", evict_oldest=True)
+    assert list(worker._queue.queue) == ["b", "d"]
@@ -0,0 +1,83 @@
+import hashlib
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from jose import jwt
+
+from app.core.cache import TTLCache, token_cache, user_cache
+from app.core.security import create_access_token, decode_token
+from app.core.config import settings
+from tests.test_todos import get_auth_token
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    clock.now = 6
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.stats()["evictions"] == 1
+
+def test_ttl_cache_evicts_to_stay_under_max_bytes():
+    cache = TTLCache(maxsize=100, ttl=60, max_bytes=10, weigh=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "xxxx")
+    cache.get("a")
+    cache.set("c", "xxxx")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx"
+    assert cache.stats()["bytes"] == 8
+    # Never admitted: larger than the whole budget
+    cache.set("d", "x" * 11)
+    assert cache.get("d") is None
+    assert cache.stats()["bytes"] == 8
+
+def test_current_user_served_from_cache(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(f"{settings.API_V1_STR}/todos", headers=headers)
+    hits = user_cache.hits
+    response = client.get(f"{settings.API_V1_STR}/todos", headers=headers)
+    assert response.status_code == 200
+    assert user_cache.hits == hits + 1
+
+def test_token_claims_cached_until_expiry(client: TestClient, monkeypatch):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get(f"{settings.API_V1_STR}/todos", headers=headers)
+    hits = token_cache.hits
+    client.get(f"{settings.API_V1_STR}/todos", headers=headers)
+    assert token_cache.hits == hits + 1
+
+    # Operators only
+    assert client.get(f"{settings.API_V1_STR}/internal/metrics").status_code == 404
+    monkeypatch.setattr(settings, "INTERNAL_API_TOKEN", "ops-token")
+    assert client.get(f"{settings.API_V1_STR}/internal/metrics", headers=headers).status_code == 403
+    metrics = client.get(f"{settings.API_V1_STR}/internal/metrics", headers={"X-Internal-Token": "ops-token"}).json()
+    assert metrics["token_cache"]["hits"] >= 1
+
+def test_expired_token_is_not_cached():
+    token = create_access_token(1, expires_delta=timedelta(seconds=-1))
+    size = token_cache.stats()["size"]
+    with pytest.raises(jwt.JWTError):
+        decode_token(token)
+    assert token_cache.stats()["size"] == size
+    assert token_cache.get(hashlib.sha256(token.encode()).digest()) is None
@@ -0,0 +1,162 @@
+import asyncio
+import json
+
+import google.generativeai as genai
+from fastapi.testclient import TestClient
+from google.generativeai import protos
+from google.generativeai.types import generation_types
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.core import ai_service
+from app.core.ai_config import AISettings
+from app.core.ai_service import AiService, ModelRegistry
+from app.core.config import settings
+from app.models.user import User
+from app.core.conversation import Conversation, ConversationMemory, DaprStateStore, MemoryStateStore, conversation_memory
+from tests.conftest import async_engine
+from tests.test_ai_service import model_response
+from tests.test_todos import get_auth_token
+
+def test_compact_folds_oldest_turns_into_summary():
+    conversation = Conversation(1)
+    for i in range(20):
+        conversation.add_turn(f"question {i} " + "x" * 200, f"answer {i} " + "y" * 200)
+
+    compacted = conversation.compact(token_budget=500, summary_tokens=200)
+
+    assert compacted > 0
+    assert conversation.tokens() <= 500
+    assert conversation.turns[-1]["user"].startswith("question 19")
+    assert len(conversation.summary) <= 200 * 4
+    # The newest compacted turn survives in the summary
+    assert f"question {19 - len(conversation.turns)}" in conversation.summary
+
+def test_save_replays_turns_after_conflict():
+    memory = ConversationMemory(store=MemoryStateStore())
+    first = memory.load(1)
+    second = memory.load(1)
+
+    first.add_turn("add milk", "Added todo 1")
+    assert memory.save(first)
+    second.add_turn("add bread", "Added todo 2")
+    assert memory.save(second)
+
+    turns = memory.load(1).turns
+    assert [turn["user"] for turn in turns] == ["add milk", "add bread"]
+    assert memory.stats()["conflicts"] == 1
+
+class FakeStateResponse:
+    def __init__(self, data, etag):
+        self.data = data
+        self.etag = etag
+
+class FakeDaprClient:
+    def __init__(self):
+        self.state = {}
+
+    def get_state(self, store_name, key):
+        data, etag = self.state.get(key, (b"", ""))
+        return FakeStateResponse(data, etag)
+
+    def save_state(self, store_name, key, value, etag=None, state_metadata=None):
+        current = self.state.get(key, (None, None))[1]
+        if etag is not None and etag != current:
+            raise RuntimeError("possible etag mismatch")
+        self.state[key] = (value.encode(), str(int(current or 0) + 1))
+
+    def delete_state(self, store_name, key):
+        self.state.pop(key, None)
+
+    def close(self):
+        pass
+
+def test_dapr_state_store_round_trip():
+    client = FakeDaprClient()
+    memory = ConversationMemory(store=DaprStateStore(client_factory=lambda: client))
+    conversation = memory.load(7)
+    conversation.add_turn("hello", "hi")
+    assert memory.save(conversation)
+
+    assert memory.load(7).turns == [{"user": "hello", "model": "hi"}]
+    assert not memory.store.save("chat-history-7", "{}", etag="stale")
+    memory.clear(7)
+    assert memory.load(7).turns == []
+
+def test_chat_sends_previous_turns_as_history(client: TestClient, monkeypatch):
+    monkeypatch.setattr(ai_service, "model_registry", ModelRegistry(AISettings(GEMINI_API_KEY="test")))
+    sent = []
+
+    def generate_content(self, contents, **kwargs):
+        sent.append([content.parts[0].text for content in contents])
+        return model_response(protos.Part(text=f"reply {len(sent)}"))
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+
+    token = get_auth_token(client, "chat@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    for message in ("first", "second"):
+        response = client.post(f"{settings.API_V1_STR}/chat", headers=headers, json={"message": message})
+        assert response.status_code == 200
+
+    assert sent[0] == ["first"]
+    assert sent[1] == ["first", "reply 1", "second"]
+
+    assert client.delete(f"{settings.API_V1_STR}/chat/history", headers=headers).status_code == 204
+    client.post(f"{settings.API_V1_STR}/chat", headers=headers, json={"message": "third"})
+    assert sent[2] == ["third"]
+
+def test_chat_stream_emits_text_and_tool_events(client: TestClient, session, monkeypatch):
+    monkeypatch.setattr(ai_service, "model_registry", ModelRegistry(AISettings(GEMINI_API_KEY="test")))
+
+    def chunks(*parts):
+        return generation_types.GenerateContentResponse.from_iterator(iter([
+            protos.GenerateContentResponse(candidates=[protos.Candidate(content=protos.Content(role="model", parts=[part]))])
+            for part in parts
+        ]))
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        assert stream
+        if contents[-1].parts[0].function_response:
+            return chunks(protos.Part(text="Created "), protos.Part(text="your todo."))
+        return chunks(protos.Part(function_call=protos.FunctionCall(name="create_todo", args={"title": "Buy milk"})))
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+
+    token = get_auth_token(client, "stream@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    response = client.post(f"{settings.API_V1_STR}/chat/stream", headers=headers, json={"message": "add milk"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [event for event, _ in events] == ["tool", "text", "text", "done"]
+    assert events[0][1]["name"] == "create_todo"
+    assert events[0][1]["result"].startswith("Todo created successfully")
+    assert events[-1][1] == {"response": "Created your todo."}
+
+    todos = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+    assert [todo["title"] for todo in todos] == ["Buy milk"]
+    # The streamed turn is remembered like a regular one
+    user = session.exec(select(User).where(User.email == "stream@example.com")).one()
+    assert conversation_memory.load(user.id).turns == [{"user": "add milk", "model": "Created your todo."}]
+
+def test_chat_stream_stops_when_client_disconnects(session, monkeypatch):
+    monkeypatch.setattr(ai_service, "model_registry", ModelRegistry(AISettings(GEMINI_API_KEY="test")))
+    calls = []
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", lambda self, contents, **kwargs: calls.append(contents))
+    user = User(username="gone", email="gone@example.com", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+
+    async def disconnected():
+        return True
+
+    async def stream():
+        async with AsyncSession(async_engine, expire_on_commit=False) as async_session:
+            return [event async for event in AiService.stream_chat("add milk", async_session, user, None, disconnected)]
+
+    assert asyncio.run(stream()) == []
+    assert calls == []
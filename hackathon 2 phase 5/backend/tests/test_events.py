@@ -0,0 +1,165 @@
+import json
+import threading
+from datetime import datetime
+
+import pytest
+
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.events.outbox import OutboxRelay
+from app.events.publisher import EventPublisher
+from app.models.outbox import OutboxEvent
+from tests.conftest import engine
+from tests.test_todos import get_auth_token
+
+class FakeClient:
+    def __init__(self):
+        self.bulk_calls = []
+
+    def publish_events(self, pubsub_name, topic_name, data, data_content_type, publish_metadata):
+        self.bulk_calls.append((topic_name, [json.loads(item) for item in data]))
+
+    def close(self):
+        pass
+
+def test_publisher_drains_in_batches():
+    client = FakeClient()
+    publisher = EventPublisher(client_factory=lambda: client, batch_size=10, linger=0.05, enabled=True)
+    for i in range(5):
+        assert publisher.publish("task-events", {"task_id": i})
+    publisher.close()
+
+    published = [event["task_id"] for _, events in client.bulk_calls for event in events]
+    assert published == list(range(5))
+    assert len(client.bulk_calls) < 5
+    assert publisher.stats()["published"] == 5
+
+def test_publisher_drops_when_queue_full():
+    client = FakeClient()
+    publisher = EventPublisher(client_factory=lambda: client, max_queue=1, enabled=True)
+    # Hold the worker off so the queue stays full
+    publisher._thread = object()
+    assert publisher.publish("task-events", {"task_id": 1})
+    assert not publisher.publish("task-events", {"task_id": 2})
+    assert publisher.stats()["dropped"] == 1
+
+class FailingClient(FakeClient):
+    def publish_events(self, **kwargs):
+        raise RuntimeError("sidecar unavailable")
+
+def test_failed_client_is_closed_after_its_other_users():
+    started, release = threading.Event(), threading.Event()
+
+    class SharedClient(FakeClient):
+        def __init__(self):
+            super().__init__()
+            self.closed = False
+
+        def publish_events(self, topic_name, **kwargs):
+            assert not self.closed
+            if topic_name == "slow":
+                started.set()
+                release.wait(5)
+            else:
+                raise RuntimeError("sidecar unavailable")
+
+        def close(self):
+            self.closed = True
+
+    clients = []
+
+    def connect():
+        clients.append(SharedClient())
+        return clients[-1]
+
+    publisher = EventPublisher(client_factory=connect, enabled=True)
+    # The relay thread is mid-publish when the worker's batch fails
+    relay = threading.Thread(target=publisher.send_batch, args=("slow", [{"n": 1}, {"n": 2}]))
+    relay.start()
+    assert started.wait(5)
+    with pytest.raises(RuntimeError):
+        publisher.send_batch("task-events", [{"n": 3}, {"n": 4}])
+    assert len(clients) == 1 and not clients[0].closed
+
+    release.set()
+    relay.join()
+    assert clients[0].closed
+    publisher.send_batch("slow", [{"n": 5}, {"n": 6}])
+    assert len(clients) == 2 and not clients[1].closed
+    publisher.close()
+    assert clients[1].closed
+
+def complete_todo(client: TestClient) -> int:
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    todo_id = client.post(
+        f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Outbox"}
+    ).json()["id"]
+    client.put(
+        f"{settings.API_V1_STR}/todos/{todo_id}", headers=headers, json={"status": "completed"}
+    )
+    return todo_id
+
+def test_update_writes_outbox_events(client: TestClient, session: Session):
+    todo_id = complete_todo(client)
+    rows = session.exec(select(OutboxEvent).order_by(OutboxEvent.id)).all()
+    events = [json.loads(row.payload) for row in rows]
+    assert [e["event_type"] for e in events] == ["task.updated", "task.completed"]
+    assert all(e["task_id"] == todo_id for e in events)
+
+def test_outbox_relay_publishes_and_deletes(client: TestClient, session: Session):
+    complete_todo(client)
+    fake = FakeClient()
+    relay = OutboxRelay(engine=engine, event_publisher=EventPublisher(client_factory=lambda: fake))
+    assert relay.relay_once() == 2
+    assert [e["event_type"] for e in fake.bulk_calls[0][1]] == ["task.updated", "task.completed"]
+    assert session.exec(select(OutboxEvent)).all() == []
+
+def test_outbox_relay_backs_off_on_failure(client: TestClient, session: Session):
+    complete_todo(client)
+    relay = OutboxRelay(
+        engine=engine,
+        event_publisher=EventPublisher(client_factory=FailingClient),
+        max_attempts=2,
+    )
+    relay.relay_once()
+    rows = session.exec(select(OutboxEvent)).all()
+    assert all(row.attempts == 1 and row.status == "pending" for row in rows)
+    assert all(row.next_attempt_at > datetime.utcnow() for row in rows)
+    # Not due yet, so nothing is claimed
+    assert relay.relay_once() == 0
+
+class SelectiveClient(FakeClient):
+    def publish_events(self, **kwargs):
+        if any(json.loads(item).get("fail") for item in kwargs["data"]):
+            raise RuntimeError("rejected")
+        super().publish_events(**kwargs)
+
+    def publish_event(self, data, metadata, **kwargs):
+        self.publish_events(data=[data], publish_metadata=metadata, **kwargs)
+
+def test_outbox_relay_keeps_order_per_user(session: Session):
+    from app.events.outbox import add_event
+    add_event(session, "task-events", {"user_id": 1, "step": 1, "fail": True}, event_type="task.updated")
+    add_event(session, "task-events", {"user_id": 2, "step": 1}, event_type="task.created")
+    add_event(session, "task-events", {"user_id": 1, "step": 2}, event_type="task.updated")
+    add_event(session, "task-events", {"user_id": 1, "step": 3}, event_type="task.updated")
+    session.commit()
+
+    fake = SelectiveClient()
+    relay = OutboxRelay(engine=engine, event_publisher=EventPublisher(client_factory=lambda: fake))
+    relay.relay_once()
+    # User 2 is not held up; user 1's later events wait for the failed one
+    assert [(e["user_id"], e["step"]) for _, events in fake.bulk_calls for e in events] == [(2, 1)]
+    relay.relay_once()
+    assert len(fake.bulk_calls) == 1
+
+    first = session.exec(select(OutboxEvent).order_by(OutboxEvent.id)).first()
+    first.payload = json.dumps({"user_id": 1, "step": 1})
+    first.next_attempt_at = datetime.utcnow()
+    session.add(first)
+    session.commit()
+    relay.relay_once()
+    assert [(e["user_id"], e["step"]) for _, events in fake.bulk_calls[1:] for e in events] == [(1, 1), (1, 2), (1, 3)]
@@ -0,0 +1,60 @@
+import pytest
+from sqlmodel import Session, select
+
+from app.core import ai_service
+from app.core.ai_service import AiService
+from app.core.ai_tools import AiTools
+from app.core.audit import AuditSink
+from app.core.intents import IntentRouter, parse
+from app.models.todo import Todo
+from app.models.user import User
+
+@pytest.mark.parametrize("message,intent", [
+    ("mark 12 done", ("mark_todo", {"todo_id": 12, "status": "completed"})),
+    ("Please mark todo #3 as completed.", ("mark_todo", {"todo_id": 3, "status": "completed"})),
+    ("complete task 8", ("mark_todo", {"todo_id": 8, "status": "completed"})),
+    ("mark 4 as not done", ("mark_todo", {"todo_id": 4, "status": "pending"})),
+    ("reopen 5", ("mark_todo", {"todo_id": 5, "status": "pending"})),
+    ("delete todo 7", ("delete_todo", {"todo_id": 7})),
+    ("remove #9 thanks", ("delete_todo", {"todo_id": 9})),
+    ("list my todos", ("list_todos", {})),
+    ("show me my completed tasks", ("list_todos", {"status": "completed"})),
+    ("What are my pending todos?", ("list_todos", {"status": "pending"})),
+    ("add a todo to buy milk", ("create_todo", {"title": "Buy milk"})),
+    ("create task: Call the bank", ("create_todo", {"title": "Call the bank"})),
+    ("add todo called \"Pay rent and bills\"", ("create_todo", {"title": "Pay rent and bills"})),
+])
+def test_parses_simple_commands(message, intent):
+    assert parse(message) == intent
+
+@pytest.mark.parametrize("message", [
+    "mark 12 done and delete 7",
+    "delete it",
+    "add a todo to buy milk and then remind me",
+    "what should I work on today?",
+    "rename todo 3 to Buy bread",
+    "delete all my completed todos",
+    "",
+])
+def test_falls_through_to_model(message):
+    assert parse(message) is None
+
+def test_fast_path_skips_model_and_counts(session: Session, monkeypatch):
+    router = IntentRouter(enabled=True)
+    monkeypatch.setattr(ai_service, "intent_router", router)
+    monkeypatch.setattr(ai_service.model_registry, "get", lambda: pytest.fail("model should not be called"))
+
+    user = User(username="fast", email="fast@example.com", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    tools = AiTools(session=session, user=user, audit=AuditSink(enabled=False))
+
+    assert AiService.process_chat("add a todo to water plants", tools).startswith("Todo created successfully")
+    todo = session.exec(select(Todo).where(Todo.user_id == user.id)).one()
+    assert AiService.process_chat(f"mark {todo.id} done", tools) == f"Todo {todo.id} marked as completed."
+    assert "Water plants" in AiService.process_chat("list my todos", tools)
+
+    stats = router.stats()
+    assert stats["hits"] == 3
+    assert stats["intents"] == {"create_todo": 1, "mark_todo": 1, "list_todos": 1}
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+from starlette.websockets import WebSocketDisconnect
+
+from app.core.config import settings
+from app.events.hub import HubFull, RealtimeHub
+from app.events.publisher import EventPublisher
+from app.models.user import User
+from tests.test_todos import get_auth_token
+
+class NullPublisher:
+    def publish(self, topic, data, event_type=None):
+        return False
+
+def test_hub_delivers_evicts_and_limits():
+    async def scenario():
+        hub = RealtimeHub(queue_size=2, max_connections=3, max_per_user=2, event_publisher=NullPublisher())
+        fast, slow = hub.connect(1), hub.connect(1)
+        other = hub.connect(2)
+        with pytest.raises(HubFull):
+            hub.connect(1)
+        with pytest.raises(HubFull):
+            hub.connect(3)
+
+        # Offered from another thread, delivered on this loop
+        thread = threading.Thread(target=hub.publish, args=(1, {"n": 1}))
+        thread.start()
+        thread.join()
+        assert await fast.next(1) == {"n": 1}
+        assert await other.next(0.01) is None
+
+        hub.publish(1, {"n": 2})
+        hub.publish(1, {"n": 3})
+        assert await fast.next(1) == {"n": 2}
+        # `slow` never read: the third message overflows its queue
+        with pytest.raises(ConnectionAbortedError):
+            await slow.next(1)
+        assert await fast.next(1) == {"n": 3}
+
+        for subscription in (fast, slow, other):
+            hub.disconnect(subscription)
+        assert hub.stats()["connections"] == 0
+        assert hub.stats()["evicted"] == 1
+        assert hub.stats()["rejected"] == 2
+    asyncio.run(scenario())
+
+def test_notify_changed_does_not_block_on_a_full_publisher():
+    release = threading.Event()
+
+    class StuckClient:
+        def publish_event(self, **kwargs):
+            release.wait(5)
+
+    publisher = EventPublisher(client_factory=StuckClient, max_queue=1, batch_size=1, linger=0, enabled=True)
+    hub = RealtimeHub(event_publisher=publisher)
+    try:
+        done = threading.Event()
+
+        def notify():
+            for version in range(1, 6):
+                hub.notify_changed(1, version)
+            done.set()
+
+        threading.Thread(target=notify).start()
+        # The worker holds one event and the queue one more; the rest are dropped
+        assert done.wait(1)
+        assert publisher.stats()["dropped"] >= 3
+    finally:
+        release.set()
+        publisher.close()
+
+def test_websocket_pushes_changes_and_task_events(client: TestClient, session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "REALTIME_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(settings, "APP_API_TOKEN", "sidecar-token")
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = session.exec(select(User).where(User.email == "todo@example.com")).one().id
+
+    with client.websocket_connect(f"{settings.API_V1_STR}/todos/ws?token={token}") as websocket:
+        assert websocket.receive_json() == {"type": "hello"}
+        assert websocket.receive_json() == {"type": "ping"}
+
+        todo_id = client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Pushed"}).json()["id"]
+        message = websocket.receive_json()
+        while message["type"] == "ping":
+            message = websocket.receive_json()
+        assert message == {"type": "todos.changed", "version": 1}
+
+        # Delivered by Dapr from the broadcast subscription
+        event = {"event_type": "task.completed", "task_id": todo_id, "user_id": user_id}
+        broadcast = f"{settings.API_V1_STR}/events/task-broadcast"
+        # Only the sidecar may push to other users' connections
+        assert client.post(broadcast, json={"data": event}).status_code == 403
+        assert client.post(broadcast, headers={"dapr-api-token": "guess"}, json={"data": event}).status_code == 403
+        response = client.post(broadcast, headers={"dapr-api-token": "sidecar-token"}, json={"data": event})
+        assert response.json() == {"status": "SUCCESS"}
+        message = websocket.receive_json()
+        while message["type"] == "ping":
+            message = websocket.receive_json()
+        assert message == {"type": "task.event", "event": event}
+
+def test_websocket_requires_token(client: TestClient):
+    with pytest.raises(WebSocketDisconnect) as exc_info:
+        with client.websocket_connect(f"{settings.API_V1_STR}/todos/ws") as websocket:
+            websocket.receive_json()
+    assert exc_info.value.code == 1008
@@ -0,0 +1,163 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.config import settings
+from app.models.outbox import OutboxEvent
+from app.models.todo import Todo, TodoChange
+from app.models.user import User
+from app.services.recurring import calculate_next_due_date, create_next_occurrence, materialize_occurrences
+from app.services.rrule import InvalidRule, expand, next_occurrence, occurrences, parse_rule
+from tests.test_todos import get_auth_token
+
+def test_parse_rule():
+    assert parse_rule("weekly") == parse_rule("RRULE:FREQ=WEEKLY")
+    rule = parse_rule("FREQ=MONTHLY;INTERVAL=2;BYDAY=-1FR,2MO;UNTIL=20301231")
+    assert rule.interval == 2
+    assert rule.byday == ((-1, 4), (2, 0))
+    assert rule.until == datetime(2030, 12, 31, 23, 59, 59, 999999)
+    for text in [
+        "FREQ=HOURLY",
+        "FREQ=DAILY;COUNT=3;UNTIL=20300101",
+        "FREQ=WEEKLY;BYDAY=1MO",
+        "FREQ=WEEKLY;BYMONTHDAY=1",
+        "FREQ=MONTHLY;BYMONTHDAY=32",
+        "FREQ=DAILY;BYSETPOS=1",
+        "every day",
+    ]:
+        with pytest.raises(InvalidRule):
+            parse_rule(text)
+
+def test_occurrences():
+    start = datetime(2030, 1, 31, 9, 0)
+    # Exact calendar months; months without a 31st are skipped
+    assert occurrences(parse_rule("monthly"), start, start, datetime(2030, 6, 1)) == [
+        datetime(2030, 3, 31, 9, 0), datetime(2030, 5, 31, 9, 0),
+    ]
+    assert occurrences(parse_rule("FREQ=MONTHLY;BYMONTHDAY=-1"), start, start, datetime(2030, 4, 1)) == [
+        datetime(2030, 2, 28, 9, 0), datetime(2030, 3, 31, 9, 0),
+    ]
+    assert occurrences(parse_rule("FREQ=MONTHLY;BYDAY=-1FR;COUNT=3"), start, datetime(2000, 1, 1), datetime(2031, 1, 1)) == [
+        datetime(2030, 2, 22, 9, 0), datetime(2030, 3, 29, 9, 0), datetime(2030, 4, 26, 9, 0),
+    ]
+    # Thanksgiving
+    assert occurrences(parse_rule("FREQ=YEARLY;BYMONTH=11;BYDAY=4TH"), start, start, datetime(2032, 1, 1)) == [
+        datetime(2030, 11, 28, 9, 0), datetime(2031, 11, 27, 9, 0),
+    ]
+    assert occurrences(parse_rule("FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,FR;UNTIL=20300225"), start, start, datetime(2031, 1, 1)) == [
+        datetime(2030, 2, 1, 9, 0), datetime(2030, 2, 11, 9, 0), datetime(2030, 2, 15, 9, 0), datetime(2030, 2, 25, 9, 0),
+    ]
+    leap_day = datetime(2028, 2, 29)
+    assert next_occurrence(parse_rule("yearly"), leap_day, leap_day) == datetime(2032, 2, 29)
+    assert calculate_next_due_date(datetime(2030, 1, 31), "monthly") == datetime(2030, 3, 31)
+    assert calculate_next_due_date(datetime(2030, 1, 31), "fortnightly") is None
+
+def test_expand_many_rules_at_once():
+    texts = ["daily", "FREQ=WEEKLY;BYDAY=TU,TH", "FREQ=MONTHLY;BYMONTHDAY=1,15", "FREQ=DAILY;COUNT=2"]
+    starts = [datetime(2030, 1, 1, 8) + timedelta(days=i) for i in range(len(texts))]
+    rules = [parse_rule(text) for text in texts]
+    after, until = datetime(2030, 1, 1), datetime(2030, 2, 1)
+
+    rows, times = expand(rules, starts, after, until)
+    assert list(rows) == sorted(rows)
+    for i, rule in enumerate(rules):
+        assert times[rows == i].tolist() == occurrences(rule, starts[i], after, until)
+
+    rows, times = expand(rules, starts, after, until, limit=1)
+    assert rows.tolist() == [0, 1, 2, 3]
+    assert times.tolist() == [datetime(2030, 1, 1, 8), datetime(2030, 1, 3, 8), datetime(2030, 1, 15, 8), datetime(2030, 1, 4, 8)]
+
+def test_materialize_occurrences(session: Session):
+    user = User(username="series", email="series@example.com", hashed_password="pw")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    today = datetime.utcnow().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=1)
+    session.add(Todo(title="Standup", user_id=user.id, due_date=today, recurrence_rule="FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+                     reminder_time=today - timedelta(minutes=10)))
+    session.add(Todo(title="Stretch", user_id=user.id, due_date=today, recurrence_rule="FREQ=DAILY;COUNT=3"))
+    session.add(Todo(title="One-off", user_id=user.id, due_date=today))
+    session.commit()
+
+    stats = materialize_occurrences(session, horizon_days=14, chunk_size=1)
+    assert stats["series"] == 2
+    assert stats["chunks"] == 2
+
+    todos = session.exec(select(Todo).where(Todo.user_id == user.id).order_by(Todo.due_date, Todo.title)).all()
+    standups = [todo for todo in todos if todo.title == "Standup"]
+    # The first todo need not fall on a weekday; its occurrences do
+    assert all(todo.due_date.weekday() < 5 for todo in standups[1:])
+    assert all(todo.reminder_time == todo.due_date - timedelta(minutes=10) for todo in standups)
+    assert len({todo.series_id for todo in standups}) == 1
+    assert [todo.due_date for todo in todos if todo.title == "Stretch"] == [today + timedelta(days=i) for i in range(3)]
+    assert stats["created"] == len(todos) - 3
+
+    # Created todos reach the change feed and the outbox
+    assert len(session.exec(select(TodoChange).where(TodoChange.user_id == user.id)).all()) == len(todos)
+    events = session.exec(select(OutboxEvent).where(OutboxEvent.topic == "task-events")).all()
+    assert sum(len(json.loads(event.payload)["task_ids"]) for event in events) == stats["created"]
+
+    # A second run has nothing to add
+    assert materialize_occurrences(session, horizon_days=14)["created"] == 0
+
+def test_create_next_occurrence_once(session: Session):
+    user = User(username="chores", email="chores@example.com", hashed_password="pw")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    due = datetime(2030, 1, 1, 9, 0)
+    todo = Todo(title="Laundry", user_id=user.id, due_date=due, recurrence_rule="weekly", status="completed")
+    session.add(todo)
+    session.commit()
+    session.refresh(todo)
+
+    next_id = create_next_occurrence(session, todo.id)
+    assert next_id is not None
+    # Retried and racing deliveries find the occurrence taken
+    assert create_next_occurrence(session, todo.id) is None
+    assert create_next_occurrence(session, 10**9) is None
+
+    session.expire_all()
+    todos = session.exec(select(Todo).where(Todo.user_id == user.id).order_by(Todo.id)).all()
+    assert [(t.series_id, t.occurrence, t.status) for t in todos] == [
+        (todo.id, due, "completed"), (todo.id, due + timedelta(days=7), "pending"),
+    ]
+    events = [json.loads(event.payload) for event in session.exec(select(OutboxEvent)).all()]
+    assert events == [{"event_type": "task.created", "task_id": next_id, "user_id": user.id, "origin": "recurrence"}]
+
+    # Reopened before the event arrived: nothing to create
+    todos[1].status = "pending"
+    session.add(todos[1])
+    session.commit()
+    assert create_next_occurrence(session, todos[1].id) is None
+
+def test_completion_skips_materialized_occurrence(client: TestClient, session: Session, monkeypatch):
+    monkeypatch.setattr(settings, "APP_API_TOKEN", "sidecar-token")
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    due = (datetime.utcnow() + timedelta(hours=1)).replace(microsecond=0)
+    todo_id = client.post(
+        f"{settings.API_V1_STR}/todos",
+        headers=headers,
+        json={"title": "Water plants", "due_date": due.isoformat(), "recurrence_rule": "FREQ=DAILY"},
+    ).json()["id"]
+    materialize_occurrences(session, horizon_days=2)
+    count = len(client.get(f"{settings.API_V1_STR}/todos", headers=headers).json())
+
+    client.put(f"{settings.API_V1_STR}/todos/{todo_id}", headers=headers, json={"status": "completed"})
+    event = {"event_type": "task.bulk_updated", "task_ids": [todo_id], "completed_task_ids": [todo_id]}
+    response = client.post(
+        f"{settings.API_V1_STR}/events/task-processed",
+        headers={"dapr-api-token": "sidecar-token"},
+        json={"data": json.dumps(event)},
+    )
+    assert response.json() == {"status": "SUCCESS"}
+    todos = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+    assert len(todos) == count
+    assert sorted(todo["due_date"] for todo in todos) == [(due + timedelta(days=i)).isoformat() for i in range(count)]
+
+    response = client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Bad", "recurrence_rule": "FREQ=SOMETIMES"})
+    assert response.status_code == 422
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session, select
+
+from app.models.outbox import OutboxEvent
+from app.models.todo import Todo
+from app.models.user import User
+from app.services.scheduler import check_and_publish_reminders
+
+def add_todos(session: Session, **fields):
+    user = User(username="reminders", email="reminders@example.com", hashed_password="pw")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    past = datetime.utcnow() - timedelta(minutes=5)
+    for i in range(5):
+        session.add(Todo(title=f"Due {i}", user_id=user.id, reminder_time=past, **fields))
+    session.add(Todo(title="Later", user_id=user.id, reminder_time=datetime.utcnow() + timedelta(days=1)))
+    session.add(Todo(title="Done", user_id=user.id, reminder_time=past, status="completed"))
+    session.commit()
+
+def test_reminders_published_in_chunks(session: Session):
+    add_todos(session)
+
+    stats = check_and_publish_reminders(session, chunk_size=2)
+
+    assert stats["scanned"] == 5
+    assert stats["published"] == 5
+    assert stats["chunks"] == 3
+    assert len(session.exec(select(OutboxEvent).where(OutboxEvent.topic == "reminders")).all()) == 5
+    sent = session.exec(select(Todo).where(Todo.reminder_sent == True)).all()
+    assert sorted(todo.title for todo in sent) == [f"Due {i}" for i in range(5)]
+
+    # Nothing left on the next tick
+    assert check_and_publish_reminders(session)["scanned"] == 0
+
+def test_reminder_scan_uses_partial_index(session: Session):
+    plan = session.exec(text(
+        "EXPLAIN QUERY PLAN SELECT id FROM todo WHERE reminder_time <= '2030-01-01' "
+        "AND reminder_sent = false AND status <> 'completed' ORDER BY reminder_time"
+    )).all()
+    assert "ix_todo_reminder_pending" in " ".join(str(row) for row in plan)
@@ -0,0 +1,55 @@
+from fastapi.testclient import TestClient
+from sqlmodel import Session, select
+
+from app.core.ai_tools import AiTools
+from app.core.audit import AuditSink
+from app.core.config import settings
+from app.models.user import User
+from tests.test_todos import get_auth_token
+
+def test_search_ranks_and_follows_writes(client: TestClient):
+    token = get_auth_token(client, "search@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    url = f"{settings.API_V1_STR}/todos"
+    items = [
+        {"title": "Buy milk", "description": "Semi-skimmed"},
+        {"title": "Bake a cake", "description": "Needs milk and eggs"},
+        {"title": "Walk the dog"},
+    ]
+    ids = [r["id"] for r in client.post(f"{url}/bulk", headers=headers, json={"items": items}).json()["results"]]
+
+    response = client.get(f"{url}/search", headers=headers, params={"q": "milk"})
+    assert response.status_code == 200
+    # Title matches rank above description matches
+    assert [todo["id"] for todo in response.json()] == [ids[0], ids[1]]
+
+    # Prefix and stemmed matches, every word required
+    assert [t["id"] for t in client.get(f"{url}/search", headers=headers, params={"q": "walking do"}).json()] == [ids[2]]
+    assert client.get(f"{url}/search", headers=headers, params={"q": "milk dog"}).json() == []
+    # Query syntax in user input is treated as plain words
+    assert client.get(f"{url}/search", headers=headers, params={"q": '"milk" OR NEAR('}).status_code == 200
+
+    client.put(f"{url}/{ids[0]}", headers=headers, json={"title": "Buy oat drink"})
+    client.delete(f"{url}/{ids[1]}", headers=headers)
+    assert client.get(f"{url}/search", headers=headers, params={"q": "milk"}).json() == []
+    assert [t["id"] for t in client.get(f"{url}/search", headers=headers, params={"q": "oat"}).json()] == [ids[0]]
+
+def test_search_is_scoped_to_user(client: TestClient):
+    for email in ("alice@example.com", "bob@example.com"):
+        token = get_auth_token(client, email, "password123")
+        client.post(f"{settings.API_V1_STR}/todos", headers={"Authorization": f"Bearer {token}"}, json={"title": "Shared name"})
+    results = client.get(f"{settings.API_V1_STR}/todos/search", headers={"Authorization": f"Bearer {token}"}, params={"q": "shared"}).json()
+    assert len(results) == 1
+
+def test_ai_tool_resolves_description_to_id(client: TestClient, session: Session):
+    token = get_auth_token(client, "ai-search@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    milk = client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Get milk"}).json()
+    client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Get bread"})
+
+    user = session.exec(select(User).where(User.email == "ai-search@example.com")).one()
+    tools = AiTools(session=session, user=user, audit=AuditSink(enabled=False))
+    result = tools.search_todos("the milk one")
+    assert result.splitlines()[1].startswith(f"{milk['id']}. [ ] Get milk")
+    assert len(result.splitlines()) == 2
+    assert tools.search_todos("the one") == "No todos match 'the one'."
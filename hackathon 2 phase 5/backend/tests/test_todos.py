@@ -7,6 +7,7 @@ def get_auth_token(client: TestClient, email: str = "todo@example.com", password
         f"{settings.API_V1_STR}/auth/signup",
         json={
             "email": email,
+            "username": email.split("@")[0],
             "password": password,
             "confirm_password": password
         }
@@ -71,6 +72,39 @@ def test_update_todo(client: TestClient):
     data = response.json()
     assert data["title"] == "New Title"
     assert data["status"] == "completed"
+    assert data["updated_at"] > create_res.json()["updated_at"]
+
+def test_conditional_get(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    todo_id = client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Cached"}).json()["id"]
+
+    response = client.get(f"{settings.API_V1_STR}/todos", headers=headers)
+    etag = response.headers["ETag"]
+    item_etag = client.get(f"{settings.API_V1_STR}/todos/{todo_id}", headers=headers).headers["ETag"]
+    assert etag != item_etag
+
+    response = client.get(f"{settings.API_V1_STR}/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    response = client.get(f"{settings.API_V1_STR}/todos/{todo_id}", headers={**headers, "If-None-Match": item_etag})
+    assert response.status_code == 304
+
+    client.put(f"{settings.API_V1_STR}/todos/{todo_id}", headers=headers, json={"status": "completed"})
+    response = client.get(f"{settings.API_V1_STR}/todos", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["status"] == "completed"
+    response = client.get(f"{settings.API_V1_STR}/todos/{todo_id}", headers={**headers, "If-None-Match": item_etag})
+    assert response.status_code == 200
+
+    # A current tag does not stand in for a todo that is gone
+    deleted_id = client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": "Gone"}).json()["id"]
+    client.delete(f"{settings.API_V1_STR}/todos/{deleted_id}", headers=headers)
+    current_etag = client.get(f"{settings.API_V1_STR}/todos/{todo_id}", headers=headers).headers["ETag"]
+    deleted_etag = current_etag.replace(f"todo-{todo_id}-", f"todo-{deleted_id}-")
+    response = client.get(f"{settings.API_V1_STR}/todos/{deleted_id}", headers={**headers, "If-None-Match": deleted_etag})
+    assert response.status_code == 404
 
 def test_delete_todo(client: TestClient):
     token = get_auth_token(client)
@@ -94,3 +128,200 @@ def test_delete_todo(client: TestClient):
         headers={"Authorization": f"Bearer {token}"}
     )
     assert get_res.status_code == 404
+
+def test_read_todos_cursor_pagination(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for i in range(5):
+        client.post(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            json={"title": f"Todo {i}"}
+        )
+
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        response = client.get(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            params={"cursor": cursor, "limit": 2}
+        )
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) <= 2
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+
+    assert titles == [f"Todo {i}" for i in range(5)]
+
+def test_read_todos_cursor_by_due_date(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for title, due in [("No due", None), ("Later", "2030-01-02T00:00:00"), ("Sooner", "2030-01-01T00:00:00")]:
+        client.post(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            json={"title": title, "due_date": due}
+        )
+
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            params={"cursor": cursor, "limit": 1, "order_by": "due_date"}
+        ).json()
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+
+    # Dated todos first, undated ones last
+    assert titles == ["Sooner", "Later", "No due"]
+
+    # Offset pages follow the same order, across the undated tail too
+    for skip, expected in [(0, ["Sooner", "Later"]), (1, ["Later", "No due"]), (2, ["No due"]), (3, [])]:
+        response = client.get(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            params={"skip": skip, "limit": 2, "order_by": "due_date"}
+        )
+        assert [item["title"] for item in response.json()] == expected
+
+def test_read_todos_filtered_descending(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    for title, status, due, reminder in [
+        ("Early", "pending", "2030-01-01T00:00:00", None),
+        ("Middle", "pending", "2030-01-03T00:00:00", "2030-01-02T09:00:00"),
+        ("Late", "pending", "2030-01-05T00:00:00", None),
+        ("Done", "completed", "2030-01-04T00:00:00", None),
+        ("Undated", "pending", None, None),
+    ]:
+        client.post(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            json={"title": title, "status": status, "due_date": due, "reminder_time": reminder}
+        )
+
+    titles = []
+    cursor = ""
+    while cursor is not None:
+        page = client.get(
+            f"{settings.API_V1_STR}/todos",
+            headers=headers,
+            params={"cursor": cursor, "limit": 1, "status": "pending", "order_by": "due_date", "direction": "desc"}
+        ).json()
+        titles += [item["title"] for item in page["items"]]
+        cursor = page["next_cursor"]
+    # Undated todos stay last when descending
+    assert titles == ["Late", "Middle", "Early", "Undated"]
+
+    response = client.get(
+        f"{settings.API_V1_STR}/todos",
+        headers=headers,
+        params={"due_after": "2030-01-02T00:00:00", "due_before": "2030-01-05T00:00:00", "order_by": "due_date"}
+    )
+    assert [item["title"] for item in response.json()] == ["Middle", "Done"]
+
+    response = client.get(f"{settings.API_V1_STR}/todos", headers=headers, params={"has_reminder": True})
+    assert [item["title"] for item in response.json()] == ["Middle"]
+
+    # A cursor only continues the order it was issued for
+    first = client.get(
+        f"{settings.API_V1_STR}/todos",
+        headers=headers,
+        params={"cursor": "", "limit": 1, "order_by": "due_date", "direction": "desc"}
+    ).json()
+    response = client.get(
+        f"{settings.API_V1_STR}/todos",
+        headers=headers,
+        params={"cursor": first["next_cursor"], "order_by": "due_date"}
+    )
+    assert response.status_code == 400
+
+def test_read_todos_invalid_cursor(client: TestClient):
+    token = get_auth_token(client)
+    response = client.get(
+        f"{settings.API_V1_STR}/todos",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"cursor": "not-a-cursor"}
+    )
+    assert response.status_code == 400
+
+def test_complete_recurring_todo_creates_next(client: TestClient, monkeypatch):
+    monkeypatch.setattr(settings, "APP_API_TOKEN", "sidecar-token")
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    create_res = client.post(
+        f"{settings.API_V1_STR}/todos",
+        headers=headers,
+        json={"title": "Water plants", "due_date": "2030-01-01T09:00:00", "recurrence_rule": "daily"}
+    )
+    todo_id = create_res.json()["id"]
+
+    client.put(
+        f"{settings.API_V1_STR}/todos/{todo_id}",
+        headers=headers,
+        json={"status": "completed"}
+    )
+    # The next occurrence comes from the task.completed consumer
+    todos = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+    assert [t["status"] for t in todos] == ["completed"]
+
+    # Only the sidecar may deliver it
+    event = {"event_type": "task.completed", "task_id": todo_id}
+    response = client.post(f"{settings.API_V1_STR}/events/task-processed", json={"data": event})
+    assert response.status_code == 403
+    assert len(client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()) == 1
+
+    # Redelivered events create it once
+    for _ in range(2):
+        response = client.post(
+            f"{settings.API_V1_STR}/events/task-processed",
+            headers={"dapr-api-token": "sidecar-token"},
+            json={"data": event},
+        )
+        assert response.json() == {"status": "SUCCESS"}
+
+    todos = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+    pending = [t for t in todos if t["status"] == "pending"]
+    assert len(pending) == 1
+    assert pending[0]["title"] == "Water plants"
+    assert pending[0]["due_date"] == "2030-01-02T09:00:00"
+
+def test_bulk_create_update_delete(client: TestClient):
+    token = get_auth_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+    other = get_auth_token(client, email="other@example.com")
+    foreign_id = client.post(
+        f"{settings.API_V1_STR}/todos",
+        headers={"Authorization": f"Bearer {other}"},
+        json={"title": "Not mine"}
+    ).json()["id"]
+
+    response = client.post(
+        f"{settings.API_V1_STR}/todos/bulk",
+        headers=headers,
+        json={"items": [{"title": f"Bulk {i}"} for i in range(3)]}
+    )
+    assert response.status_code == 200
+    ids = [r["id"] for r in response.json()["results"]]
+    assert [r["status"] for r in response.json()["results"]] == ["created"] * 3
+
+    response = client.patch(
+        f"{settings.API_V1_STR}/todos/bulk",
+        headers=headers,
+        json={"items": [{"id": ids[0], "status": "completed"}, {"id": foreign_id, "title": "Hijacked"}]}
+    )
+    assert [r["status"] for r in response.json()["results"]] == ["updated", "not_found"]
+    assert client.get(f"{settings.API_V1_STR}/todos/{ids[0]}", headers=headers).json()["status"] == "completed"
+
+    response = client.request(
+        "DELETE",
+        f"{settings.API_V1_STR}/todos/bulk",
+        headers=headers,
+        json={"ids": ids + [foreign_id]}
+    )
+    assert [r["status"] for r in response.json()["results"]] == ["deleted"] * 3 + ["not_found"]
+    assert client.get(f"{settings.API_V1_STR}/todos", headers=headers).json() == []
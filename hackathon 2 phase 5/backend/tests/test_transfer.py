@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from tests.test_todos import get_auth_token
+
+def test_export_import_round_trip(client: TestClient, monkeypatch):
+    # Several cursor fetches and insert batches
+    monkeypatch.setattr(settings, "TODO_EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "TODO_IMPORT_BATCH_SIZE", 2)
+    headers = {"Authorization": f"Bearer {get_auth_token(client)}"}
+    client.post(f"{settings.API_V1_STR}/todos/bulk", headers=headers, json={"items": [
+        {"title": "Plain"},
+        {"title": 'Quoted "name", with comma', "description": "two\nlines", "status": "completed"},
+        {"title": "Dated", "due_date": "2030-01-01T09:00:00", "recurrence_rule": "daily", "reminder_time": "2030-01-01T08:00:00"},
+    ]})
+    original = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+
+    response = client.get(f"{settings.API_V1_STR}/todos/export", headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert exported == [{key: todo[key] for key in exported[0]} for todo in original]
+
+    response = client.get(f"{settings.API_V1_STR}/todos/export", headers=headers, params={"format": "csv"})
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == [todo["title"] for todo in original]
+    assert rows[1]["description"] == "two\nlines"
+
+    other = {"Authorization": f"Bearer {get_auth_token(client, email='importer@example.com')}"}
+    changes = client.get(f"{settings.API_V1_STR}/todos/changes", headers=other).json()
+    for content, content_type in [
+        (response.content, "text/csv"),
+        (client.get(f"{settings.API_V1_STR}/todos/export", headers=headers).content, "application/x-ndjson"),
+    ]:
+        response = client.post(
+            f"{settings.API_V1_STR}/todos/import",
+            headers={**other, "Content-Type": content_type},
+            content=iter([content[:7], content[7:]]),
+        )
+        assert response.json() == {"imported": 3}
+
+    imported = client.get(f"{settings.API_V1_STR}/todos", headers=other).json()
+    fields = ["title", "description", "status", "due_date", "recurrence_rule", "reminder_time", "created_at"]
+    assert [{key: todo[key] for key in fields} for todo in imported] == [
+        {key: todo[key] for key in fields} for todo in original * 2
+    ]
+    # Imported todos reach the change feed
+    delta = client.get(f"{settings.API_V1_STR}/todos/changes", headers=other, params={"since": changes["next_cursor"]}).json()
+    assert sorted(todo["id"] for todo in delta["upserts"]) == sorted(todo["id"] for todo in imported)
+
+def test_import_rejects_bad_line(client: TestClient):
+    headers = {"Authorization": f"Bearer {get_auth_token(client)}"}
+    body = '{"title": "Fine"}\n\n{"title": "Bad status", "status": "archived"}\n'
+    response = client.post(f"{settings.API_V1_STR}/todos/import", headers=headers, content=body)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "line 3: status must be pending or completed"
+
+    body = 'title,due_date\nFine,\n"Unclosed,2030-01-01\n'
+    response = client.post(f"{settings.API_V1_STR}/todos/import", headers=headers, content=body, params={"format": "csv"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "line 3: unterminated quoted field"
+
+    body = 'title,due_date\nFine,\nBad date,tomorrow\n'
+    response = client.post(f"{settings.API_V1_STR}/todos/import", headers=headers, content=body, params={"format": "csv"})
+    assert response.json()["detail"] == "line 3: due_date must be an ISO 8601 date-time"
+
+    # Nothing of a failed import is kept
+    assert client.get(f"{settings.API_V1_STR}/todos", headers=headers).json() == []
+
+def test_csv_import_quotes_like_the_csv_module(client: TestClient, monkeypatch):
+    headers = {"Authorization": f"Bearer {get_auth_token(client)}"}
+    # A bare quote mid-field is literal; quoted fields may span lines and escape quotes
+    body = 'title,description\nBuy 5" screen,\n"Say ""hi""","two\nlines"\nLast,\n'
+    response = client.post(f"{settings.API_V1_STR}/todos/import", headers=headers, content=body, params={"format": "csv"})
+    assert response.status_code == 200, response.text
+    todos = client.get(f"{settings.API_V1_STR}/todos", headers=headers).json()
+    assert [(todo["title"], todo["description"]) for todo in todos] == [
+        ('Buy 5" screen', None), ('Say "hi"', "two\nlines"), ("Last", None),
+    ]
+
+    # An open quoted field is not buffered without bound
+    monkeypatch.setattr("app.services.transfer.MAX_LINE_LENGTH", 100)
+    body = 'title\nFine\n"Never closed\n' + "more\n" * 50
+    response = client.post(f"{settings.API_V1_STR}/todos/import", headers=headers, content=body, params={"format": "csv"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "line 3: a record is longer than 100 characters"
@@ -0,0 +1,138 @@
+import google.generativeai as genai
+from fastapi.testclient import TestClient
+from google.generativeai import protos
+from sqlmodel import Session, select
+
+from app.core import ai_service
+from app.core.ai_config import AISettings
+from app.core.ai_service import AiService, ModelRegistry
+from app.core.ai_tools import AiTools
+from app.core.audit import AuditSink
+from app.core.config import settings
+from app.models.todo import Todo
+from app.models.user import User
+from app.services.versions import get_version
+from tests.test_ai_service import model_response
+from tests.test_todos import get_auth_token
+
+def make_user(session: Session, name: str = "versioned") -> User:
+    user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+    session.add(user)
+    session.commit()
+    session.refresh(user)
+    return user
+
+def test_orm_writes_bump_version(session: Session):
+    user = make_user(session)
+    other = make_user(session, "other")
+    assert get_version(session, user.id) == 0
+
+    todo = Todo(title="Write tests", user_id=user.id)
+    session.add(todo)
+    session.commit()
+    assert get_version(session, user.id) == 1
+
+    todo.status = "completed"
+    session.add(todo)
+    session.commit()
+    assert get_version(session, user.id) == 2
+
+    session.delete(todo)
+    session.commit()
+    assert get_version(session, user.id) == 3
+    assert get_version(session, other.id) == 0
+
+def test_endpoint_and_bulk_writes_bump_version(client: TestClient, session: Session):
+    token = get_auth_token(client, "bump@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = session.exec(select(User).where(User.email == "bump@example.com")).one().id
+
+    created = client.post(f"{settings.API_V1_STR}/todos/bulk", headers=headers, json={"items": [{"title": "A"}, {"title": "B"}]})
+    ids = [r["id"] for r in created.json()["results"]]
+    assert get_version(session, user_id) == 1
+
+    client.request("DELETE", f"{settings.API_V1_STR}/todos/bulk", headers=headers, json={"ids": ids})
+    session.expire_all()
+    assert get_version(session, user_id) == 2
+
+def test_read_only_replies_cached_until_todos_change(session: Session, monkeypatch):
+    monkeypatch.setattr(ai_service, "model_registry", ModelRegistry(AISettings(GEMINI_API_KEY="test")))
+    calls = []
+
+    def generate_content(self, contents, **kwargs):
+        calls.append(contents[-1])
+        if contents[-1].parts[0].function_response:
+            return model_response(protos.Part(text=f"Answer {len(calls)}"))
+        return model_response(protos.Part(function_call=protos.FunctionCall(name="list_todos", args={"status": "pending"})))
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+
+    user = make_user(session)
+    tools = AiTools(session=session, user=user, audit=AuditSink(enabled=False))
+
+    first = AiService.process_chat("What's pending?", tools)
+    assert AiService.process_chat("what's   pending", tools) == first
+    assert len(calls) == 2
+
+    # Refers to earlier turns, so never served from the cache
+    AiService.process_chat("What's pending in that list?", tools)
+    assert len(calls) == 4
+
+    tools.create_todo("New task")
+    assert AiService.process_chat("What's pending?", tools) != first
+    assert len(calls) == 6
+
+def test_turns_with_writes_are_not_cached(session: Session, monkeypatch):
+    monkeypatch.setattr(ai_service, "model_registry", ModelRegistry(AISettings(GEMINI_API_KEY="test")))
+    calls = []
+
+    def generate_content(self, contents, **kwargs):
+        calls.append(contents[-1])
+        if contents[-1].parts[0].function_response:
+            return model_response(protos.Part(text="Done"))
+        return model_response(protos.Part(function_call=protos.FunctionCall(name="create_todo", args={"title": "Tea"})))
+    monkeypatch.setattr(genai.GenerativeModel, "generate_content", generate_content)
+
+    user = make_user(session)
+    tools = AiTools(session=session, user=user, audit=AuditSink(enabled=False))
+
+    AiService.process_chat("Remember to buy tea", tools)
+    AiService.process_chat("Remember to buy tea", tools)
+    assert len(calls) == 4
+
+def test_change_feed(client: TestClient, session: Session):
+    token = get_auth_token(client, "sync@example.com", "password123")
+    headers = {"Authorization": f"Bearer {token}"}
+    user = session.exec(select(User).where(User.email == "sync@example.com")).one()
+    ids = [
+        client.post(f"{settings.API_V1_STR}/todos", headers=headers, json={"title": title}).json()["id"]
+        for title in ["Keep", "Edit", "Delete", "Bulk delete", "AI delete"]
+    ]
+    client.delete(f"{settings.API_V1_STR}/todos/{ids[2]}", headers=headers)
+
+    # First sync: every live todo, paged. Later pages may carry tombstones
+    # of todos the client never saw.
+    seen, gone, cursor, has_more = [], [], None, True
+    while has_more:
+        page = client.get(f"{settings.API_V1_STR}/todos/changes", headers=headers, params={"since": cursor, "limit": 2}).json()
+        seen += [todo["id"] for todo in page["upserts"]]
+        gone += page["deleted"]
+        cursor, has_more = page["next_cursor"], page["has_more"]
+    assert sorted(seen) == [ids[0], ids[1], ids[3], ids[4]]
+    assert gone == [ids[2]]
+
+    page = client.get(f"{settings.API_V1_STR}/todos/changes", headers=headers, params={"since": cursor}).json()
+    assert page == {"upserts": [], "deleted": [], "next_cursor": cursor, "has_more": False}
+
+    client.put(f"{settings.API_V1_STR}/todos/{ids[1]}", headers=headers, json={"title": "Edited"})
+    client.put(f"{settings.API_V1_STR}/todos/{ids[1]}", headers=headers, json={"status": "completed"})
+    client.request("DELETE", f"{settings.API_V1_STR}/todos/bulk", headers=headers, json={"ids": [ids[3]]})
+    AiTools(session=session, user=user, audit=AuditSink(enabled=False)).delete_todo(ids[4])
+
+    page = client.get(f"{settings.API_V1_STR}/todos/changes", headers=headers, params={"since": cursor}).json()
+    # Two edits collapse into the todo's current state
+    assert [(todo["id"], todo["title"], todo["status"]) for todo in page["upserts"]] == [(ids[1], "Edited", "completed")]
+    assert page["deleted"] == [ids[3], ids[4]]
+    assert page["has_more"] is False
+
+    response = client.get(f"{settings.API_V1_STR}/todos/changes", headers=headers, params={"since": "bogus"})
+    assert response.status_code == 400
@@ -1,15 +1,17 @@
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sqlalchemy.pool import StaticPool
 from sqlmodel import Session, SQLModel, create_engine
 from app.models.user import User
 from app.models.todo import Todo
 from app.core.ai_tools import AiTools
+from app.core.audit import AuditSink
 from app.models.audit_log import AiAuditLog
 
 def test_ai_tools_logic():
-    # Setup in-memory DB
-    engine = create_engine("sqlite:///:memory:")
+    # Setup in-memory DB, shared with the audit sink's writer thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
     SQLModel.metadata.create_all(engine)
     
     with Session(engine) as session:
@@ -20,7 +22,8 @@ def test_ai_tools_logic():
         session.refresh(user)
         
         # Init Tools
-        tools = AiTools(session=session, user=user)
+        audit = AuditSink(engine=engine, enabled=True)
+        tools = AiTools(session=session, user=user, audit=audit)
         
         # 1. Create Todo
         print("Testing CREATE...")
@@ -63,6 +66,7 @@ def test_ai_tools_logic():
         assert len(todos) == 0
         
         # Verify Audit Log
+        audit.close()
         logs = session.query(AiAuditLog).all()
         print(f"Audit Logs: {len(logs)}")
         assert len(logs) >= 5